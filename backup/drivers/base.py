@@ -12,6 +12,9 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import collections
+from concurrent import futures
+import itertools
 import os
 import signal
 import subprocess
@@ -19,10 +22,101 @@ import subprocess
 from oslo_config import cfg
 from oslo_log import log as logging
 
+from backup.utils import encryption
+
 CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
 
 
+class Codec(object):
+    """Base class for the compression codecs used in the pipelines."""
+
+    name = None
+    extension = None
+
+    def __init__(self, level=None, threads=0):
+        self.level = level
+        # 0 means one thread per CPU core.
+        self.threads = threads or os.cpu_count() or 1
+
+    @property
+    def level_arg(self):
+        return ' -%d' % self.level if self.level is not None else ''
+
+    @property
+    def compress_cmd(self):
+        """Command appended to the backup pipeline."""
+        raise NotImplementedError()
+
+    @property
+    def decompress_cmd(self):
+        """Command prepended to the restore pipeline."""
+        raise NotImplementedError()
+
+
+class GzipCodec(Codec):
+    name = 'gzip'
+    extension = '.gz'
+
+    @property
+    def compress_cmd(self):
+        return ' | gzip' + self.level_arg
+
+    @property
+    def decompress_cmd(self):
+        return 'gzip -d -c | '
+
+
+class PigzCodec(Codec):
+    """Parallel gzip, the output can be decompressed by gzip as well."""
+
+    name = 'pigz'
+    extension = '.gz'
+
+    @property
+    def compress_cmd(self):
+        return ' | pigz -p %d%s' % (self.threads, self.level_arg)
+
+    @property
+    def decompress_cmd(self):
+        return 'pigz -d -c | '
+
+
+class ZstdCodec(Codec):
+    name = 'zstd'
+    extension = '.zst'
+
+    @property
+    def compress_cmd(self):
+        return ' | zstd -q -c -T%d%s' % (self.threads, self.level_arg)
+
+    @property
+    def decompress_cmd(self):
+        return 'zstd -d -q -c | '
+
+
+class Lz4Codec(Codec):
+    name = 'lz4'
+    extension = '.lz4'
+
+    @property
+    def compress_cmd(self):
+        return ' | lz4 -q -c' + self.level_arg
+
+    @property
+    def decompress_cmd(self):
+        return 'lz4 -d -q -c | '
+
+
+CODECS = {codec.name: codec
+          for codec in (GzipCodec, PigzCodec, ZstdCodec, Lz4Codec)}
+
+
+def get_codec(name, level=None, threads=0):
+    """Get the compression codec by name, gzip is the legacy default."""
+    return CODECS[name or GzipCodec.name](level=level, threads=threads)
+
+
 class BaseRunner(object):
     """Base class for Backup Strategy implementations."""
 
@@ -37,19 +131,21 @@ class BaseRunner(object):
     def __init__(self, *args, **kwargs):
         self.process = None
         self.pid = None
+        self.encryptor = None
         self.base_filename = kwargs.get('filename')
         self.storage = kwargs.pop('storage', None)
         self.location = kwargs.pop('location', '')
         self.checksum = kwargs.pop('checksum', '')
+        self.codec = get_codec(kwargs.pop('compression', None),
+                               level=CONF.compression_level,
+                               threads=CONF.compression_threads)
 
         if 'restore_location' not in kwargs:
             kwargs['restore_location'] = self.default_data_dir
         self.restore_location = kwargs['restore_location']
 
         self.command = self.cmd % kwargs
-        self.restore_command = (self.decrypt_cmd +
-                                self.unzip_cmd +
-                                (self.restore_cmd % kwargs))
+        self.restore_command = self.unzip_cmd + (self.restore_cmd % kwargs)
         self.prepare_command = self.prepare_cmd % kwargs
 
     @property
@@ -66,30 +162,15 @@ class BaseRunner(object):
 
     @property
     def zip_cmd(self):
-        return ' | gzip'
+        return self.codec.compress_cmd
 
     @property
     def unzip_cmd(self):
-        return 'gzip -d -c | '
+        return self.codec.decompress_cmd
 
     @property
     def zip_manifest(self):
-        return '.gz'
-
-    @property
-    def encrypt_cmd(self):
-        return (' | openssl enc -aes-256-cbc -md sha512 -pbkdf2 -iter 10000 '
-                '-salt -pass pass:%s' %
-                self.encrypt_key) if self.encrypt_key else ''
-
-    @property
-    def decrypt_cmd(self):
-        if self.encrypt_key:
-            return ('openssl enc -d -aes-256-cbc -md sha512 -pbkdf2 -iter '
-                    '10000 -salt -pass pass:%s | '
-                    % self.encrypt_key)
-        else:
-            return ''
+        return self.codec.extension
 
     @property
     def encrypt_manifest(self):
@@ -103,6 +184,13 @@ class BaseRunner(object):
                                         preexec_fn=os.setsid)
         self.pid = self.process.pid
 
+        # The backup data is encrypted in process rather than by a separate
+        # command in the pipeline.
+        if self.encrypt_key:
+            self.encryptor = encryption.Encryptor(
+                self.process.stdout, self.encrypt_key,
+                threads=CONF.encryption_threads)
+
     def __enter__(self):
         """Start up the process."""
         self.pre_backup()
@@ -138,11 +226,20 @@ class BaseRunner(object):
         return True
 
     def read(self, chunk_size):
+        if self.encryptor:
+            return self.encryptor.read(chunk_size)
         return self.process.stdout.read(chunk_size)
 
     def get_metadata(self):
-        """Hook for subclasses to get metadata from the backup."""
-        return {}
+        """Hook for subclasses to get metadata from the backup.
+
+        The compression codec is recorded so that the restore can select the
+        decompressor, the encryption format is detected from the data.
+        """
+        metadata = {'compression': self.codec.name}
+        if self.encrypt_key:
+            metadata['encryption'] = encryption.NAME
+        return metadata
 
     def check_process(self):
         """Hook for subclasses to check process for errors."""
@@ -168,8 +265,50 @@ class BaseRunner(object):
         """Hook that is called after the restore command."""
         pass
 
+    def _read_ahead(self, parts, workers):
+        """Download the parts concurrently and yield them in order.
+
+        At most 2 * workers parts are downloaded ahead of the restore
+        process, which bounds the memory used by the read-ahead buffer.
+        """
+        parts = iter(parts)
+        pending = collections.deque()
+
+        with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                for part in itertools.islice(parts, 2 * workers):
+                    pending.append(
+                        executor.submit(self.storage.load_part, part))
+
+                while pending:
+                    data = pending.popleft().result()
+                    part = next(parts, None)
+                    if part is not None:
+                        pending.append(
+                            executor.submit(self.storage.load_part, part))
+                    yield data
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def load_stream(self, location, checksum):
+        """Get an iterable of the backup data chunks from the storage."""
+        workers = CONF.restore_workers
+        if workers > 1:
+            parts = self.storage.load_parts(location, checksum,
+                                            CONF.restore_part_size)
+            if parts is not None:
+                LOG.info('Downloading %s parts with %s workers',
+                         len(parts), workers)
+                return self._read_ahead(parts, workers)
+
+        return self.storage.load(location, checksum)
+
     def unpack(self, location, checksum, command):
-        stream = self.storage.load(location, checksum)
+        stream = self.load_stream(location, checksum)
+        if self.encrypt_key:
+            stream = encryption.decrypt(stream, self.encrypt_key,
+                                        threads=CONF.encryption_threads)
 
         LOG.info('Running restore from stream, command: %s', command)
         self.process = subprocess.Popen(command, shell=True,
@@ -45,7 +45,7 @@ class InnoBackupEx(mysql_base.MySQLBaseRunner):
                self.user_and_pass + ' %s' % self.default_data_dir +
                ' 2>' + self.backup_log
                )
-        return cmd + self.zip_cmd + self.encrypt_cmd
+        return cmd + self.zip_cmd
 
     def check_restore_process(self):
         """Check whether xbstream restore is successful."""
@@ -114,7 +114,7 @@ class InnoBackupExIncremental(InnoBackupEx):
                ' --incremental-lsn=%(lsn)s ' +
                self.user_and_pass + ' %s' % self.default_data_dir +
                ' 2>' + self.backup_log)
-        return cmd + self.zip_cmd + self.encrypt_cmd
+        return cmd + self.zip_cmd
 
     def get_metadata(self):
         _meta = super(InnoBackupExIncremental, self).get_metadata()
@@ -32,7 +32,7 @@ class MariaBackup(mysql_base.MySQLBaseRunner):
     def cmd(self):
         cmd = ('mariabackup --backup --stream=xbstream ' +
                self.user_and_pass + ' 2>' + self.backup_log)
-        return cmd + self.zip_cmd + self.encrypt_cmd
+        return cmd + self.zip_cmd
 
     def check_restore_process(self):
         LOG.debug('Checking return code of mbstream restore process.')
@@ -69,7 +69,7 @@ class MariaBackupIncremental(MariaBackup):
             ' 2>' +
             self.backup_log
         )
-        return cmd + self.zip_cmd + self.encrypt_cmd
+        return cmd + self.zip_cmd
 
     def get_metadata(self):
         meta = super(MariaBackupIncremental, self).get_metadata()
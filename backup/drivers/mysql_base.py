@@ -58,24 +58,25 @@ class MySQLBaseRunner(base.BaseRunner):
 
     def get_metadata(self):
         LOG.debug('Getting metadata for backup %s', self.base_filename)
-        meta = {}
+        meta = super(MySQLBaseRunner, self).get_metadata()
         lsn = re.compile(r"The latest check point \(for incremental\): "
                          r"'(\d+)'")
         with open(self.backup_log, 'r') as backup_log:
             output = backup_log.read()
             match = lsn.search(output)
             if match:
-                meta = {'lsn': match.group(1)}
+                meta['lsn'] = match.group(1)
 
         LOG.info("Updated metadata for backup %s: %s", self.base_filename,
                  meta)
 
         return meta
 
-    def incremental_restore_cmd(self, incremental_dir):
+    def incremental_restore_cmd(self, incremental_dir, codec=None):
         """Return a command for a restore with a incremental location."""
         args = {'restore_location': incremental_dir}
-        return (self.decrypt_cmd + self.unzip_cmd + self.restore_cmd % args)
+        codec = codec or self.codec
+        return codec.decompress_cmd + self.restore_cmd % args
 
     def incremental_prepare_cmd(self, incremental_dir):
         if incremental_dir is not None:
@@ -111,6 +112,8 @@ class MySQLBaseRunner(base.BaseRunner):
         """
         metadata = self.storage.load_metadata(location, checksum)
         incremental_dir = None
+        # Each backup in the chain may be compressed with a different codec.
+        codec = base.get_codec(metadata.get('compression'))
 
         if 'parent_location' in metadata:
             LOG.info("Restoring parent: %(parent_location)s"
@@ -125,11 +128,12 @@ class MySQLBaseRunner(base.BaseRunner):
             # sufficiently unique /var/lib/mysql/<checksum>
             incremental_dir = os.path.join('/var/lib/mysql', checksum)
             os.makedirs(incremental_dir)
-            command = self.incremental_restore_cmd(incremental_dir)
+            command = self.incremental_restore_cmd(incremental_dir, codec)
         else:
             # The parent (full backup) use the same command from InnobackupEx
             # super class and do not set an incremental_dir.
-            command = self.restore_command
+            command = self.incremental_restore_cmd(self.restore_location,
+                                                   codec)
 
         self.restore_content_length += self.unpack(location, checksum, command)
         self.incremental_prepare(incremental_dir)
@@ -39,7 +39,33 @@ cli_opts = [
         choices=['innobackupex', 'xtrabackup', 'mariabackup']
     ),
     cfg.BoolOpt('backup'),
+    cfg.StrOpt(
+        'compression',
+        default='gzip',
+        choices=['gzip', 'pigz', 'zstd', 'lz4'],
+        help='Compression codec of the backup. The codec is saved in the '
+             'backup metadata, restore uses the codec of the backup.'
+    ),
+    cfg.IntOpt(
+        'compression-level',
+        help='Compression level, the default level of the codec is used if '
+             'not specified.'
+    ),
+    cfg.IntOpt(
+        'compression-threads',
+        default=0,
+        min=0,
+        help='Number of compression threads for pigz and zstd, 0 means one '
+             'thread per CPU core.'
+    ),
     cfg.StrOpt('backup-encryption-key'),
+    cfg.IntOpt(
+        'encryption-threads',
+        default=0,
+        min=0,
+        help='Number of threads encrypting or decrypting the backup data, 0 '
+             'means one thread per CPU core.'
+    ),
     cfg.StrOpt('db-user'),
     cfg.StrOpt('db-password'),
     cfg.StrOpt('db-host'),
@@ -48,8 +74,37 @@ cli_opts = [
     cfg.StrOpt('os-tenant-id'),
     cfg.StrOpt('swift-container', default='database_backups'),
     cfg.DictOpt('swift-extra-metadata'),
+    cfg.IntOpt(
+        'swift-segment-size',
+        default=2 * (1024 ** 3),
+        min=2 ** 20,
+        help='Size (in bytes) of each segment of the backup object.'
+    ),
+    cfg.IntOpt(
+        'swift-upload-workers',
+        default=1,
+        min=1,
+        help='Number of segments uploaded to swift concurrently. When more '
+             'than 1, whole segments are buffered in memory, so up to '
+             '(workers + 1) * swift-segment-size bytes may be used.'
+    ),
     cfg.StrOpt('restore-from'),
     cfg.StrOpt('restore-checksum'),
+    cfg.IntOpt(
+        'restore-workers',
+        default=1,
+        min=1,
+        help='Number of parts of the backup downloaded concurrently during '
+             'restore. Up to 2 * restore-workers parts are buffered in '
+             'memory ahead of the restore process.'
+    ),
+    cfg.IntOpt(
+        'restore-part-size',
+        default=64 * (1024 ** 2),
+        min=2 ** 20,
+        help='Size (in bytes) of each part of the backup downloaded during '
+             'restore when restore-workers is greater than 1.'
+    ),
     cfg.BoolOpt('incremental'),
     cfg.StrOpt('parent-location'),
     cfg.StrOpt(
@@ -88,6 +143,9 @@ def stream_backup_to_storage(runner_cls, storage):
             }
         )
 
+    # The backup may use a different codec from its parent.
+    parent_metadata['compression'] = CONF.compression
+
     try:
         with runner_cls(filename=CONF.backup_id, **parent_metadata) as bkup:
             checksum, location = storage.save(
@@ -106,9 +164,14 @@ def stream_restore_from_storage(runner_cls, storage):
     if storage.is_incremental_backup(CONF.restore_from):
         lsn = storage.get_backup_lsn(CONF.restore_from)
 
+    # Backups created before the codec was recorded are compressed by gzip.
+    metadata = storage.load_metadata(CONF.restore_from, CONF.restore_checksum)
+    compression = metadata.get('compression')
+
     try:
         runner = runner_cls(storage=storage, location=CONF.restore_from,
-                            checksum=CONF.restore_checksum, lsn=lsn)
+                            checksum=CONF.restore_checksum, lsn=lsn,
+                            compression=compression)
         restore_size = runner.restore()
         LOG.info('Restore successfully, restore_size: %s', restore_size)
     except Exception as err:
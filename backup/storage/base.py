@@ -32,6 +32,19 @@ class Storage(object):
         Should return an object that provides "read" method.
         """
 
+    def load_parts(self, location, backup_checksum, part_size):
+        """Split the data at the location into independently loadable parts.
+
+        Should return a list of parts in the data order, each of them can be
+        passed to load_part. Return None if the driver doesn't support
+        loading the data in parts.
+        """
+        return None
+
+    def load_part(self, part):
+        """Load the content of a part returned by load_parts."""
+        raise NotImplementedError()
+
     def load_metadata(self, parent_location, parent_checksum):
         """Load metadata for a parent backup.
 
@@ -12,8 +12,10 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+from concurrent import futures
 import hashlib
 import json
+import threading
 
 from keystoneauth1 import session
 from keystoneauth1.identity import v3
@@ -36,11 +38,6 @@ def _get_user_keystone_session(auth_url, token, tenant_id):
     return session.Session(auth=auth, verify=False)
 
 
-def _get_service_client(auth_url, token, tenant_id):
-    sess = _get_user_keystone_session(auth_url, token, tenant_id)
-    return swiftclient.Connection(session=sess)
-
-
 def _set_attr(original):
     """Return a swift friendly header key."""
     key = original.replace('_', '-')
@@ -107,11 +104,126 @@ class StreamReader(object):
         self.segment_length += len(chunk)
         return chunk
 
+    def read_segment(self, chunk_size=2 ** 20):
+        """Read the whole current segment into memory.
+
+        :returns a tuple of (segment name, data, md5 hexdigest). The data is
+                 empty when the stream has been exhausted.
+        """
+        segment = self.segment
+        chunks = []
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+
+        return segment, b''.join(chunks), self.segment_checksum.hexdigest()
+
 
 class SwiftStorage(base.Storage):
     def __init__(self):
-        self.client = _get_service_client(CONF.os_auth_url, CONF.os_token,
-                                          CONF.os_tenant_id)
+        self.session = _get_user_keystone_session(CONF.os_auth_url,
+                                                  CONF.os_token,
+                                                  CONF.os_tenant_id)
+        self.client = swiftclient.Connection(session=self.session)
+        self._local = threading.local()
+
+    @property
+    def thread_client(self):
+        """Swift client owned by the calling thread.
+
+        swiftclient.Connection is not thread safe, so each upload or download
+        worker gets its own connection sharing the same keystone session.
+        """
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = swiftclient.Connection(session=self.session)
+            self._local.client = client
+        return client
+
+    def _verify_segment(self, etag, segment_checksum):
+        """Check the segment MD5 hash against swift etag."""
+        if etag != segment_checksum:
+            msg = ('Failed to upload data segment to swift. ETAG: %(tag)s '
+                   'Segment MD5: %(checksum)s.' %
+                   {'tag': etag, 'checksum': segment_checksum})
+            raise Exception(msg)
+
+    def _upload_segments(self, stream_reader, container):
+        """Stream the segments to swift one at a time."""
+        segment_results = []
+
+        while not stream_reader.end_of_file:
+            LOG.debug('Uploading segment %s.', stream_reader.segment)
+            path = stream_reader.segment_path
+            etag = self.client.put_object(container,
+                                          stream_reader.segment,
+                                          stream_reader)
+
+            segment_checksum = stream_reader.segment_checksum.hexdigest()
+            self._verify_segment(etag, segment_checksum)
+
+            segment_results.append({
+                'path': path,
+                'etag': etag,
+                'size_bytes': stream_reader.segment_length
+            })
+
+        return segment_results
+
+    def _upload_segment(self, container, segment, data, segment_checksum):
+        LOG.debug('Uploading segment %s.', segment)
+        etag = self.thread_client.put_object(container, segment, data,
+                                             content_length=len(data))
+        self._verify_segment(etag, segment_checksum)
+        return etag
+
+    def _upload_segments_parallel(self, stream_reader, container, workers):
+        """Upload the segments to swift with a pool of workers.
+
+        The stream is read one whole segment at a time while the previous
+        segments are being uploaded. At most workers + 1 segments are held in
+        memory, when all of the slots are taken the stream is not read any
+        more, so the backup process blocks on its stdout until a worker
+        finishes.
+        """
+        slots = threading.BoundedSemaphore(workers + 1)
+        pending = []
+
+        def _release(future):
+            slots.release()
+
+        with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                while not stream_reader.end_of_file:
+                    slots.acquire()
+
+                    # Stop reading the stream as soon as any upload fails.
+                    for _, _, future in pending:
+                        if future.done() and future.exception():
+                            raise future.exception()
+
+                    segment, data, checksum = stream_reader.read_segment()
+                    if not data and pending:
+                        slots.release()
+                        break
+
+                    path = '%s/%s' % (container, segment)
+                    future = executor.submit(self._upload_segment, container,
+                                             segment, data, checksum)
+                    future.add_done_callback(_release)
+                    pending.append((path, len(data), future))
+            except BaseException:
+                for _, _, future in pending:
+                    future.cancel()
+                raise
+
+            # The manifest has to list the segments in the stream order.
+            return [{'path': path,
+                     'etag': future.result(),
+                     'size_bytes': size}
+                    for path, size, future in pending]
 
     def save(self, stream, metadata=None, container='database_backups'):
         """Persist data from the stream to swift.
@@ -130,11 +242,9 @@ class SwiftStorage(base.Storage):
         LOG.debug('Ensuring container %s', container)
         self.client.put_container(container)
 
-        # Swift Checksum is the checksum of the concatenated segment checksums
-        swift_checksum = hashlib.md5()
         # Wrap the output of the backup process to segment it for swift
         stream_reader = StreamReader(stream, container, filename,
-                                     2 * (1024 ** 3))
+                                     CONF.swift_segment_size)
 
         url = self.client.url
         # Full location where the backup manifest is stored
@@ -142,32 +252,18 @@ class SwiftStorage(base.Storage):
         LOG.info('Uploading to %s', location)
 
         # Information about each segment upload job
-        segment_results = []
-
-        # Read from the stream and write to the container in swift
-        while not stream_reader.end_of_file:
-            LOG.debug('Uploading segment %s.', stream_reader.segment)
-            path = stream_reader.segment_path
-            etag = self.client.put_object(container,
-                                          stream_reader.segment,
-                                          stream_reader)
-
-            segment_checksum = stream_reader.segment_checksum.hexdigest()
-
-            # Check each segment MD5 hash against swift etag
-            if etag != segment_checksum:
-                msg = ('Failed to upload data segment to swift. ETAG: %(tag)s '
-                       'Segment MD5: %(checksum)s.' %
-                       {'tag': etag, 'checksum': segment_checksum})
-                raise Exception(msg)
-
-            segment_results.append({
-                'path': path,
-                'etag': etag,
-                'size_bytes': stream_reader.segment_length
-            })
+        workers = CONF.swift_upload_workers
+        if workers > 1:
+            LOG.info('Uploading segments with %s workers', workers)
+            segment_results = self._upload_segments_parallel(
+                stream_reader, container, workers)
+        else:
+            segment_results = self._upload_segments(stream_reader, container)
 
-            swift_checksum.update(segment_checksum.encode())
+        # Swift Checksum is the checksum of the concatenated segment checksums
+        swift_checksum = hashlib.md5()
+        for segment_result in segment_results:
+            swift_checksum.update(segment_result['etag'].encode())
 
         # All segments uploaded.
         num_segments = len(segment_results)
@@ -196,6 +292,7 @@ class SwiftStorage(base.Storage):
             self.client.put_object(container,
                                    filename,
                                    manifest_data,
+                                   headers=headers,
                                    query_string='multipart-manifest=put')
 
             # Validation checksum is the Swift Checksum
@@ -259,6 +356,47 @@ class SwiftStorage(base.Storage):
 
         return contents
 
+    def load_parts(self, location, backup_checksum, part_size):
+        """Split the object into byte ranges of at most part_size.
+
+        The segments of a static large object are split separately, so each
+        part can be fetched directly from its segment.
+        """
+        _, container, filename = self._explodeLocation(location)
+        headers = self.client.head_object(container, filename)
+
+        if backup_checksum:
+            self._verify_checksum(headers.get('etag', ''), backup_checksum)
+
+        if headers.get('x-static-large-object', '').lower() == 'true':
+            _, manifest = self.client.get_object(
+                container, filename, query_string='multipart-manifest=get')
+            segments = []
+            for segment in json.loads(manifest):
+                # The segment name is in the format of /container/object
+                seg_container, seg_name = segment['name'].lstrip(
+                    '/').split('/', 1)
+                segments.append((seg_container, seg_name, segment['bytes']))
+        else:
+            segments = [(container, filename,
+                         int(headers.get('content-length', 0)))]
+
+        parts = []
+        for seg_container, seg_name, size in segments:
+            for start in range(0, size, part_size):
+                end = min(start + part_size, size) - 1
+                parts.append({'container': seg_container,
+                              'name': seg_name,
+                              'range': 'bytes=%d-%d' % (start, end)})
+        return parts
+
+    def load_part(self, part):
+        """Get a byte range of an object."""
+        _, contents = self.thread_client.get_object(
+            part['container'], part['name'],
+            headers={'Range': part['range']})
+        return contents
+
     def load_metadata(self, parent_location, parent_checksum):
         """Load metadata from swift."""
         if not parent_location:
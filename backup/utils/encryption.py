@@ -0,0 +1,247 @@
+# Copyright 2020 Catalyst Cloud
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""In-process streaming encryption of the backup data.
+
+New backups are encrypted with AES-256-GCM over framed chunks:
+
+    header: MAGIC | iterations (4) | chunk size (4) | salt (16)
+    frame:  ciphertext length (4) | ciphertext with the GCM tag
+
+The key is derived from the passphrase with PBKDF2-HMAC-SHA512. The nonce of
+each frame is its sequence number plus a flag set only on the final frame,
+which has no plaintext, so a truncated backup can't be decrypted without an
+error. The header is the associated data of every frame.
+
+Backups encrypted by "openssl enc -aes-256-cbc -md sha512 -pbkdf2" are still
+decrypted, the format is detected by the magic of the stream.
+"""
+
+import collections
+from concurrent import futures
+import os
+import struct
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers import aead
+from cryptography.hazmat.primitives.ciphers import algorithms
+from cryptography.hazmat.primitives.ciphers import Cipher
+from cryptography.hazmat.primitives.ciphers import modes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives import padding
+
+NAME = 'aes-256-gcm'
+MAGIC = b'TROVEGCM'
+OPENSSL_MAGIC = b'Salted__'
+ITERATIONS = 10000
+CHUNK_SIZE = 2 ** 20
+SALT_SIZE = 16
+TAG_SIZE = 16
+HEADER = struct.Struct('>8sII%ds' % SALT_SIZE)
+FRAME = struct.Struct('>I')
+
+
+def _derive_key(passphrase, salt, iterations, length):
+    kdf = PBKDF2HMAC(algorithm=hashes.SHA512(), length=length, salt=salt,
+                     iterations=iterations, backend=default_backend())
+    return kdf.derive(passphrase.encode())
+
+
+def _nonce(sequence, final=False):
+    return struct.pack('>QI', sequence, 1 if final else 0)
+
+
+def _threads(threads):
+    # 0 means one thread per CPU core.
+    return threads or os.cpu_count() or 1
+
+
+class Encryptor(object):
+    """Wrap a stream and encrypt it in chunks with a pool of threads.
+
+    Up to 2 * threads chunks are encrypted ahead of the reader.
+    """
+
+    def __init__(self, stream, passphrase, threads=0, chunk_size=CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.threads = _threads(threads)
+
+        salt = os.urandom(SALT_SIZE)
+        self.header = HEADER.pack(MAGIC, ITERATIONS, chunk_size, salt)
+        self.cipher = aead.AESGCM(
+            _derive_key(passphrase, salt, ITERATIONS, 32))
+
+        self.sequence = 0
+        self.end_of_file = False
+        self.buffer = bytearray(self.header)
+        self.pending = collections.deque()
+        self.executor = futures.ThreadPoolExecutor(max_workers=self.threads)
+
+    def _encrypt(self, sequence, data, final=False):
+        ciphertext = self.cipher.encrypt(_nonce(sequence, final), data,
+                                         self.header)
+        return FRAME.pack(len(ciphertext)) + ciphertext
+
+    def _submit(self):
+        while not self.end_of_file and len(self.pending) < 2 * self.threads:
+            data = self.stream.read(self.chunk_size)
+            if not data:
+                self.end_of_file = True
+                data = b''
+                final = True
+            else:
+                final = False
+
+            self.pending.append(self.executor.submit(
+                self._encrypt, self.sequence, data, final))
+            self.sequence += 1
+
+    def read(self, chunk_size):
+        while len(self.buffer) < chunk_size:
+            self._submit()
+            if not self.pending:
+                break
+            self.buffer += self.pending.popleft().result()
+
+        if not self.pending and self.end_of_file:
+            self.executor.shutdown(wait=False)
+
+        data = bytes(self.buffer[:chunk_size])
+        del self.buffer[:chunk_size]
+        return data
+
+
+class _ChunkReader(object):
+    """Read exact sizes of data from an iterable of chunks."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = bytearray()
+
+    def peek(self, size):
+        while len(self.buffer) < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer += chunk
+
+        return bytes(self.buffer[:size])
+
+    def read(self, size):
+        data = self.peek(size)
+        del self.buffer[:size]
+        return data
+
+    def remaining(self):
+        if self.buffer:
+            yield bytes(self.buffer)
+            self.buffer.clear()
+        for chunk in self.chunks:
+            yield chunk
+
+
+def _decrypt_gcm(reader, passphrase, threads):
+    header = reader.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise Exception('Encrypted backup header is truncated')
+    _, iterations, chunk_size, salt = HEADER.unpack(header)
+    cipher = aead.AESGCM(_derive_key(passphrase, salt, iterations, 32))
+
+    def _decrypt(sequence, ciphertext):
+        final = len(ciphertext) == TAG_SIZE
+        return final, cipher.decrypt(_nonce(sequence, final), ciphertext,
+                                     header)
+
+    threads = _threads(threads)
+    pending = collections.deque()
+    sequence = 0
+    end_of_frames = False
+
+    with futures.ThreadPoolExecutor(max_workers=threads) as executor:
+        try:
+            while not end_of_frames or pending:
+                while not end_of_frames and len(pending) < 2 * threads:
+                    length = reader.read(FRAME.size)
+                    if not length:
+                        end_of_frames = True
+                        break
+                    if len(length) != FRAME.size:
+                        raise Exception('Encrypted backup is truncated')
+
+                    # A corrupted length must not make the whole rest of the
+                    # stream be buffered as one frame.
+                    length = FRAME.unpack(length)[0]
+                    if not TAG_SIZE <= length <= chunk_size + TAG_SIZE:
+                        raise Exception('Invalid frame length %d in the '
+                                        'encrypted backup' % length)
+                    ciphertext = reader.read(length)
+                    if len(ciphertext) != length:
+                        raise Exception('Encrypted backup is truncated')
+                    pending.append(
+                        executor.submit(_decrypt, sequence, ciphertext))
+                    sequence += 1
+                    # Only the final frame has no plaintext.
+                    end_of_frames = length == TAG_SIZE
+
+                if not pending:
+                    break
+
+                final, data = pending.popleft().result()
+                if final:
+                    if reader.read(1):
+                        raise Exception('Unexpected data after the final '
+                                        'frame of the encrypted backup')
+                    return
+                yield data
+        finally:
+            for future in pending:
+                future.cancel()
+
+    raise Exception('Encrypted backup is truncated')
+
+
+def _decrypt_openssl(reader, passphrase):
+    """Decrypt the output of openssl enc -aes-256-cbc -md sha512 -pbkdf2."""
+    header = reader.read(len(OPENSSL_MAGIC) + 8)
+    salt = header[len(OPENSSL_MAGIC):]
+    key_iv = _derive_key(passphrase, salt, ITERATIONS, 48)
+    decryptor = Cipher(algorithms.AES(key_iv[:32]), modes.CBC(key_iv[32:]),
+                       backend=default_backend()).decryptor()
+    unpadder = padding.PKCS7(algorithms.AES.block_size).unpadder()
+
+    for chunk in reader.remaining():
+        data = unpadder.update(decryptor.update(chunk))
+        if data:
+            yield data
+
+    data = unpadder.update(decryptor.finalize()) + unpadder.finalize()
+    if data:
+        yield data
+
+
+def decrypt(chunks, passphrase, threads=0):
+    """Decrypt an iterable of backup data chunks.
+
+    :returns a generator of the plaintext chunks in order.
+    """
+    reader = _ChunkReader(chunks)
+    magic = reader.peek(len(MAGIC))
+
+    if magic == MAGIC:
+        return _decrypt_gcm(reader, passphrase, threads)
+    if magic == OPENSSL_MAGIC:
+        return _decrypt_openssl(reader, passphrase)
+    raise Exception('Unknown encryption format of the backup')
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# Copyright 2020 Catalyst Cloud
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""Compare the backup compression codecs on a synthetic InnoDB-like dataset.
+
+Usage: python tools/benchmarks/backup_compression.py [size_mb] [threads]
+
+The dataset is made of 16 KiB pages with a page header, rows of typical
+column values (auto increment ids, timestamps, short strings and some
+random payload) and zero filled free space. Codecs whose binaries are not
+installed are skipped.
+"""
+
+import os
+import random
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.normpath(
+    os.path.join(os.path.abspath(__file__), os.pardir, os.pardir, os.pardir)))
+
+from oslo_config import cfg  # noqa: E402
+
+from backup import main  # noqa: E402
+
+cfg.CONF.register_cli_opts(main.cli_opts)
+
+from backup.drivers import base  # noqa: E402
+
+PAGE_SIZE = 16 * 1024
+WORDS = [b'active', b'pending', b'deleted', b'customer', b'order', b'invoice',
+         b'shipped', b'paid', b'refund', b'europe', b'asia', b'america']
+
+
+def generate_page(page_no, rnd):
+    header = struct.pack('>IIQQ', rnd.getrandbits(32), page_no,
+                         page_no * 16384, rnd.getrandbits(64))
+    rows = []
+    row_id = page_no * 100
+    # InnoDB pages are usually filled to about 70%
+    while sum(len(r) for r in rows) < PAGE_SIZE * 0.7:
+        row_id += 1
+        rows.append(struct.pack('>QI', row_id, 1577836800 + row_id) +
+                    b' '.join(rnd.choice(WORDS) for _ in range(4)) +
+                    bytes(rnd.getrandbits(8) for _ in range(24)))
+    body = b''.join(rows)
+    page = header + body
+    return page + b'\0' * (PAGE_SIZE - len(page))
+
+
+def generate_dataset(path, size):
+    rnd = random.Random(42)
+    with open(path, 'wb') as f:
+        for page_no in range(size // PAGE_SIZE):
+            f.write(generate_page(page_no, rnd))
+
+
+def run(cmd, src, dst):
+    start = time.time()
+    with open(src, 'rb') as stdin, open(dst, 'wb') as stdout:
+        subprocess.check_call(cmd, shell=True, stdin=stdin, stdout=stdout)
+    return time.time() - start
+
+
+def bench():
+    size = (int(sys.argv[1]) if len(sys.argv) > 1 else 256) * 1024 ** 2
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+    workdir = tempfile.mkdtemp()
+    try:
+        data = os.path.join(workdir, 'ibdata')
+        generate_dataset(data, size)
+        size = os.path.getsize(data)
+        print('Dataset: %d MiB' % (size // 1024 ** 2))
+        print('%-6s %8s %14s %16s' % ('codec', 'ratio', 'compress MB/s',
+                                      'decompress MB/s'))
+
+        for name in sorted(base.CODECS):
+            codec = base.get_codec(name, threads=threads)
+            if not shutil.which(name):
+                print('%-6s skipped, %s is not installed' % (name, name))
+                continue
+
+            compressed = os.path.join(workdir, 'ibdata' + codec.extension)
+            compress = run(codec.compress_cmd.lstrip(' |'), data, compressed)
+            decompress = run(codec.decompress_cmd.rstrip(' |'), compressed,
+                             os.devnull)
+            print('%-6s %8.2f %14.1f %16.1f' %
+                  (name, size / os.path.getsize(compressed),
+                   size / compress / 1000 ** 2,
+                   size / decompress / 1000 ** 2))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    bench()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# Copyright 2020 Catalyst Cloud
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""Benchmark the backup segment uploader against a local fake swift.
+
+Usage: python tools/benchmarks/backup_swift_upload.py [size_mb] [segment_mb]
+
+Each fake swift connection is throttled to a fixed bandwidth, so the result
+shows how well the uploader overlaps reading the backup stream with several
+concurrent segment uploads.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.normpath(
+    os.path.join(os.path.abspath(__file__), os.pardir, os.pardir, os.pardir)))
+
+from oslo_config import cfg  # noqa: E402
+
+from backup import main  # noqa: E402
+from backup.storage import swift  # noqa: E402
+
+CONF = cfg.CONF
+# Bandwidth of a single fake swift connection in bytes/s.
+CONNECTION_BANDWIDTH = 50 * 1024 ** 2
+BLOCK = os.urandom(2 ** 20)
+
+
+class FakeSwiftConnection(object):
+    objects = {}
+
+    def __init__(self, *args, **kwargs):
+        self.url = 'http://fake-swift/v1/AUTH_bench'
+
+    def put_container(self, container):
+        pass
+
+    def put_object(self, container, name, contents, content_length=None,
+                   query_string=None, headers=None):
+        if query_string == 'multipart-manifest=put':
+            segments = json.loads(contents)
+            checksum = hashlib.md5()
+            for segment in segments:
+                checksum.update(segment['etag'].encode())
+            self.objects[name] = checksum.hexdigest()
+            return hashlib.md5(contents.encode()).hexdigest()
+
+        if headers and 'X-Copy-From' in headers:
+            source = headers['X-Copy-From'].split('/')[-1]
+            self.objects[name] = self.objects[source]
+            return self.objects[name]
+
+        checksum = hashlib.md5()
+        start = time.time()
+        length = 0
+        if isinstance(contents, bytes):
+            checksum.update(contents)
+            length = len(contents)
+        else:
+            while True:
+                chunk = contents.read(2 ** 16)
+                if not chunk:
+                    break
+                checksum.update(chunk)
+                length += len(chunk)
+        # Throttle the connection to the simulated bandwidth.
+        delay = length / CONNECTION_BANDWIDTH - (time.time() - start)
+        if delay > 0:
+            time.sleep(delay)
+
+        self.objects[name] = checksum.hexdigest()
+        return self.objects[name]
+
+    def delete_object(self, container, name):
+        self.objects.pop(name, None)
+
+    def head_object(self, container, name):
+        return {'etag': '"%s"' % self.objects[name]}
+
+
+class FakeBackupStream(object):
+    manifest = 'bench.xbstream.gz'
+
+    def __init__(self, size):
+        self.remaining = size
+
+    def read(self, chunk_size):
+        chunk_size = min(chunk_size, self.remaining, len(BLOCK))
+        self.remaining -= chunk_size
+        return BLOCK[:chunk_size]
+
+    def get_metadata(self):
+        return {}
+
+
+def run(size, segment_size, workers):
+    CONF.set_override('swift_segment_size', segment_size)
+    CONF.set_override('swift_upload_workers', workers)
+
+    with mock.patch.object(swift, '_get_user_keystone_session'), \
+            mock.patch.object(swift.swiftclient, 'Connection',
+                              FakeSwiftConnection):
+        storage = swift.SwiftStorage()
+        start = time.time()
+        storage.save(FakeBackupStream(size), metadata={})
+        return time.time() - start
+
+
+def bench():
+    size = int(sys.argv[1]) * 1024 ** 2 if len(sys.argv) > 1 else 2 ** 30
+    segment_size = (int(sys.argv[2]) * 1024 ** 2 if len(sys.argv) > 2
+                    else 64 * 1024 ** 2)
+
+    CONF.register_cli_opts(main.cli_opts)
+    CONF([], project='trove-backup')
+
+    print('Uploading %d MiB in %d MiB segments, %d MiB/s per connection' %
+          (size // 1024 ** 2, segment_size // 1024 ** 2,
+           CONNECTION_BANDWIDTH // 1024 ** 2))
+    for workers in (1, 4, 8):
+        elapsed = run(size, segment_size, workers)
+        print('workers=%d: %.2fs, %.3f GB/s' %
+              (workers, elapsed, size / elapsed / 1000 ** 3))
+
+
+if __name__ == '__main__':
+    bench()
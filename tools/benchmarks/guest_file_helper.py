@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# Copyright 2020 Catalyst Cloud
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""Compare the sudo command per operation with the privileged file helper.
+
+Usage: python tools/benchmarks/guest_file_helper.py [revisions]
+
+A MySQL configuration with the given number of override revisions is
+written and parsed by a ConfigurationManager that requires root, first
+running a sudo command for each file operation, then with the privileged
+file helper. The number of processes spawned and the latency are reported.
+
+When run as root without sudo installed, a sudo shim that just executes
+its arguments is put on the PATH.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.normpath(
+    os.path.join(os.path.abspath(__file__), os.pardir, os.pardir, os.pardir)))
+
+from trove.common import cfg  # noqa: E402
+from trove.common import stream_codecs  # noqa: E402
+from trove.common import utils  # noqa: E402
+from trove.guestagent.common import configuration  # noqa: E402
+from trove.guestagent.common import file_helper  # noqa: E402
+from trove.guestagent.common import operating_system  # noqa: E402
+
+CONF = cfg.CONF
+BASE_CONFIG = {
+    'mysqld': {'datadir': '/var/lib/mysql', 'max_connections': 100,
+               'innodb_buffer_pool_size': '128M', 'port': 3306},
+    'client': {'port': 3306},
+}
+
+
+def install_sudo_shim(workdir):
+    if shutil.which('sudo'):
+        return
+    shim = os.path.join(workdir, 'sudo')
+    with open(shim, 'w') as fp:
+        fp.write('#!/bin/sh\n'
+                 'while [ "${1#-}" != "$1" ]; do shift; done\n'
+                 'exec "$@"\n')
+    os.chmod(shim, 0o755)
+    os.environ['PATH'] = workdir + os.pathsep + os.environ['PATH']
+
+
+def run(workdir, revisions, use_helper):
+    CONF.set_override('guest_file_helper', use_helper)
+    operating_system._FILE_HELPER = None
+    operating_system._FILE_HELPER_DISABLED = False
+    config_dir = tempfile.mkdtemp(dir=workdir)
+    config_path = os.path.join(config_dir, 'my.cnf')
+    user = os.environ.get('USER') or 'root'
+    codec = stream_codecs.IniCodec()
+    with open(config_path, 'w') as fp:
+        fp.write(codec.serialize(BASE_CONFIG))
+
+    processes = []
+    execute = utils.execute_with_timeout
+    popen = file_helper.subprocess.Popen
+
+    def _execute(*args, **kwargs):
+        processes.append(args)
+        return execute(*args, **kwargs)
+
+    def _popen(*args, **kwargs):
+        processes.append(args)
+        return popen(*args, **kwargs)
+
+    with mock.patch.object(utils, 'execute_with_timeout', _execute), \
+            mock.patch.object(file_helper.subprocess, 'Popen', _popen):
+        manager = configuration.ConfigurationManager(
+            config_path, user, user, codec, requires_root=True,
+            override_strategy=configuration.ImportOverrideStrategy(
+                os.path.join(config_dir, 'conf.d'), 'cnf'))
+
+        start = time.time()
+        for i in range(revisions):
+            manager.apply_user_override(
+                {'mysqld': {'max_connections': 100 + i,
+                            'option_%d' % i: i}}, change_id='change%d' % i)
+        apply_time = time.time() - start
+        apply_processes = len(processes)
+
+        start = time.time()
+        options = manager.parse_configuration()
+        parse_time = time.time() - start
+        parse_processes = len(processes) - apply_processes
+
+    assert options['mysqld']['max_connections'] == 100 + revisions - 1
+    if operating_system._FILE_HELPER:
+        operating_system._FILE_HELPER.stop()
+    return apply_time, apply_processes, parse_time, parse_processes
+
+
+def bench():
+    revisions = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    CONF([], project='trove')
+
+    workdir = tempfile.mkdtemp()
+    try:
+        install_sudo_shim(workdir)
+        print('%d override revisions' % revisions)
+        for name, use_helper in (('sudo per call', False),
+                                 ('file helper', True)):
+            apply_time, apply_processes, parse_time, parse_processes = run(
+                workdir, revisions, use_helper)
+            print('%-14s apply: %.3fs, %d processes; '
+                  'parse: %.3fs, %d processes' %
+                  (name, apply_time, apply_processes, parse_time,
+                   parse_processes))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    bench()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Benchmark the instance list path with fake Nova and Neutron clients.
+
+Usage: python tools/benchmarks/instance_list.py [instances] [latency_ms]
+
+The instances are created in a temporary sqlite database, every fake client
+call sleeps for the given latency. The number of remote calls, database
+queries and the latency of Instances.load are reported for several page
+sizes.
+"""
+
+import collections
+import os
+import shutil
+import sys
+import tempfile
+import time
+from unittest import mock
+import uuid
+
+import eventlet
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.normpath(
+    os.path.join(os.path.abspath(__file__), os.pardir, os.pardir, os.pardir)))
+
+from trove.common import cfg  # noqa: E402
+from trove.common import clients  # noqa: E402
+from trove.common import context as trove_context  # noqa: E402
+from trove.datastore import models as datastore_models  # noqa: E402
+from trove.db import get_db_api  # noqa: E402
+from trove.db.sqlalchemy import session  # noqa: E402
+from trove.instance import models  # noqa: E402
+from trove.instance.service_status import ServiceStatuses  # noqa: E402
+from trove.instance.tasks import InstanceTasks  # noqa: E402
+
+CONF = cfg.CONF
+CALLS = collections.Counter()
+
+
+class FakeClient(object):
+    def __init__(self, latency, servers, ports):
+        self.latency = latency
+        self.servers = self
+        self._servers = servers
+        self._ports = ports
+
+    def _call(self, name):
+        CALLS[name] += 1
+        eventlet.sleep(self.latency)
+
+    def list(self):
+        self._call('nova.servers.list')
+        return self._servers
+
+    def get(self, server_id):
+        self._call('nova.servers.get')
+        return [s for s in self._servers if s.id == server_id][0]
+
+    def list_ports(self, device_id=None):
+        self._call('neutron.list_ports')
+        if not isinstance(device_id, list):
+            device_id = [device_id]
+        return {'ports': [p for p in self._ports
+                          if p['device_id'] in device_id]}
+
+    def list_floatingips(self, port_id=None):
+        self._call('neutron.list_floatingips')
+        return {'floatingips': []}
+
+
+def setup_db(path, count):
+    CONF.set_override('connection', 'sqlite:///%s' % path, 'database')
+    get_db_api().db_sync(CONF)
+    session.configure_db(CONF)
+
+    datastore = datastore_models.DBDatastore.create(
+        id=str(uuid.uuid4()), name='mysql')
+    version = datastore_models.DBDatastoreVersion.create(
+        id=str(uuid.uuid4()), datastore_id=datastore.id, name='5.7',
+        manager='mysql', image_id='image_id', packages='', active=True)
+
+    tenant_id = str(uuid.uuid4())
+    servers = []
+    ports = []
+    for i in range(count):
+        db_info = models.DBInstance.create(
+            name='instance-%s' % i, flavor_id=1, tenant_id=tenant_id,
+            volume_size=1, compute_instance_id='server-%s' % i,
+            datastore_version_id=version.id, task_status=InstanceTasks.NONE)
+        models.InstanceServiceStatus.create(
+            instance_id=db_info.id, status=ServiceStatuses.HEALTHY)
+        servers.append(mock.Mock(id='server-%s' % i, status='ACTIVE'))
+        ports.append({'id': 'port-%s' % i, 'device_id': 'server-%s' % i,
+                      'description': '',
+                      'fixed_ips': [{'ip_address': '10.0.0.1'}]})
+    return tenant_id, servers, ports
+
+
+def bench():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    latency = (int(sys.argv[2]) if len(sys.argv) > 2 else 20) / 1000.0
+
+    workdir = tempfile.mkdtemp()
+    try:
+        run(os.path.join(workdir, 'trove.db'), count, latency)
+    finally:
+        shutil.rmtree(workdir)
+
+
+def run(path, count, latency):
+    tenant_id, servers, ports = setup_db(path, count)
+    client = FakeClient(latency, servers, ports)
+
+    engine = session.get_engine()
+    event.listen(engine, 'before_cursor_execute',
+                 lambda *args: CALLS.update(['db.query']))
+
+    print('%d instances, %d ms per remote call' % (count, latency * 1000))
+    with mock.patch.object(clients, 'create_nova_client',
+                           return_value=client), \
+            mock.patch.object(clients, 'create_neutron_client',
+                              return_value=client):
+        for page_size in (20, 100, count):
+            models.Instances.DEFAULT_LIMIT = page_size
+            context = trove_context.TroveContext(project_id=tenant_id,
+                                                 limit=page_size)
+            CALLS.clear()
+            start = time.time()
+            instances, _ = models.Instances.load(context, False)
+            elapsed = time.time() - start
+            print('page=%d: %.3fs, %s' % (
+                len(instances), elapsed,
+                ', '.join('%s=%d' % item for item in sorted(CALLS.items()))))
+
+
+if __name__ == '__main__':
+    bench()
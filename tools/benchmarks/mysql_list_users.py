@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# Copyright 2020 Catalyst Cloud
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""Benchmark BaseMySqlAdmin.list_users against a database.
+
+Usage: python tools/benchmarks/mysql_list_users.py [users] [databases] [url]
+
+Without a url, an in-memory SQLite database stands in for MySQL: the
+mysql.user and information_schema.SCHEMA_PRIVILEGES tables are created in
+attached databases and filled with the given number of users, each granted
+access to the given number of databases. With the url of a MySQL or MariaDB
+server, its existing users and grants are listed. The number of queries
+and the latency are reported for several page sizes.
+"""
+
+import collections
+import os
+import sys
+import time
+from unittest import mock
+
+import sqlalchemy
+from sqlalchemy import event
+from sqlalchemy import pool
+
+sys.path.insert(0, os.path.normpath(
+    os.path.join(os.path.abspath(__file__), os.pardir, os.pardir, os.pardir)))
+
+from trove.guestagent.datastore.mysql_common import service  # noqa: E402
+
+STATS = collections.Counter()
+
+
+def create_sqlite_engine(users, databases):
+    engine = sqlalchemy.create_engine('sqlite://',
+                                      poolclass=pool.StaticPool)
+
+    @event.listens_for(engine, 'connect')
+    def connect(dbapi_connection, connection_record):
+        dbapi_connection.create_function(
+            'CONCAT', -1, lambda *args: ''.join(args))
+
+    conn = engine.connect()
+    conn.execute("ATTACH DATABASE ':memory:' AS mysql")
+    conn.execute("ATTACH DATABASE ':memory:' AS information_schema")
+    conn.execute("CREATE TABLE mysql.user (User TEXT, Host TEXT)")
+    conn.execute("CREATE TABLE information_schema.SCHEMA_PRIVILEGES "
+                 "(grantee TEXT, table_schema TEXT, privilege_type TEXT)")
+    conn.execute("CREATE INDEX information_schema.grantee_idx ON "
+                 "SCHEMA_PRIVILEGES (grantee)")
+
+    conn.execute(sqlalchemy.text(
+        "INSERT INTO mysql.user VALUES (:user, '%')"),
+        [{'user': 'user%05d' % i} for i in range(users)])
+    privileges = []
+    for i in range(users):
+        grantee = "'user%05d'@'%%'" % i
+        privileges.append({'grantee': grantee, 'schema': 'db%05d' % i,
+                           'type': 'USAGE'})
+        for j in range(databases):
+            for privilege in ('SELECT', 'INSERT', 'UPDATE', 'DELETE'):
+                privileges.append({'grantee': grantee,
+                                   'schema': 'db%05d' % ((i + j) % users),
+                                   'type': privilege})
+    conn.execute(sqlalchemy.text(
+        "INSERT INTO information_schema.SCHEMA_PRIVILEGES VALUES "
+        "(:grantee, :schema, :type)"), privileges)
+    conn.close()
+    return engine
+
+
+def count(conn, cursor, statement, parameters, context, executemany):
+    if statement.startswith('SELECT'):
+        STATS['queries'] += 1
+    elif conn.dialect.name == 'sqlite' and statement.startswith('FLUSH'):
+        # SQLite has no privileges to flush.
+        statement = 'SELECT NULL'
+    return statement, parameters
+
+
+def bench():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    databases = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    url = sys.argv[3] if len(sys.argv) > 3 else None
+
+    if url:
+        engine = sqlalchemy.create_engine(url)
+        print('Listing the users of %s' % engine.url)
+    else:
+        engine = create_sqlite_engine(users, databases)
+        print('%d users with %d databases each (SQLite)' %
+              (users, databases))
+    event.listen(engine, 'before_cursor_execute', count, retval=True)
+
+    app = mock.Mock(get_engine=mock.Mock(return_value=engine))
+    admin = service.BaseMySqlAdmin(mock.Mock(), app)
+
+    with mock.patch.object(service.cfg, 'get_ignored_users',
+                           return_value=['os_admin']):
+        for limit in (20, 100, None):
+            STATS.clear()
+            start = time.time()
+            page, _ = admin.list_users(limit=limit)
+            elapsed = time.time() - start
+            print('page=%d: %.3fs, %d queries' %
+                  (len(page), elapsed, STATS['queries']))
+
+        STATS.clear()
+        start = time.time()
+        admin.get_user(page[-1]['_name'], page[-1]['_host'])
+        print('get_user: %.3fs, %d queries' %
+              (time.time() - start, STATS['queries']))
+
+
+if __name__ == '__main__':
+    bench()
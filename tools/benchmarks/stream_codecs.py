@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# Copyright 2020 Catalyst Cloud
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""Benchmark the configuration codecs of trove.common.stream_codecs.
+
+Usage: python tools/benchmarks/stream_codecs.py [seconds]
+
+Synthetic Ini, KeyValue and Properties files from 1 KiB to 10 MiB are
+parsed from a string and from an open file, and serialized to a string and
+to an open file. The operations per second and the peak memory allocated by
+one operation are reported, each operation is repeated for at least the
+given number of seconds (0.5 by default).
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.normpath(
+    os.path.join(os.path.abspath(__file__), os.pardir, os.pardir, os.pardir)))
+
+from trove.common import stream_codecs  # noqa: E402
+
+SIZES = [1024, 64 * 1024, 1024 ** 2, 10 * 1024 ** 2]
+WORDS = ['innodb', 'buffer', 'pool', 'size', 'log', 'file', 'max',
+         'connections', 'query', 'cache', 'thread', 'timeout', 'table']
+
+
+def _name(rnd):
+    return '_'.join(rnd.choice(WORDS) for _ in range(3))
+
+
+def _value(rnd):
+    return rnd.choice([str(rnd.randint(0, 100000)), 'ON', 'OFF',
+                       '%dM' % rnd.randint(1, 512), '/var/lib/mysql',
+                       "'%s'" % _name(rnd)])
+
+
+def generate_ini(size, rnd):
+    lines = []
+    length = 0
+    section = 0
+    while length < size:
+        line = ('[section_%d]' % section if len(lines) % 50 == 0 else
+                '%s_%d = %s' % (_name(rnd), len(lines), _value(rnd)))
+        if line.startswith('['):
+            section += 1
+        lines.append(line)
+        length += len(line) + 1
+    return '\n'.join(lines) + '\n'
+
+
+def generate_key_value(size, rnd):
+    lines = []
+    length = 0
+    while length < size:
+        line = '%s_%d=%s' % (_name(rnd), len(lines), _value(rnd))
+        lines.append(line)
+        length += len(line) + 1
+    return '\n'.join(lines) + '\n'
+
+
+def generate_properties(size, rnd):
+    lines = []
+    length = 0
+    while length < size:
+        line = '%s_%d %s %s' % (_name(rnd), len(lines), _value(rnd),
+                                _value(rnd))
+        lines.append(line)
+        length += len(line) + 1
+    return '\n'.join(lines) + '\n'
+
+
+CODECS = [
+    ('ini', stream_codecs.IniCodec(), generate_ini),
+    ('keyvalue', stream_codecs.KeyValueCodec(), generate_key_value),
+    ('properties', stream_codecs.PropertiesCodec(), generate_properties),
+]
+
+
+def measure(func, duration):
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    count = 0
+    start = time.time()
+    while True:
+        func()
+        count += 1
+        elapsed = time.time() - start
+        if elapsed >= duration:
+            return count / elapsed, peak
+
+
+def _read_from(codec, path):
+    with open(path, 'r') as fp:
+        return codec.deserialize_from(fp)
+
+
+def _write_to(codec, data, path):
+    with open(path, 'w') as fp:
+        codec.serialize_to(data, fp)
+
+
+def bench():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 0.5
+
+    workdir = tempfile.mkdtemp()
+    try:
+        run(workdir, duration)
+    finally:
+        shutil.rmtree(workdir)
+
+
+def run(workdir, duration):
+    rnd = random.Random(42)
+    source = os.path.join(workdir, 'source')
+    target = os.path.join(workdir, 'target')
+
+    print('%-10s %6s %-16s %12s %12s' % ('codec', 'size', 'operation',
+                                         'ops/s', 'peak KiB'))
+    for name, codec, generate in CODECS:
+        for size in SIZES:
+            text = generate(size, rnd)
+            with open(source, 'w') as fp:
+                fp.write(text)
+            data = codec.deserialize(text)
+            operations = [
+                ('deserialize', lambda: codec.deserialize(text)),
+                ('deserialize_from', lambda: _read_from(codec, source)),
+                ('serialize', lambda: codec.serialize(data)),
+                ('serialize_to', lambda: _write_to(codec, data, target)),
+            ]
+            for operation, func in operations:
+                ops, peak = measure(func, duration)
+                print('%-10s %6s %-16s %12.1f %12.1f' % (
+                    name, '%dK' % (size // 1024), operation, ops,
+                    peak / 1024.0))
+
+
+if __name__ == '__main__':
+    bench()
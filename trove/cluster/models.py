@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
+
 import six
 
 from oslo_log import log as logging
@@ -421,6 +423,19 @@ class Cluster(object):
         raise exception.BadRequest(
             _("Action 'configuration_attach' not supported"))
 
+    def _rolling_map(self, func, instances):
+        """Call func on the nodes, the nodes of a batch at the same time.
+
+        A batch has up to cluster_rolling_batch_size nodes, at most one of
+        each rolling_node_group.
+        """
+        for batch in utils.rolling_batches(
+                instances, CONF.cluster_rolling_batch_size,
+                rolling_node_group):
+            for instance, result in utils.map_concurrently(func, batch):
+                if isinstance(result, Exception):
+                    raise result
+
     def rolling_configuration_update(self, configuration_id,
                                      apply_on_all=True):
         cluster_notification = self.context.notification
@@ -433,26 +448,28 @@ class Cluster(object):
             instances = [inst_models.Instance.load(self.context, instance.id)
                          for instance in self.instances]
 
-            LOG.debug("Persisting changes on cluster nodes.")
-            # Allow re-applying the same configuration (e.g. on configuration
-            # updates).
-            for instance in instances:
-                if not (instance.configuration and
+            def _save_configuration(instance):
+                # Allow re-applying the same configuration (e.g. on
+                # configuration updates).
+                if (instance.configuration and
                         instance.configuration.id != configuration_id):
-                    self.context.notification = (
-                        DBaaSInstanceAttachConfiguration(self.context,
-                                                         **request_info))
-                    with StartNotification(self.context,
-                                           instance_id=instance.id,
-                                           configuration_id=configuration_id):
-                        with EndNotification(self.context):
-                            instance.save_configuration(configuration)
-                else:
                     LOG.debug(
                         "Node '%(inst_id)s' already has the configuration "
                         "'%(conf_id)s' attached.",
                         {'inst_id': instance.id,
                          'conf_id': instance.configuration.id})
+                    return
+                context = copy.copy(self.context)
+                context.notification = (
+                    DBaaSInstanceAttachConfiguration(context, **request_info))
+                with StartNotification(context,
+                                       instance_id=instance.id,
+                                       configuration_id=configuration_id):
+                    with EndNotification(context):
+                        instance.save_configuration(configuration)
+
+            LOG.debug("Persisting changes on cluster nodes.")
+            self._rolling_map(_save_configuration, instances)
 
             # Configuration has been persisted to all instances.
             # The cluster is in a consistent state with all nodes
@@ -470,8 +487,10 @@ class Cluster(object):
                 if apply_on_all:
                     LOG.debug(
                         "Applying the changes to the remaining nodes.")
-                    for instance in remaining_nodes:
-                        instance.apply_configuration(configuration)
+                    self._rolling_map(
+                        lambda instance: instance.apply_configuration(
+                            configuration),
+                        remaining_nodes)
                 else:
                     LOG.debug(
                         "Releasing restart-required task on the remaining "
@@ -497,20 +516,21 @@ class Cluster(object):
             instances = [inst_models.Instance.load(self.context, instance.id)
                          for instance in self.instances]
 
-            LOG.debug("Removing changes from cluster nodes.")
-            for instance in instances:
-                if instance.configuration:
-                    self.context.notification = (
-                        DBaaSInstanceDetachConfiguration(self.context,
-                                                         **request_info))
-                    with StartNotification(self.context,
-                                           instance_id=instance.id):
-                        with EndNotification(self.context):
-                            instance.delete_configuration()
-                else:
+            def _delete_configuration(instance):
+                if not instance.configuration:
                     LOG.debug(
                         "Node '%s' has no configuration attached.",
                         instance.id)
+                    return
+                context = copy.copy(self.context)
+                context.notification = (
+                    DBaaSInstanceDetachConfiguration(context, **request_info))
+                with StartNotification(context, instance_id=instance.id):
+                    with EndNotification(context):
+                        instance.delete_configuration()
+
+            LOG.debug("Removing changes from cluster nodes.")
+            self._rolling_map(_delete_configuration, instances)
 
             # The cluster is in a consistent state with all nodes
             # requiring restart.
@@ -527,8 +547,10 @@ class Cluster(object):
                 if apply_on_all:
                     LOG.debug(
                         "Applying the changes to the remaining nodes.")
-                    for instance in remaining_nodes:
-                        instance.reset_configuration(configuration_id)
+                    self._rolling_map(
+                        lambda instance: instance.reset_configuration(
+                            configuration_id),
+                        remaining_nodes)
                 else:
                     LOG.debug(
                         "Releasing restart-required task on the remaining "
@@ -561,6 +583,18 @@ def is_cluster_deleting(context, cluster_id):
             cluster.db_info.task_status == ClusterTasks.SHRINKING_CLUSTER)
 
 
+def rolling_node_group(node):
+    """The group of a node in a rolling operation, a batch has at most one
+    node of each group.
+
+    The nodes of a shard are one group. The nodes without a shard (Galera,
+    Cassandra and Redis nodes, Mongo config servers and query routers) are
+    one group of the cluster, so they are processed one at a time and the
+    cluster keeps its quorum.
+    """
+    return node.shard_id or node.cluster_id
+
+
 def validate_instance_flavors(context, instances,
                               volume_enabled, ephemeral_enabled):
     """Validate flavors for given instance definitions."""
@@ -266,6 +266,10 @@ class API(wsgi.Router):
                        controller=configuration_resource,
                        action='instances',
                        conditions={'method': ['GET']})
+        mapper.connect('/{tenant_id}/configurations/{id}/jobs/{job_id}',
+                       controller=configuration_resource,
+                       action='job',
+                       conditions={'method': ['GET']})
         mapper.connect('/{tenant_id}/configurations/{id}',
                        controller=configuration_resource,
                        action='edit',
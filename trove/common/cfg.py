@@ -193,6 +193,18 @@ common_opts = [
                     'change.'),
     cfg.IntOpt('state_change_poll_time', default=3,
                help='Interval between state change poll requests (seconds).'),
+    cfg.BoolOpt('guest_file_helper', default=True,
+                help='Run the file operations of the guest agent that require '
+                'root privileges in a long-lived helper process started '
+                'with sudo, instead of running a sudo command for each '
+                'operation.'),
+    cfg.FloatOpt('status_probe_cache_ttl', default=2, min=0,
+                 help='Seconds the guest agent reuses the result of the '
+                 'database status probe. Should be less than '
+                 'state_change_poll_time.'),
+    cfg.IntOpt('status_probe_log_lines', default=50, min=1,
+               help='Number of lines of the database container log that the '
+               'guest agent logs when the status probe fails.'),
     cfg.IntOpt('agent_heartbeat_time', default=10,
                help='Maximum time (in seconds) for the Guest Agent to reply '
                     'to a heartbeat request.'),
@@ -234,6 +246,19 @@ common_opts = [
     cfg.IntOpt('trove_conductor_workers',
                help='Number of workers for the Conductor service. The default '
                'will be the number of CPUs available.'),
+    cfg.FloatOpt('heartbeat_flush_interval', default=1.0, min=0,
+                 help='Seconds the Conductor buffers the guest heartbeats '
+                 'before writing them to the database in one batch. Only '
+                 'the newest heartbeat of each instance is written. 0 writes '
+                 'every heartbeat immediately.'),
+    cfg.IntOpt('heartbeat_buffer_size', default=1000, min=1,
+               help='Maximum number of instances whose heartbeats are '
+               'buffered by the Conductor, the buffer is written as soon as '
+               'it is full.'),
+    cfg.IntOpt('conductor_lastseen_cache_size', default=20000, min=1,
+               help='Maximum number of last seen message timestamps cached '
+               'by each Conductor process to discard the messages that '
+               'arrive out of order without querying the database.'),
     cfg.BoolOpt('use_nova_server_config_drive', default=True,
                 help='Use config drive for file injection when booting '
                 'instance.'),
@@ -334,6 +359,25 @@ common_opts = [
     cfg.IntOpt('backup_segment_max_size', default=2 * (1024 ** 3),
                help='Maximum size (in bytes) of each segment of the backup '
                'file.'),
+    cfg.IntOpt('backup_upload_workers', default=1, min=1,
+               help='Number of backup segments uploaded to the storage '
+               'concurrently. When greater than 1, whole segments of '
+               'backup_segment_max_size bytes are buffered in memory by the '
+               'backup container, so a smaller segment size is recommended.'),
+    cfg.StrOpt('backup_compression', default='gzip',
+               choices=['gzip', 'pigz', 'zstd', 'lz4'],
+               help='Compression codec used by the backup container. The '
+               'codec is saved in the backup metadata so restore always '
+               'uses the codec of the backup.'),
+    cfg.IntOpt('backup_compression_level',
+               help='Compression level of backup_compression, the default '
+               'level of the codec is used if not specified.'),
+    cfg.IntOpt('backup_compression_threads', default=0, min=0,
+               help='Number of threads used by the pigz and zstd backup '
+               'compression, 0 means one thread per CPU core.'),
+    cfg.IntOpt('backup_download_workers', default=1, min=1,
+               help='Number of backup parts downloaded from the storage '
+               'concurrently when restoring a backup.'),
     cfg.StrOpt('remote_dns_client',
                default='trove.common.clients.dns_client',
                help='Client to send DNS calls to.'),
@@ -358,10 +402,18 @@ common_opts = [
     cfg.StrOpt('remote_glance_client',
                default='trove.common.clients_admin.glance_client_trove_admin',
                help='Client to send Glance calls to.'),
+    cfg.IntOpt('client_cache_ttl', default=300, min=0,
+               help='Time (in seconds) the OpenStack clients and endpoints '
+                    'of a user token are cached for the following calls '
+                    'with the same token, at most until the token expires. '
+                    '0 disables the cache.'),
     cfg.StrOpt('exists_notification_transformer',
                help='Transformer for exists notifications.'),
     cfg.IntOpt('exists_notification_interval', default=3600,
                help='Seconds to wait between pushing events.'),
+    cfg.IntOpt('exists_notification_batch_size', default=500, min=1,
+               help='Number of instances loaded and published at a time by '
+                    'the exists notifications.'),
     cfg.IntOpt('quota_notification_interval',
                help='Seconds to wait between pushing events.'),
     cfg.DictOpt('notification_service_id',
@@ -441,6 +493,13 @@ common_opts = [
     cfg.IntOpt('cluster_usage_timeout', default=36000,
                help='Maximum time (in seconds) to wait for a cluster to '
                     'become active.'),
+    cfg.IntOpt('cluster_rolling_batch_size', default=1, min=1,
+               help='Maximum number of cluster nodes restarted, upgraded or '
+                    'reconfigured at the same time by a rolling operation. '
+                    'Two nodes of the same shard are never in the same '
+                    'batch, nor are two nodes without a shard, the next '
+                    'batch starts as soon as the nodes of the current one '
+                    'are healthy again.'),
     cfg.StrOpt('module_aes_cbc_key', default='module_aes_cbc_key',
                help='OpenSSL aes_cbc key for module encryption.'),
     cfg.ListOpt('module_types', default=['ping', 'new_relic_license'],
@@ -452,6 +511,38 @@ common_opts = [
     cfg.IntOpt('module_reapply_min_batch_delay', default=2,
                help='The minimum delay (in seconds) between subsequent '
                     'module batch reapply executions.'),
+    cfg.IntOpt('configuration_refresh_concurrency', default=10, min=1,
+               help='The maximum number of instances and clusters a '
+                    'changed configuration group is applied to at the same '
+                    'time.'),
+    cfg.IntOpt('replica_migration_concurrency', default=10, min=1,
+               help='The maximum number of replicas moved to the new '
+                    'replication source at the same time by '
+                    'promote-to-replica-source and eject-replica-source.'),
+    cfg.IntOpt('configuration_parameter_cache_ttl', default=300, min=0,
+               help='Time (in seconds) the configuration parameter rules of '
+                    'a datastore version are cached in the process. The '
+                    'cache of a version is also cleared when this process '
+                    'changes its rules. 0 disables the cache.'),
+    cfg.IntOpt('datastore_catalog_check_interval', default=10, min=0,
+               help='Maximum time (in seconds) the datastores, versions, '
+                    'capabilities and version associations cached in the '
+                    'process are used before checking whether trove-manage '
+                    'or another process changed them. 0 checks on every '
+                    'lookup.'),
+    cfg.IntOpt('job_resume_interval', default=300, min=0,
+               help='Seconds between the checks for the jobs left running '
+                    'by a restart of the task manager on this host, to '
+                    'resume them. 0 to never resume them.'),
+    cfg.IntOpt('job_claim_timeout', default=300, min=0,
+               help='Seconds after which a job created by the API that no '
+                    'task manager claimed, e.g. because the message '
+                    'starting it was lost, is claimed and resumed by the '
+                    'first task manager checking for jobs to resume.'),
+    cfg.IntOpt('job_retention_period', default=604800, min=0,
+               help='Seconds the finished jobs and the status of their '
+                    'instances are kept before they are purged. 0 to keep '
+                    'them forever.'),
     cfg.StrOpt('guest_log_container_name',
                default='database_logs',
                help='Name of container that stores guest log components.'),
@@ -459,6 +550,11 @@ common_opts = [
                help='Maximum size of a chunk saved in guest log container.'),
     cfg.IntOpt('guest_log_expiry', default=2592000,
                help='Expiry (in seconds) of objects in guest log container.'),
+    cfg.BoolOpt('guest_log_compression', default=False,
+                help='Compress the components of the published guest logs '
+                     'with gzip. The compressed components are named with '
+                     'a .gz suffix and have to be decompressed by the '
+                     'readers of the guest log container.'),
     cfg.BoolOpt('enable_secure_rpc_messaging', default=True,
                 help='Should RPC messaging traffic be secured by encryption.'),
     cfg.StrOpt('taskmanager_rpc_encr_key',
@@ -907,7 +1003,10 @@ cassandra_opts = [
                help='User access controller implementation.'),
     cfg.IntOpt('node_sync_time', default=60,
                help='Time (in seconds) given to a node after a state change '
-               'to finish rejoining the cluster.'),
+               'to finish rejoining the cluster.',
+               deprecated_for_removal=True,
+               deprecated_reason='The rolling cluster operations wait for '
+               'the nodes to be healthy instead of a fixed time.'),
 ]
 
 # Couchbase
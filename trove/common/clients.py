@@ -13,6 +13,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import threading
+import time
+
+from oslo_log import log as logging
+from oslo_utils import timeutils
 from oslo_utils.importutils import import_class
 
 from trove.common import cfg
@@ -29,6 +34,7 @@ from novaclient.client import Client
 from swiftclient.client import Connection
 
 CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
 
 
 def normalize_url(url):
@@ -73,6 +79,76 @@ def get_endpoint(service_catalog, service_type=None,
     return urls[0]
 
 
+class ClientCache(object):
+    """Cache the clients and endpoints of the user tokens in the process.
+
+    An entry is keyed by project, token, region and service and is kept for
+    client_cache_ttl seconds, or until the token expires if that is sooner.
+    A reused client reuses the HTTP connections of its session.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _expires_at(self, context, now):
+        expires_at = now + CONF.client_cache_ttl
+        token_expires = getattr(context, 'auth_token_expires', None)
+        if token_expires:
+            try:
+                expires_at = min(expires_at, timeutils.parse_isotime(
+                    token_expires).timestamp())
+            except ValueError:
+                LOG.warning("Invalid token expiry %s.", token_expires)
+        return expires_at
+
+    def get(self, context, key, factory):
+        """Return the entry of the token of the context for the key,
+        created with factory if it is missing or expired.
+        """
+        if not CONF.client_cache_ttl or not context.auth_token:
+            return factory()
+
+        key = (context.project_id, context.auth_token) + tuple(key)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+        value = factory()
+        expires_at = self._expires_at(context, now)
+        with self._lock:
+            for cached_key, (cached_expires_at, _) in list(
+                    self._entries.items()):
+                if cached_expires_at <= now:
+                    del self._entries[cached_key]
+            if expires_at > now:
+                self._entries[key] = (expires_at, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_CLIENT_CACHE = ClientCache()
+
+
+def clear_client_cache():
+    _CLIENT_CACHE.clear()
+
+
+def _get_endpoint(context, service_type, endpoint_region, endpoint_type):
+    """get_endpoint memoized for the token of the context."""
+    return _CLIENT_CACHE.get(
+        context, ('endpoint', service_type, endpoint_region, endpoint_type),
+        lambda: get_endpoint(context.service_catalog,
+                             service_type=service_type,
+                             endpoint_region=endpoint_region,
+                             endpoint_type=endpoint_type))
+
+
 def dns_client(context):
     from trove.dns.manager import DnsManager
     return DnsManager()
@@ -88,14 +164,22 @@ def guest_client(context, id, manager=None):
 
 
 def nova_client(context, region_name=None, password=None):
+    region = region_name or CONF.service_credentials.region_name
+    if password:
+        return _nova_client(context, region, password)
+    return _CLIENT_CACHE.get(
+        context, (region, CONF.nova_compute_service_type),
+        lambda: _nova_client(context, region, password))
+
+
+def _nova_client(context, region, password):
     if CONF.nova_compute_url:
         url = '%(nova_url)s%(tenant)s' % {
             'nova_url': normalize_url(CONF.nova_compute_url),
             'tenant': context.project_id}
     else:
-        region = region_name or CONF.service_credentials.region_name
-        url = get_endpoint(
-            context.service_catalog,
+        url = _get_endpoint(
+            context,
             service_type=CONF.nova_compute_service_type,
             endpoint_region=region,
             endpoint_type=CONF.nova_compute_endpoint_type
@@ -128,14 +212,20 @@ def create_admin_nova_client(context):
 
 
 def cinder_client(context, region_name=None):
+    region = region_name or CONF.service_credentials.region_name
+    return _CLIENT_CACHE.get(
+        context, (region, CONF.cinder_service_type),
+        lambda: _cinder_client(context, region))
+
+
+def _cinder_client(context, region):
     if CONF.cinder_url:
         url = '%(cinder_url)s%(tenant)s' % {
             'cinder_url': normalize_url(CONF.cinder_url),
             'tenant': context.project_id}
     else:
-        region = region_name or CONF.service_credentials.region_name
-        url = get_endpoint(
-            context.service_catalog,
+        url = _get_endpoint(
+            context,
             service_type=CONF.cinder_service_type,
             endpoint_region=region,
             endpoint_type=CONF.cinder_endpoint_type
@@ -156,11 +246,13 @@ def swift_client(context, region_name=None):
         url = '%(swift_url)s%(tenant)s' % {'swift_url': CONF.swift_url,
                                            'tenant': context.project_id}
     else:
+        # A swift connection holds a single HTTP connection and can't be
+        # shared by concurrent requests, only its endpoint is cached.
         region = region_name or CONF.service_credentials.region_name
-        url = get_endpoint(context.service_catalog,
-                           service_type=CONF.swift_service_type,
-                           endpoint_region=region,
-                           endpoint_type=CONF.swift_endpoint_type)
+        url = _get_endpoint(context,
+                            service_type=CONF.swift_service_type,
+                            endpoint_region=region,
+                            endpoint_type=CONF.swift_endpoint_type)
 
     client = Connection(preauthurl=url,
                         preauthtoken=context.auth_token,
@@ -171,15 +263,21 @@ def swift_client(context, region_name=None):
 
 
 def neutron_client(context, region_name=None):
+    region = region_name or CONF.service_credentials.region_name
+    return _CLIENT_CACHE.get(
+        context, (region, CONF.neutron_service_type),
+        lambda: _neutron_client(context, region))
+
+
+def _neutron_client(context, region):
     if CONF.neutron_url:
         # neutron endpoint url / publicURL does not include tenant segment
         url = CONF.neutron_url
     else:
-        region = region_name or CONF.service_credentials.region_name
-        url = get_endpoint(context.service_catalog,
-                           service_type=CONF.neutron_service_type,
-                           endpoint_region=region,
-                           endpoint_type=CONF.neutron_endpoint_type)
+        url = _get_endpoint(context,
+                            service_type=CONF.neutron_service_type,
+                            endpoint_region=region,
+                            endpoint_type=CONF.neutron_endpoint_type)
 
     client = NeutronClient.Client(token=context.auth_token,
                                   endpoint_url=url,
@@ -188,6 +286,13 @@ def neutron_client(context, region_name=None):
 
 
 def glance_client(context, region_name=None):
+    region = region_name or CONF.service_credentials.region_name
+    return _CLIENT_CACHE.get(
+        context, (region, CONF.glance_service_type),
+        lambda: _glance_client(context, region))
+
+
+def _glance_client(context, region):
 
     # We should allow glance to get the endpoint from the service
     # catalog, but to do so we would need to be able to specify
@@ -199,9 +304,8 @@ def glance_client(context, region_name=None):
             'url': normalize_url(CONF.glance_url),
             'tenant': context.project_id}
     else:
-        region = region_name or CONF.service_credentials.region_name
-        endpoint_url = get_endpoint(
-            context.service_catalog, service_type=CONF.glance_service_type,
+        endpoint_url = _get_endpoint(
+            context, service_type=CONF.glance_service_type,
             endpoint_region=region,
             endpoint_type=CONF.glance_endpoint_type
         )
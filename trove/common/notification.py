@@ -498,6 +498,12 @@ class DBaaSInstancePromote(DBaaSAPINotification):
     def required_start_traits(self):
         return ['instance_id']
 
+    def optional_end_traits(self):
+        return ['instance_id', 'failover_timings']
+
+    def optional_error_traits(self):
+        return ['instance_id', 'failover_timings']
+
 
 class DBaaSInstanceEject(DBaaSAPINotification):
 
@@ -508,6 +514,12 @@ class DBaaSInstanceEject(DBaaSAPINotification):
     def required_start_traits(self):
         return ['instance_id']
 
+    def optional_end_traits(self):
+        return ['instance_id', 'failover_timings']
+
+    def optional_error_traits(self):
+        return ['instance_id', 'failover_timings']
+
 
 class DBaaSInstanceDelete(DBaaSAPINotification):
 
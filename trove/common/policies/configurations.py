@@ -66,6 +66,17 @@ rules = [
                 'method': 'GET'
             }
         ]),
+    policy.DocumentedRuleDefault(
+        name='configuration:job',
+        check_str='rule:admin_or_owner',
+        description='Get the progress of the refresh of a configuration '
+                    'group on its instances and clusters.',
+        operations=[
+            {
+                'path': PATH_CONFIG + '/jobs/{job_id}',
+                'method': 'GET'
+            }
+        ]),
     policy.DocumentedRuleDefault(
         name='configuration:update',
         check_str='rule:admin_or_owner',
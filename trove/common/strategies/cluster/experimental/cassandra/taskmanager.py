@@ -343,8 +343,7 @@ class CassandraClusterTasks(task_models.ClusterTasks):
         LOG.debug("End shrink_cluster for id: %s.", cluster_id)
 
     def restart_cluster(self, context, cluster_id):
-        self.rolling_restart_cluster(
-            context, cluster_id, delay_sec=CONF.cassandra.node_sync_time)
+        self.rolling_restart_cluster(context, cluster_id)
 
     def upgrade_cluster(self, context, cluster_id, datastore_version):
         current_seeds = self._get_current_seeds(context, cluster_id)
@@ -29,6 +29,10 @@ from oslo_serialization import base64
 
 from trove.common import utils as trove_utils
 
+# Values that are never collections, checked before the (slower) iterable
+# check of the converters.
+_SCALAR_TYPES = six.string_types + six.integer_types + (float, type(None))
+
 
 class StringConverter(object):
     """A passthrough string-to-object converter.
@@ -41,12 +45,19 @@ class StringConverter(object):
         """
         self._object_mappings = object_mappings
 
+    # Strings that ast.literal_eval() would parse to an int or fail to parse
+    # (a name other than a constant) are converted without it.
+    _INT_PATTERN = re.compile(r'(?:[1-9][0-9]*|0)\Z')
+    _NAME_PATTERN = re.compile(r'[A-Za-z_][A-Za-z0-9_]*\Z')
+    _NAME_CONSTANTS = {'True': True, 'False': False, 'None': None}
+
     def to_strings(self, items):
         """Recursively convert collection items to strings.
 
         :returns:        Copy of the input collection with all items converted.
         """
-        if trove_utils.is_collection(items):
+        if (not isinstance(items, _SCALAR_TYPES) and
+                trove_utils.is_collection(items)):
             return map(self.to_strings, items)
 
         return self._to_string(items)
@@ -56,7 +67,8 @@ class StringConverter(object):
 
         :returns:        Copy of the input collection with all items converted.
         """
-        if trove_utils.is_collection(items):
+        if (not isinstance(items, _SCALAR_TYPES) and
+                trove_utils.is_collection(items)):
             return map(self.to_objects, items)
 
         return self._to_object(items)
@@ -76,6 +88,12 @@ class StringConverter(object):
               re.match("^'(.*)'|\"(.*)\"$", value)):
             return value
 
+        if isinstance(value, six.string_types):
+            if self._INT_PATTERN.match(value):
+                return int(value)
+            if self._NAME_PATTERN.match(value):
+                return self._NAME_CONSTANTS.get(value, value)
+
         try:
             return ast.literal_eval(value)
         except Exception:
@@ -95,6 +113,16 @@ class StreamCodec(object):
         """Deserialize stream data into a Python structure.
         """
 
+    def serialize_to(self, data, fp):
+        """Serialize a Python object into a writable file object.
+        """
+        fp.write(self.serialize(data))
+
+    def deserialize_from(self, fp):
+        """Deserialize the contents of a readable file object.
+        """
+        return self.deserialize(fp.read())
+
 
 class IdentityCodec(StreamCodec):
     """
@@ -197,54 +225,125 @@ class IniCodec(StreamCodec):
         """
         self._default_value = default_value
         self._comment_markers = comment_markers
+        self._interpolation = configparser.BasicInterpolation()
+
+    # The configuration files are parsed like ConfigParser with
+    # allow_no_value would parse them after stripping the lines.
+    DEFAULT_SECTION = configparser.DEFAULTSECT
+    SECTION_PATTERN = configparser.ConfigParser.SECTCRE
+    OPTION_PATTERN = configparser.ConfigParser.OPTCRE_NV
+    PARSER_COMMENT_PREFIXES = ('#', ';')
 
     def serialize(self, dict_data):
-        parser = self._init_config_parser(dict_data)
         output = six.StringIO()
-        parser.write(output)
+        self.serialize_to(dict_data, output)
 
         return output.getvalue()
 
-    def deserialize(self, stream):
-        parser = self._init_config_parser()
-        parser.readfp(self._pre_parse(stream))
-
-        return {s: {k:
-                    StringConverter({None: self._default_value}).to_objects(v)
-                    for k, v in parser.items(s, raw=True)}
-                for s in parser.sections()}
+    def serialize_to(self, dict_data, fp):
+        # Validate all the sections before writing any of them, like
+        # ConfigParser.
+        sections = [(section, self._to_section_items(section, options))
+                    for section, options in (dict_data or {}).items()]
+        for section, items in sections:
+            fp.write('[%s]\n' % section)
+            for key, value in items.items():
+                if value is None:
+                    fp.write('%s\n' % key)
+                else:
+                    fp.write('%s = %s\n' % (key, value.replace('\n', '\n\t')))
+            fp.write('\n')
+
+    def _to_section_items(self, section, options):
+        if not isinstance(section, six.string_types):
+            raise TypeError("section names must be strings")
+        if section == self.DEFAULT_SECTION:
+            raise ValueError('Invalid section name: %r' % section)
+
+        converter = StringConverter({self._default_value: None})
+        items = {}
+        for key, value in options.items():
+            if not isinstance(key, six.string_types):
+                raise TypeError("option keys must be strings")
+            str_val = converter.to_strings(value)
+            if str_val is not None:
+                str_val = str(str_val)
+                if str_val:
+                    self._interpolation.before_set(None, section, key,
+                                                   str_val)
+            items[key.lower()] = str_val
+
+        return items
 
-    def _pre_parse(self, stream):
-        buf = six.StringIO()
-        for line in six.StringIO(stream):
+    def deserialize(self, stream):
+        return self._parse(six.StringIO(stream), '<???>')
+
+    def deserialize_from(self, fp):
+        return self._parse(fp, getattr(fp, 'name', '<???>'))
+
+    def _parse(self, lines, source):
+        """Parse the lines in a single pass and convert the values."""
+        defaults = {}
+        sections = {}
+        added = set()
+        current = None
+        section = None
+        error = None
+        lineno = 0
+        for line in lines:
             # Ignore commented lines.
-            if not line.startswith(self._comment_markers):
-                # Strip leading and trailing whitespaces from each line.
-                buf.write(line.strip() + '\n')
-
-        # Rewind the output buffer.
-        buf.flush()
-        buf.seek(0)
-
-        return buf
+            if line.startswith(self._comment_markers):
+                continue
+            lineno += 1
+            # Strip leading and trailing whitespaces from each line.
+            value = line.strip()
+            if not value or value.startswith(self.PARSER_COMMENT_PREFIXES):
+                continue
 
-    def _init_config_parser(self, sections=None):
-        # SafeConfigParser was deprecated in Python 3.2
-        if sys.version_info >= (3, 2):
-            parser = configparser.ConfigParser(allow_no_value=True)
-        else:
-            parser = configparser.SafeConfigParser(allow_no_value=True)
-        if sections:
-            for section in sections:
-                parser.add_section(section)
-                for key, value in sections[section].items():
-                    str_val = StringConverter(
-                        {self._default_value: None}).to_strings(value)
-                    parser.set(section, key,
-                               str(str_val) if str_val is not None
-                               else str_val)
+            match = self.SECTION_PATTERN.match(value)
+            if match:
+                section = match.group('header')
+                if section in sections:
+                    raise configparser.DuplicateSectionError(
+                        section, source, lineno)
+                elif section == self.DEFAULT_SECTION:
+                    current = defaults
+                else:
+                    current = sections[section] = {}
+                    added.add(section)
+            elif current is None:
+                raise configparser.MissingSectionHeaderError(
+                    source, lineno, value + '\n')
+            else:
+                option, optval = self.OPTION_PATTERN.match(value).group(
+                    'option', 'value')
+                if not option:
+                    if error is None:
+                        error = configparser.ParsingError(source)
+                    error.append(lineno, repr(value + '\n'))
+                option = option.rstrip().lower()
+                if (section, option) in added:
+                    raise configparser.DuplicateOptionError(
+                        section, option, source, lineno)
+                added.add((section, option))
+                current[option] = (optval.strip() if optval is not None
+                                   else None)
+
+        if error is not None:
+            raise error
+
+        converter = StringConverter({None: self._default_value})
+        result = {}
+        for section, options in sections.items():
+            if defaults:
+                # Every section inherits the options of the default one.
+                merged = dict(defaults)
+                merged.update(options)
+                options = merged
+            result[section] = {k: converter.to_objects(v)
+                               for k, v in options.items()}
 
-        return parser
+        return result
 
 
 class PropertiesCodec(StreamCodec):
@@ -296,7 +395,12 @@ class PropertiesCodec(StreamCodec):
 
     def serialize(self, dict_data):
         output = six.StringIO()
-        writer = csv.writer(output, delimiter=self._delimiter,
+        self.serialize_to(dict_data, output)
+
+        return output.getvalue()
+
+    def serialize_to(self, dict_data, fp):
+        writer = csv.writer(fp, delimiter=self._delimiter,
                             quoting=self.QUOTING_MODE,
                             strict=self.STRICT_MODE,
                             skipinitialspace=self.SKIP_INIT_SPACE)
@@ -304,10 +408,11 @@ class PropertiesCodec(StreamCodec):
         for key, value in dict_data.items():
             writer.writerows(self._to_rows(key, value))
 
-        return output.getvalue()
-
     def deserialize(self, stream):
-        reader = csv.reader(six.StringIO(stream),
+        return self.deserialize_from(six.StringIO(stream))
+
+    def deserialize_from(self, fp):
+        reader = csv.reader(fp,
                             delimiter=self._delimiter,
                             quoting=self.QUOTING_MODE,
                             strict=self.STRICT_MODE,
@@ -448,30 +553,42 @@ class KeyValueCodec(StreamCodec):
             lines.append(k + self._delimeter + self.serialize_value(v))
         return self._line_terminator.join(lines)
 
+    def serialize_to(self, dict_data, fp):
+        terminator = ''
+        for k, v in dict_data.items():
+            fp.write(terminator + k + self._delimeter +
+                     self.serialize_value(v))
+            terminator = self._line_terminator
+
     def deserialize(self, stream):
         # Note(zhaochao): In Python 3, when files are opened in text mode,
         # newlines will be translated to '\n' by default, so we just split
         # the stream by '\n'.
         if sys.version_info[0] >= 3:
-            lines = stream.split('\n')
-        else:
-            lines = stream.split(self._line_terminator)
+            return self._parse(six.StringIO(stream))
+        return self._parse(stream.split(self._line_terminator))
+
+    def deserialize_from(self, fp):
+        return self._parse(fp)
 
+    def _parse(self, lines):
+        quoted_comment = re.compile(r'%s *%s.*$' % ("'", '#'))
+        comment = re.compile('%s.*$' % self._comment_marker)
         result = {}
         for line in lines:
             line = line.lstrip().rstrip()
             if line == '' or line.startswith(self._comment_marker):
                 continue
-            k, v = re.split(re.escape(self._delimeter), line, 1)
+            k, v = line.split(self._delimeter, 1)
             if self._value_quoting and v.startswith(self._value_quote_char):
                 # remove trailing comments
-                v = re.sub(r'%s *%s.*$' % ("'", '#'), '', v)
+                v = quoted_comment.sub('', v)
                 v = v.lstrip(
                     self._value_quote_char).rstrip(
                     self._value_quote_char)
             else:
                 # remove trailing comments
-                v = re.sub('%s.*$' % self._comment_marker, '', v)
+                v = comment.sub('', v)
             if self._hidden_marker and v.startswith(self._hidden_marker):
                 continue
             result[k.strip()] = v
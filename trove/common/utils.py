@@ -18,8 +18,10 @@ import collections
 import inspect
 import os
 import shutil
+import time
 import uuid
 
+import eventlet
 from eventlet.timeout import Timeout
 import jinja2
 from oslo_concurrency import processutils
@@ -224,6 +226,90 @@ def poll_until(retriever, condition=lambda value: value,
     return wait_for_task(task)
 
 
+def map_concurrently(func, items, pool_size=None):
+    """Call func for each item in green threads.
+
+    At most pool_size calls run at the same time, all of them by default.
+    An exception raised by a call doesn't stop the other calls, it is
+    returned in place of the call result.
+
+    :returns a list of (item, result) tuples in the order of the items.
+    """
+    items = list(items)
+    pool = eventlet.GreenPool(pool_size or len(items) or 1)
+
+    def _call(item):
+        try:
+            return item, func(item)
+        except Exception as e:
+            return item, e
+
+    return list(pool.imap(_call, items))
+
+
+def rolling_batches(items, batch_size, group_key=None):
+    """Split items in batches for a rolling operation.
+
+    A batch has at most batch_size items and at most one item of each
+    group, the items for which group_key returns None are in no group.
+    The batches take the items in order, an item only goes to a later batch
+    if its group is already in the current one.
+
+    :returns a generator of lists of items.
+    """
+    remaining = list(items)
+    batch_size = max(batch_size or 1, 1)
+    while remaining:
+        batch = []
+        groups = set()
+        postponed = []
+        for item in remaining:
+            group = group_key(item) if group_key else None
+            if len(batch) < batch_size and (group is None or
+                                            group not in groups):
+                batch.append(item)
+                if group is not None:
+                    groups.add(group)
+            else:
+                postponed.append(item)
+        yield batch
+        remaining = postponed
+
+
+class RateLimiter(object):
+    """Limit the rate of some operations to count per period seconds.
+
+    Up to count operations can start at once, then one more each
+    period / count seconds (a token bucket). A count or period of 0 means no
+    limit.
+    """
+
+    def __init__(self, count, period):
+        self.count = count
+        self.period = period
+        self._tokens = float(count)
+        self._last = time.time()
+        self._lock = eventlet.semaphore.Semaphore()
+
+    def acquire(self):
+        """Wait until one more operation can start."""
+        if not self.count or self.period <= 0:
+            return
+
+        with self._lock:
+            while True:
+                now = time.time()
+                self._tokens = min(
+                    self.count,
+                    self._tokens + (now - self._last) * self.count /
+                    self.period)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                eventlet.sleep((1 - self._tokens) * self.period / self.count)
+
+
 # Copied from nova.api.openstack.common in the old code.
 def get_id_from_href(href):
     """Return the id or uuid portion of a url.
@@ -527,6 +527,13 @@ class ContextMiddleware(base_wsgi.Middleware):
         return {key: params[key] for key in params.keys()
                 if key in ["limit", "marker"]}
 
+    def _token_expires(self, request):
+        # The token validated by keystonemiddleware, v3 or v2 format.
+        token_info = request.environ.get('keystone.token_info') or {}
+        if 'token' in token_info:
+            return token_info['token'].get('expires_at')
+        return token_info.get('access', {}).get('token', {}).get('expires')
+
     def process_request(self, request):
         service_catalog = None
         catalog_header = request.headers.get('X-Service-Catalog', None)
@@ -538,6 +545,7 @@ class ContextMiddleware(base_wsgi.Middleware):
                     _('Invalid service catalog json.'))
         tenant_id = request.headers.get('X-Tenant-Id', None)
         auth_token = request.headers["X-Auth-Token"]
+        token_expires = self._token_expires(request)
         user_id = request.headers.get('X-User-ID', None)
         roles = request.headers.get('X-Role', '').split(',')
         is_admin = False
@@ -547,6 +555,7 @@ class ContextMiddleware(base_wsgi.Middleware):
                 break
         limits = self._extract_limits(request.params)
         context = rd_context.TroveContext(auth_token=auth_token,
+                                          auth_token_expires=token_expires,
                                           tenant=tenant_id,
                                           user=user_id,
                                           is_admin=is_admin,
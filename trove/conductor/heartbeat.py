@@ -0,0 +1,185 @@
+# Copyright 2020 Catalyst Cloud
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+import time
+
+import eventlet
+from oslo_log import log as logging
+
+from trove.common import cfg
+from trove.common import context as trove_context
+from trove.common import exception
+from trove.common.i18n import _
+from trove.common import timeutils
+from trove.conductor.models import LastSeenCache
+from trove.db import get_db_api
+from trove.instance import models as inst_models
+from trove.taskmanager import api as task_api
+
+LOG = logging.getLogger(__name__)
+CONF = cfg.CONF
+
+METHOD_NAME = 'heartbeat'
+
+
+class HeartbeatBuffer(object):
+    """Coalesce the guest heartbeats and write them in batches.
+
+    The heartbeats received during heartbeat_flush_interval seconds are
+    kept in memory, only the newest one of each instance. A flush loads the
+    service statuses of the batch with one query and the last seen
+    timestamps missing in the cache with another one, drops the heartbeats
+    older than the last seen ones and writes the rest with one bulk upsert
+    per table.
+    """
+
+    def __init__(self, flush_interval=None, max_size=None, last_seen=None):
+        self.flush_interval = (CONF.heartbeat_flush_interval
+                               if flush_interval is None else flush_interval)
+        self.max_size = max_size or CONF.heartbeat_buffer_size
+        self.last_seen = last_seen or LastSeenCache()
+        self.metrics = {
+            'batches': 0,
+            'heartbeats': 0,
+            'coalesced': 0,
+            'dropped_stale': 0,
+            'last_batch_size': 0,
+            'max_batch_size': 0,
+            'last_flush_latency': 0.0,
+            'total_flush_latency': 0.0,
+        }
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def add(self, instance_id, status, sent=None):
+        """Buffer a heartbeat.
+
+        :param status: the reported ServiceStatus or None to only refresh
+                       the updated_at of the service status.
+        :param sent: the time the guest sent the heartbeat.
+        """
+        with self._lock:
+            current = self._pending.get(instance_id)
+            if current is not None:
+                current_sent = current[1]
+                if (sent is not None and current_sent is not None
+                        and sent < current_sent):
+                    LOG.info("[Instance %s] Rec'd message is older than "
+                             "last seen. Discarding.", instance_id)
+                    self.metrics['dropped_stale'] += 1
+                    return
+                self.metrics['coalesced'] += 1
+            self._pending[instance_id] = (status, sent)
+            size = len(self._pending)
+
+            if (self.flush_interval > 0 and size < self.max_size
+                    and self._timer is None):
+                self._timer = eventlet.spawn_after(self.flush_interval,
+                                                   self._flush_pending)
+
+        if self.flush_interval <= 0:
+            self.flush()
+        elif size >= self.max_size:
+            self._flush_pending()
+
+    def _flush_pending(self):
+        try:
+            self.flush()
+        except Exception:
+            LOG.exception("Failed to write the guest heartbeats.")
+
+    def _notify_status_changed(self, instance_ids):
+        # Wake up the taskmanagers waiting for a status of the instances.
+        try:
+            task_api.API(trove_context.TroveContext()).instance_status_changed(
+                instance_ids)
+        except Exception:
+            LOG.warning("Failed to notify the status change of instances "
+                        "%s.", instance_ids, exc_info=True)
+
+    def flush(self):
+        """Write the buffered heartbeats.
+
+        :raises ModelNotFoundError: if some of the instances have no service
+                                    status, the other heartbeats are written.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                if self._timer is not eventlet.getcurrent():
+                    self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return
+
+        start = time.time()
+        instance_ids = list(pending)
+        statuses = inst_models.InstanceServiceStatus.find_all_by_instance_ids(
+            instance_ids)
+        last_seen = self.last_seen.get_all(instance_ids, METHOD_NAME)
+
+        now = timeutils.utcnow()
+        missing = []
+        status_rows = []
+        changed = []
+        sent_by_instance = {}
+        for instance_id, (status, sent) in pending.items():
+            if (sent is not None and instance_id in last_seen
+                    and last_seen[instance_id] >= sent):
+                LOG.info("[Instance %s] Rec'd message is older than last "
+                         "seen. Discarding.", instance_id)
+                self.metrics['dropped_stale'] += 1
+                continue
+
+            db_status = statuses.get(instance_id)
+            if db_status is None:
+                missing.append(instance_id)
+                continue
+
+            status = status or db_status.status
+            if status.code != db_status.status_id:
+                changed.append(instance_id)
+            status_rows.append({'id': db_status.id,
+                                'instance_id': instance_id,
+                                'status_id': status.code,
+                                'status_description': status.description,
+                                'updated_at': now})
+            if sent is not None:
+                sent_by_instance[instance_id] = sent
+
+        get_db_api().upsert_all(inst_models.InstanceServiceStatus,
+                                status_rows)
+        self.last_seen.set_all(METHOD_NAME, sent_by_instance)
+        if changed:
+            self._notify_status_changed(changed)
+
+        latency = time.time() - start
+        self.metrics['batches'] += 1
+        self.metrics['heartbeats'] += len(status_rows)
+        self.metrics['last_batch_size'] = len(pending)
+        self.metrics['max_batch_size'] = max(self.metrics['max_batch_size'],
+                                             len(pending))
+        self.metrics['last_flush_latency'] = latency
+        self.metrics['total_flush_latency'] += latency
+        LOG.debug("Wrote %(written)d of %(size)d heartbeats in "
+                  "%(latency).3fs.",
+                  {'written': len(status_rows), 'size': len(pending),
+                   'latency': latency})
+
+        if missing:
+            raise exception.ModelNotFoundError(
+                _("InstanceServiceStatus Not Found for instances: %s") %
+                ', '.join(missing))
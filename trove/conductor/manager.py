@@ -18,12 +18,11 @@ from oslo_service import periodic_task
 
 from trove.backup import models as bkup_models
 from trove.common import cfg
-from trove.common import exception as trove_exception
 from trove.common.rpc import version as rpc_version
 from trove.common.serializable_notification import SerializableNotification
-from trove.conductor.models import LastSeen
+from trove.conductor.heartbeat import HeartbeatBuffer
+from trove.conductor.models import LastSeenCache
 from trove.extensions.mysql import models as mysql_models
-from trove.instance import models as inst_models
 from trove.instance.service_status import ServiceStatus
 
 LOG = logging.getLogger(__name__)
@@ -36,6 +35,8 @@ class Manager(periodic_task.PeriodicTasks):
 
     def __init__(self):
         super(Manager, self).__init__(CONF)
+        self.last_seen = LastSeenCache()
+        self.heartbeats = HeartbeatBuffer(last_seen=self.last_seen)
 
     def _message_too_old(self, instance_id, method_name, sent):
         fields = {
@@ -51,29 +52,7 @@ class Manager(periodic_task.PeriodicTasks):
 
         LOG.debug("Instance %(instance)s sent %(method)s at %(sent)s ", fields)
 
-        seen = None
-        try:
-            seen = LastSeen.load(instance_id=instance_id,
-                                 method_name=method_name)
-        except trove_exception.NotFound:
-            # This is fine.
-            pass
-
-        if seen is None:
-            LOG.debug("[Instance %s] Did not find any previous message. "
-                      "Creating.", instance_id)
-            seen = LastSeen.create(instance_id=instance_id,
-                                   method_name=method_name,
-                                   sent=sent)
-            seen.save()
-            return False
-
-        last_sent = float(seen.sent)
-        if last_sent < sent:
-            LOG.debug("[Instance %s] Rec'd message is younger than last "
-                      "seen. Updating.", instance_id)
-            seen.sent = sent
-            seen.save()
+        if self.last_seen.check_and_set(instance_id, method_name, sent):
             return False
 
         LOG.info("[Instance %s] Rec'd message is older than last seen. "
@@ -84,14 +63,25 @@ class Manager(periodic_task.PeriodicTasks):
         LOG.debug("Instance ID: %(instance)s, Payload: %(payload)s",
                   {"instance": str(instance_id),
                    "payload": str(payload)})
-        status = inst_models.InstanceServiceStatus.find_by(
-            instance_id=instance_id)
-        if self._message_too_old(instance_id, 'heartbeat', sent):
-            return
+        status = None
         if payload.get('service_status') is not None:
-            status.set_status(
-                ServiceStatus.from_description(payload['service_status']))
-        status.save()
+            status = ServiceStatus.from_description(payload['service_status'])
+        self.heartbeats.add(instance_id, status, sent=sent)
+
+    @periodic_task.periodic_task(spacing=300)
+    def report_heartbeat_metrics(self, context):
+        metrics = dict(self.heartbeats.metrics)
+        if not metrics['batches']:
+            return
+        metrics['avg_batch_size'] = (
+            float(metrics['heartbeats']) / metrics['batches'])
+        metrics['avg_flush_latency'] = (
+            metrics['total_flush_latency'] / metrics['batches'])
+        LOG.info("Heartbeats written: %(heartbeats)d in %(batches)d batches, "
+                 "average batch size %(avg_batch_size).1f, max batch size "
+                 "%(max_batch_size)d, average flush latency "
+                 "%(avg_flush_latency).3fs, coalesced %(coalesced)d, "
+                 "dropped stale %(dropped_stale)d.", metrics)
 
     def update_backup(self, context, instance_id, backup_id,
                       sent=None, **backup_fields):
@@ -12,8 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
+import threading
+
+from trove.common import cfg
 from trove.db import get_db_api
 
+CONF = cfg.CONF
+
 
 def persisted_models():
     return {'conductor_lastseen': LastSeen}
@@ -43,7 +49,152 @@ class LastSeen(object):
                                     method_name=method_name)
         return seen
 
+    @classmethod
+    def load_all(cls, instance_ids, method_name):
+        """Load the last seen timestamps of the instances in one query.
+
+        :returns a dict of the sent timestamps by instance id.
+        """
+        if not instance_ids:
+            return {}
+        seen = get_db_api().find_by_filter(
+            cls, filters=[cls.instance_id.in_(instance_ids)],
+            method_name=method_name)
+        return {s.instance_id: float(s.sent) for s in seen
+                if s.sent is not None}
+
+    @classmethod
+    def save_all(cls, method_name, sent_by_instance):
+        """Write the sent timestamps of the instances in one statement.
+
+        A stored timestamp is only replaced by a newer one, as in
+        update_if_older, another Conductor may have written it meanwhile.
+        """
+        get_db_api().upsert_all(
+            cls, [{'instance_id': instance_id, 'method_name': method_name,
+                   'sent': sent}
+                  for instance_id, sent in sent_by_instance.items()],
+            greatest=('sent',))
+
+    @classmethod
+    def update_if_older(cls, instance_id, method_name, sent):
+        """Set the sent timestamp unless the stored one is not older.
+
+        :returns True if the row was updated.
+        """
+        query = get_db_api().find_by_filter(
+            cls, filters=[cls.sent < sent], instance_id=instance_id,
+            method_name=method_name)
+        return query.update({'sent': sent}, synchronize_session=False) > 0
+
     @classmethod
     def create(cls, instance_id, method_name, sent):
         seen = LastSeen(instance_id, method_name, sent)
         return seen.save()
+
+
+class LastSeenCache(object):
+    """A bounded cache of the last seen timestamps of the Conductor.
+
+    The timestamps of (instance_id, method_name) are loaded on the first
+    lookup and written through to the conductor_lastseen table. The least
+    recently used entries are evicted when the cache is full.
+
+    Several Conductor processes share the table, so a cached timestamp is
+    a lower bound of the stored one: messages not newer than it are
+    discarded without a query, the others are recorded with an update that
+    only succeeds if the stored timestamp is older.
+    """
+
+    def __init__(self, size=None):
+        self.size = size or CONF.conductor_lastseen_cache_size
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            sent = self._entries.get(key)
+            if sent is not None:
+                self._entries.move_to_end(key)
+            return sent
+
+    def _set(self, key, sent):
+        with self._lock:
+            if self._entries.get(key, sent) > sent:
+                return
+            self._entries[key] = sent
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def _discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def get(self, instance_id, method_name):
+        """Get the last seen timestamp, None if no message was seen."""
+        key = (instance_id, method_name)
+        sent = self._get(key)
+        if sent is None:
+            seen = LastSeen.load(instance_id=instance_id,
+                                 method_name=method_name)
+            if seen is not None and seen.sent is not None:
+                sent = float(seen.sent)
+                self._set(key, sent)
+        return sent
+
+    def get_all(self, instance_ids, method_name):
+        """Get the last seen timestamps of the instances.
+
+        The timestamps missing in the cache are loaded in one query.
+
+        :returns a dict of the sent timestamps by instance id.
+        """
+        found = {}
+        missing = []
+        for instance_id in instance_ids:
+            sent = self._get((instance_id, method_name))
+            if sent is None:
+                missing.append(instance_id)
+            else:
+                found[instance_id] = sent
+
+        for instance_id, sent in LastSeen.load_all(
+                missing, method_name).items():
+            self._set((instance_id, method_name), sent)
+            found[instance_id] = sent
+        return found
+
+    def check_and_set(self, instance_id, method_name, sent):
+        """Record the timestamp of a message if it is the newest one.
+
+        :returns False if a newer or equal timestamp was already seen.
+        """
+        key = (instance_id, method_name)
+        last_sent = self._get(key)
+        if last_sent is not None:
+            if last_sent >= sent:
+                return False
+            if LastSeen.update_if_older(instance_id, method_name, sent):
+                self._set(key, sent)
+                return True
+            # The row was updated by another Conductor process.
+            self._discard(key)
+
+        last_sent = self.get(instance_id, method_name)
+        if last_sent is None:
+            LastSeen.create(instance_id=instance_id, method_name=method_name,
+                            sent=sent)
+        elif last_sent >= sent:
+            return False
+        elif not LastSeen.update_if_older(instance_id, method_name, sent):
+            self._discard(key)
+            return False
+        self._set(key, sent)
+        return True
+
+    def set_all(self, method_name, sent_by_instance):
+        """Write the timestamps of the instances in one statement."""
+        LastSeen.save_all(method_name, sent_by_instance)
+        for instance_id, sent in sent_by_instance.items():
+            self._set((instance_id, method_name), sent)
@@ -13,9 +13,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import json
+import threading
+import time
 
 from oslo_log import log as logging
+import six
 
 from trove.common import cfg
 from trove.common import exception
@@ -31,6 +35,9 @@ from trove.db import models as dbmodels
 CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
 
+# The type of the jobs refreshing a group on its instances and clusters.
+REFRESH_JOB_TYPE = 'configuration_refresh'
+
 
 class Configurations(object):
 
@@ -140,11 +147,8 @@ class Configuration(object):
             raise ModelNotFoundError(msg)
 
     @staticmethod
-    def find_parameter_details(name, detail_list):
-        for item in detail_list:
-            if item.name == name:
-                return item
-        return None
+    def find_parameter_details(name, rule_index):
+        return rule_index.get(name)
 
     @staticmethod
     def load_items(context, id):
@@ -154,20 +158,14 @@ class Configuration(object):
         config_items = DBConfigurationParameter.find_all(
             configuration_id=id, deleted=False).all()
 
-        detail_list = DatastoreConfigurationParameters.load_parameters(
-            datastore_v.id)
+        rule_index = load_rule_index(datastore_v.id)
 
         for item in config_items:
             rule = Configuration.find_parameter_details(
-                str(item.configuration_key), detail_list)
+                item.configuration_key, rule_index)
             if not rule:
                 continue
-            if rule.data_type == 'boolean':
-                item.configuration_value = bool(int(item.configuration_value))
-            elif rule.data_type == 'integer':
-                item.configuration_value = int(item.configuration_value)
-            else:
-                item.configuration_value = str(item.configuration_value)
+            item.configuration_value = rule.convert(item.configuration_value)
         return config_items
 
     def get_configuration_overrides(self):
@@ -188,17 +186,15 @@ class Configuration(object):
         config_items = Configuration.load_items(self.context,
                                                 id=self.configuration_id)
         LOG.debug("config_items: %s", config_items)
-        detail_list = DatastoreConfigurationParameters.load_parameters(
-            datastore_v.id)
+        rule_index = load_rule_index(datastore_v.id)
 
         for i in config_items:
             LOG.debug("config item: %s", i)
-            details = Configuration.find_parameter_details(
-                i.configuration_key, detail_list)
-            LOG.debug("parameter details: %s", details)
-            if not details:
+            rule = Configuration.find_parameter_details(
+                i.configuration_key, rule_index)
+            if not rule:
                 raise exception.NotFound(uuid=i.configuration_key)
-            if bool(details.restart_required):
+            if rule.restart_required:
                 return True
         return False
 
@@ -268,6 +264,177 @@ class DBDatastoreConfigurationParameters(dbmodels.DatabaseModelBase):
     ]
     _table_name = "datastore_configuration_parameters"
 
+    def save(self):
+        saved = super(DBDatastoreConfigurationParameters, self).save()
+        invalidate_rule_index(self.datastore_version_id)
+        return saved
+
+    def delete(self):
+        deleted = super(DBDatastoreConfigurationParameters, self).delete()
+        invalidate_rule_index(self.datastore_version_id)
+        return deleted
+
+
+class ConfigurationRule(object):
+    """A configuration parameter rule of a datastore version, compiled to
+    validate and convert the values of the parameter.
+    """
+
+    TYPES = {
+        'boolean': bool,
+        'string': six.string_types,
+        'integer': six.integer_types,
+        'float': float,
+    }
+
+    def __init__(self, db_info):
+        self.db_info = db_info
+        self.name = db_info.name
+        self.data_type = db_info.data_type
+        self.restart_required = bool(db_info.restart_required)
+        self.python_type = self.TYPES.get(self.data_type)
+        self.min_value = self._to_int(db_info.min_size)
+        self.max_value = self._to_int(db_info.max_size)
+
+    @staticmethod
+    def _to_int(size):
+        # ValueError is kept to be raised when a value is validated against
+        # the invalid size, not when the rules are loaded.
+        if size is None:
+            return None
+        try:
+            return int(size)
+        except ValueError as e:
+            return e
+
+    def validate(self, key, value):
+        """Check a value of the parameter named key by the user.
+
+        :raises: UnprocessableEntity if the value is not allowed.
+        """
+        if self.python_type is None:
+            raise exception.TroveError(_(
+                "Invalid or unsupported type defined in the "
+                "configuration-parameters configuration file."))
+
+        if not isinstance(value, self.python_type):
+            output = {"key": key, "type": self.data_type}
+            msg = _("The value provided for the configuration "
+                    "parameter %(key)s is not of type %(type)s.") % output
+            raise exception.UnprocessableEntity(message=msg)
+
+        # integer min/max checking
+        if isinstance(value, six.integer_types) and not isinstance(value,
+                                                                   bool):
+            if isinstance(self.min_value, ValueError):
+                raise exception.TroveError(_(
+                    "Invalid or unsupported min value defined in the "
+                    "configuration-parameters configuration file. "
+                    "Expected integer."))
+            if self.min_value is not None and value < self.min_value:
+                output = {"key": key, "min": self.min_value}
+                msg = _("The value for the configuration parameter "
+                        "%(key)s is less than the minimum allowed: "
+                        "%(min)s") % output
+                raise exception.UnprocessableEntity(message=msg)
+
+            if isinstance(self.max_value, ValueError):
+                raise exception.TroveError(_(
+                    "Invalid or unsupported max value defined in the "
+                    "configuration-parameters configuration file. "
+                    "Expected integer."))
+            if self.max_value is not None and value > self.max_value:
+                output = {"key": key, "max": self.max_value}
+                msg = _("The value for the configuration parameter "
+                        "%(key)s is greater than the maximum "
+                        "allowed: %(max)s") % output
+                raise exception.UnprocessableEntity(message=msg)
+
+    def convert(self, value):
+        """Convert a value of the parameter as stored in the database."""
+        if self.data_type == 'boolean':
+            return bool(int(value))
+        elif self.data_type == 'integer':
+            return int(value)
+        return str(value)
+
+
+class ConfigurationRuleIndex(object):
+    """The configuration parameter rules of a datastore version, looked up
+    by parameter name.
+    """
+
+    def __init__(self, db_rules):
+        self._rules = collections.OrderedDict(
+            (db_rule.name, ConfigurationRule(db_rule))
+            for db_rule in db_rules)
+        self._rules_by_lower_name = {
+            name.lower(): rule for name, rule in self._rules.items()}
+
+    def __len__(self):
+        return len(self._rules)
+
+    def __iter__(self):
+        return iter(self._rules.values())
+
+    def get(self, name):
+        return self._rules.get(name)
+
+    def get_ignore_case(self, name):
+        """Get the rule of a parameter name in any case, the values of a
+        configuration group are validated this way.
+        """
+        return self._rules_by_lower_name.get(str(name).lower())
+
+    @property
+    def db_rules(self):
+        return [rule.db_info for rule in self]
+
+
+_RULE_INDEXES = {}
+_RULE_INDEX_LOCK = threading.Lock()
+
+
+def load_rule_index(datastore_version_id):
+    """Load the rule index of a datastore version, cached in the process
+    for configuration_parameter_cache_ttl seconds.
+    """
+    now = time.time()
+    with _RULE_INDEX_LOCK:
+        entry = _RULE_INDEXES.get(datastore_version_id)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+
+    index = ConfigurationRuleIndex(
+        DatastoreConfigurationParameters.load_parameters(
+            datastore_version_id))
+    if CONF.configuration_parameter_cache_ttl:
+        with _RULE_INDEX_LOCK:
+            _RULE_INDEXES[datastore_version_id] = (
+                now + CONF.configuration_parameter_cache_ttl, index)
+    return index
+
+
+def load_rule(datastore_version_id, name):
+    """Load the rule of a parameter from the rule index of a datastore
+    version.
+    """
+    rule = load_rule_index(datastore_version_id).get(name)
+    if rule is None:
+        raise exception.NotFound(uuid=name)
+    return rule
+
+
+def invalidate_rule_index(datastore_version_id=None):
+    """Clear the cached rule index of a datastore version, or of all of
+    them.
+    """
+    with _RULE_INDEX_LOCK:
+        if datastore_version_id is None:
+            _RULE_INDEXES.clear()
+        else:
+            _RULE_INDEXES.pop(datastore_version_id, None)
+
 
 class DatastoreConfigurationParameters(object):
 
@@ -357,6 +524,7 @@ def create_or_update_datastore_configuration_parameter(name,
             deleted=False,
         )
         get_db_api().save(config)
+    invalidate_rule_index(datastore_version.id)
 
 
 def load_datastore_configuration_parameters(datastore,
@@ -385,6 +553,7 @@ def remove_datastore_configuration_parameters(datastore, datastore_version):
     db_params = DatastoreConfigurationParameters.load_parameters(ds_version.id)
     for db_param in db_params:
         db_param.delete()
+    invalidate_rule_index(ds_version.id)
 
 
 def persisted_models():
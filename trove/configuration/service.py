@@ -14,7 +14,6 @@
 #    under the License.
 
 from oslo_log import log as logging
-import six
 
 from trove.cluster import models as cluster_models
 import trove.common.apischema as apischema
@@ -32,6 +31,8 @@ from trove.configuration.models import DBConfigurationParameter
 from trove.configuration import views
 from trove.datastore import models as ds_models
 from trove.instance import models as instances_models
+from trove.job import models as job_models
+from trove.taskmanager import api as task_api
 
 
 CONF = cfg.CONF
@@ -123,8 +124,7 @@ class ConfigurationsController(wsgi.Controller):
                 ConfigurationsController._validate_configuration(
                     body['configuration']['values'],
                     datastore_version,
-                    models.DatastoreConfigurationParameters.load_parameters(
-                        datastore_version.id))
+                    models.load_rule_index(datastore_version.id))
 
                 for k, v in values.items():
                     configItems.append(DBConfigurationParameter(
@@ -197,10 +197,9 @@ class ConfigurationsController(wsgi.Controller):
             models.Configuration.remove_all_items(context, group.id,
                                                   deleted_at)
             models.Configuration.save(group, items)
-            self._refresh_on_all_instances(context, id)
-            self._refresh_on_all_clusters(context, id)
+            job = self._refresh_on_all(context, id)
 
-        return wsgi.Result(None, 202)
+        return self._job_result(job)
 
     def edit(self, req, body, tenant_id, id):
         context = req.environ[wsgi.CONTEXT_KEY]
@@ -212,39 +211,63 @@ class ConfigurationsController(wsgi.Controller):
             items = self._configuration_items_list(group,
                                                    body['configuration'])
             models.Configuration.save(group, items)
-            self._refresh_on_all_instances(context, id)
-            self._refresh_on_all_clusters(context, id)
+            job = self._refresh_on_all(context, id)
 
-    def _refresh_on_all_instances(self, context, configuration_id):
-        """Refresh a configuration group on all single instances.
-        """
-        single_instances = instances_models.DBInstance.find_all(
-            tenant_id=context.project_id,
-            configuration_id=configuration_id,
-            cluster_id=None,
-            deleted=False).all()
-
-        config = models.Configuration(context, configuration_id)
-        for dbinstance in single_instances:
-            LOG.info("Re-applying configuration %s to instance: %s",
-                     configuration_id, dbinstance.id)
-            instance = instances_models.Instance.load(context, dbinstance.id)
-            instance.update_configuration(config)
-
-    def _refresh_on_all_clusters(self, context, configuration_id):
-        """Refresh a configuration group on all clusters.
-        """
-        LOG.debug("Re-applying configuration group '%s' to all clusters.",
-                  configuration_id)
-        clusters = cluster_models.DBCluster.find_all(
-            tenant_id=context.tenant,
-            configuration_id=configuration_id,
-            deleted=False).all()
+        return self._job_result(job)
+
+    def _refresh_on_all(self, context, configuration_id):
+        """Refresh a configuration group on all its single instances and
+        clusters.
 
-        for dbcluster in clusters:
-            LOG.debug("Re-applying configuration to cluster: %s", dbcluster.id)
-            cluster = cluster_models.Cluster.load(context, dbcluster.id)
-            cluster.configuration_attach(configuration_id)
+        The task manager refreshes them in a job, the job is returned or
+        None if the group isn't attached.
+        """
+        instance_ids = [dbinstance.id for dbinstance in
+                        instances_models.DBInstance.find_all(
+                            tenant_id=context.project_id,
+                            configuration_id=configuration_id,
+                            cluster_id=None,
+                            deleted=False).all()]
+        cluster_ids = [dbcluster.id for dbcluster in
+                       cluster_models.DBCluster.find_all(
+                           tenant_id=context.project_id,
+                           configuration_id=configuration_id,
+                           deleted=False).all()]
+        if not instance_ids and not cluster_ids:
+            return None
+
+        job = job_models.Job.create(
+            context, models.REFRESH_JOB_TYPE, configuration_id,
+            {'cluster_ids': cluster_ids,
+             'notification': context.notification.serialize(context)},
+            instance_ids + cluster_ids,
+            claimed=False)
+        LOG.info("Re-applying configuration %(cfg_id)s to %(instances)d "
+                 "instances and %(clusters)d clusters in job %(job)s.",
+                 {'cfg_id': configuration_id,
+                  'instances': len(instance_ids),
+                  'clusters': len(cluster_ids), 'job': job.id})
+        task_api.API(context).refresh_configuration(configuration_id,
+                                                    job.id)
+        return job
+
+    def _job_result(self, job):
+        if job is None:
+            return wsgi.Result(None, 202)
+        return wsgi.Result(views.ConfigurationJobView(job).data(), 202)
+
+    def job(self, req, tenant_id, id, job_id):
+        LOG.debug("Showing job %(job_id)s of configuration group %(id)s",
+                  {"job_id": job_id, "id": id})
+        context = req.environ[wsgi.CONTEXT_KEY]
+        configuration = models.Configuration.load(context, id)
+        self.authorize_config_action(context, 'job', configuration)
+        job = job_models.Job.load(context, job_id)
+        if (job.type != models.REFRESH_JOB_TYPE or
+                job.resource_id != configuration.id):
+            raise exception.NotFound(uuid=job_id)
+        return wsgi.Result(views.ConfigurationJobView(
+            job, job.load_items()).data(), 200)
 
     def _configuration_items_list(self, group, configuration):
         ds_version_id = group.datastore_version_id
@@ -255,8 +278,7 @@ class ConfigurationsController(wsgi.Controller):
             ConfigurationsController._validate_configuration(
                 configuration['values'],
                 ds_version,
-                models.DatastoreConfigurationParameters.load_parameters(
-                    ds_version.id))
+                models.load_rule_index(ds_version.id))
             for k, v in configuration['values'].items():
                 items.append(DBConfigurationParameter(
                     configuration_id=group.id,
@@ -267,15 +289,16 @@ class ConfigurationsController(wsgi.Controller):
 
     @staticmethod
     def _validate_configuration(values, datastore_version, config_rules):
+        """Validate the values against the rules of the datastore version,
+        a rule index or the list of the rules.
+        """
         LOG.info("Validating configuration values")
 
-        # create rules dictionary based on parameter name
-        rules_lookup = {}
-        for item in config_rules:
-            rules_lookup[item.name.lower()] = item
+        if not isinstance(config_rules, models.ConfigurationRuleIndex):
+            config_rules = models.ConfigurationRuleIndex(config_rules)
 
         # checking if there are any rules for the datastore
-        if not rules_lookup:
+        if not len(config_rules):
             output = {"version": datastore_version.name,
                       "name": datastore_version.datastore_name}
             msg = _("Configuration groups are not supported for this "
@@ -283,9 +306,9 @@ class ConfigurationsController(wsgi.Controller):
             raise exception.UnprocessableEntity(message=msg)
 
         for k, v in values.items():
-            key = k.lower()
+            rule = config_rules.get_ignore_case(k)
             # parameter name validation
-            if key not in rules_lookup:
+            if rule is None:
                 output = {"key": k,
                           "version": datastore_version.name,
                           "name": datastore_version.datastore_name}
@@ -294,66 +317,7 @@ class ConfigurationsController(wsgi.Controller):
                         "%(name)s %(version)s.") % output
                 raise exception.UnprocessableEntity(message=msg)
 
-            rule = rules_lookup[key]
-
-            # type checking
-            value_type = rule.data_type
-
-            if not isinstance(v, ConfigurationsController._find_type(
-                    value_type)):
-                output = {"key": k, "type": value_type}
-                msg = _("The value provided for the configuration "
-                        "parameter %(key)s is not of type %(type)s.") % output
-                raise exception.UnprocessableEntity(message=msg)
-
-            # integer min/max checking
-            if isinstance(v, six.integer_types) and not isinstance(v, bool):
-                if rule.min_size is not None:
-                    try:
-                        min_value = int(rule.min_size)
-                    except ValueError:
-                        raise exception.TroveError(_(
-                            "Invalid or unsupported min value defined in the "
-                            "configuration-parameters configuration file. "
-                            "Expected integer."))
-                    if v < min_value:
-                        output = {"key": k, "min": min_value}
-                        message = _(
-                            "The value for the configuration parameter "
-                            "%(key)s is less than the minimum allowed: "
-                            "%(min)s") % output
-                        raise exception.UnprocessableEntity(message=message)
-
-                if rule.max_size is not None:
-                    try:
-                        max_value = int(rule.max_size)
-                    except ValueError:
-                        raise exception.TroveError(_(
-                            "Invalid or unsupported max value defined in the "
-                            "configuration-parameters configuration file. "
-                            "Expected integer."))
-                    if v > max_value:
-                        output = {"key": k, "max": max_value}
-                        message = _(
-                            "The value for the configuration parameter "
-                            "%(key)s is greater than the maximum "
-                            "allowed: %(max)s") % output
-                        raise exception.UnprocessableEntity(message=message)
-
-    @staticmethod
-    def _find_type(value_type):
-        if value_type == "boolean":
-            return bool
-        elif value_type == "string":
-            return six.string_types
-        elif value_type == "integer":
-            return six.integer_types
-        elif value_type == "float":
-            return float
-        else:
-            raise exception.TroveError(_(
-                "Invalid or unsupported type defined in the "
-                "configuration-parameters configuration file."))
+            rule.validate(k, v)
 
     @staticmethod
     def _get_item(key, dictList):
@@ -380,8 +344,7 @@ class ParametersController(wsgi.Controller):
         self.authorize_request(req, 'index')
         ds, ds_version = ds_models.get_datastore_version(
             type=datastore, version=id)
-        rules = models.DatastoreConfigurationParameters.load_parameters(
-            ds_version.id)
+        rules = models.load_rule_index(ds_version.id).db_rules
         return wsgi.Result(views.ConfigurationParametersView(rules).data(),
                            200)
 
@@ -389,21 +352,20 @@ class ParametersController(wsgi.Controller):
         self.authorize_request(req, 'show')
         ds, ds_version = ds_models.get_datastore_version(
             type=datastore, version=id)
-        rule = models.DatastoreConfigurationParameters.load_parameter_by_name(
-            ds_version.id, name)
-        return wsgi.Result(views.ConfigurationParameterView(rule).data(), 200)
+        rule = models.load_rule(ds_version.id, name)
+        return wsgi.Result(
+            views.ConfigurationParameterView(rule.db_info).data(), 200)
 
     def index_by_version(self, req, tenant_id, version):
         self.authorize_request(req, 'index_by_version')
         ds_version = ds_models.DatastoreVersion.load_by_uuid(version)
-        rules = models.DatastoreConfigurationParameters.load_parameters(
-            ds_version.id)
+        rules = models.load_rule_index(ds_version.id).db_rules
         return wsgi.Result(views.ConfigurationParametersView(rules).data(),
                            200)
 
     def show_by_version(self, req, tenant_id, version, name):
         self.authorize_request(req, 'show_by_version')
         ds_models.DatastoreVersion.load_by_uuid(version)
-        rule = models.DatastoreConfigurationParameters.load_parameter_by_name(
-            version, name)
-        return wsgi.Result(views.ConfigurationParameterView(rule).data(), 200)
+        rule = models.load_rule(version, name)
+        return wsgi.Result(
+            views.ConfigurationParameterView(rule.db_info).data(), 200)
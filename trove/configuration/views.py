@@ -110,6 +110,36 @@ class DetailedConfigurationView(object):
         return {"configuration": configuration_dict}
 
 
+class ConfigurationJobView(object):
+    """The job refreshing a configuration group, with the status of each
+    instance and cluster if the items are given.
+    """
+
+    def __init__(self, job, items=None):
+        self.job = job
+        self.items = items
+
+    def data(self):
+        job_dict = {
+            "id": self.job.id,
+            "configuration_id": self.job.resource_id,
+            "status": self.job.status,
+            "created": self.job.created,
+            "updated": self.job.updated,
+        }
+        if self.items is not None:
+            cluster_ids = set(self.job.parameters.get('cluster_ids', []))
+            job_dict["instances"] = [
+                {"id": item.instance_id,
+                 "type": "cluster" if item.instance_id in cluster_ids
+                 else "instance",
+                 "status": item.status,
+                 "message": item.message}
+                for item in self.items]
+
+        return {"job": job_dict}
+
+
 class ConfigurationParameterView(object):
 
     def __init__(self, config):
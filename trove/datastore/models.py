@@ -15,6 +15,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import threading
+import time
+
 from oslo_log import log as logging
 
 from trove.common import cfg
@@ -39,50 +43,250 @@ def persisted_models():
         'capabilities': DBCapabilities,
         'datastore_versions': DBDatastoreVersion,
         'capability_overrides': DBCapabilityOverrides,
-        'datastore_version_metadata': DBDatastoreVersionMetadata
+        'datastore_version_metadata': DBDatastoreVersionMetadata,
+        'catalog_generations': DBCatalogGeneration,
     }
 
 
-class DBDatastore(dbmodels.DatabaseModelBase):
+class DBCatalogGeneration(dbmodels.DatabaseModelBase):
+
+    _data_fields = ['generation', 'updated']
+    _table_name = 'catalog_generations'
+
+
+class DBCatalogModel(dbmodels.DatabaseModelBase):
+    """A model of the datastore catalog, the processes reload the catalog
+    they cached when one is changed.
+    """
+
+    def save(self):
+        return self._write(super(DBCatalogModel, self).save)
+
+    def delete(self):
+        return self._write(super(DBCatalogModel, self).delete)
+
+    def update(self, **values):
+        return self._write(super(DBCatalogModel, self).update, **values)
+
+    @staticmethod
+    def _write(write, *args, **kwargs):
+        # A failed write raises before the generation is bumped.
+        result = write(*args, **kwargs)
+        bump_catalog_generation()
+        return result
+
+
+class DBDatastore(DBCatalogModel):
 
     _data_fields = ['name', 'default_version_id']
     _table_name = 'datastores'
 
 
-class DBCapabilities(dbmodels.DatabaseModelBase):
+class DBCapabilities(DBCatalogModel):
 
     _data_fields = ['name', 'description', 'enabled']
     _table_name = 'capabilities'
 
 
-class DBCapabilityOverrides(dbmodels.DatabaseModelBase):
+class DBCapabilityOverrides(DBCatalogModel):
 
     _data_fields = ['capability_id', 'datastore_version_id', 'enabled']
     _table_name = 'capability_overrides'
 
 
-class DBDatastoreVersion(dbmodels.DatabaseModelBase):
+class DBDatastoreVersion(DBCatalogModel):
 
     _data_fields = ['datastore_id', 'name', 'image_id', 'packages',
                     'active', 'manager']
     _table_name = 'datastore_versions'
 
 
-class DBDatastoreVersionMetadata(dbmodels.DatabaseModelBase):
+class DBDatastoreVersionMetadata(DBCatalogModel):
 
     _data_fields = ['datastore_version_id', 'key', 'value',
                     'created', 'deleted', 'deleted_at', 'updated_at']
     _table_name = 'datastore_version_metadata'
 
 
+# The id of the generation of the datastore catalog.
+CATALOG_GENERATION_ID = 'datastores'
+
+
+class DatastoreCatalog(object):
+    """The datastores, versions, capabilities and version associations at a
+    generation, indexed by id and name.
+    """
+
+    def __init__(self, generation):
+        self.generation = generation
+
+        self.datastores = {}
+        self.datastore_names = {}
+        for datastore in DBDatastore.find_all():
+            self.datastores[datastore.id] = datastore
+            self.datastore_names[datastore.name] = datastore
+
+        self.versions = {}
+        self.version_names = collections.defaultdict(list)
+        for version in DBDatastoreVersion.find_all():
+            self.versions[version.id] = version
+            self.version_names[(version.datastore_id, version.name)].append(
+                version)
+
+        self.capabilities = collections.OrderedDict()
+        self.capability_names = {}
+        for capability in DBCapabilities.find_all():
+            self.capabilities[capability.id] = capability
+            self.capability_names[capability.name] = capability
+
+        self.overrides = collections.defaultdict(dict)
+        for override in DBCapabilityOverrides.find_all():
+            self.overrides[override.datastore_version_id][
+                override.capability_id] = override
+
+        self.metadata = collections.defaultdict(list)
+        for metadata in DBDatastoreVersionMetadata.find_all(deleted=False):
+            self.metadata[(metadata.datastore_version_id,
+                           metadata.key)].append(metadata.value)
+
+    def find_datastore(self, id_or_name):
+        return (self.datastores.get(id_or_name) or
+                self.datastore_names.get(id_or_name))
+
+    def find_versions(self, datastore_id, id_or_name):
+        version = self.versions.get(id_or_name)
+        if version is not None and version.datastore_id == datastore_id:
+            return [version]
+        return self.version_names.get((datastore_id, id_or_name))
+
+    def find_capability(self, id_or_name):
+        return (self.capabilities.get(id_or_name) or
+                self.capability_names.get(id_or_name))
+
+    def version_capabilities(self, datastore_version_id):
+        """The capabilities of a version, the defaults overridden by the
+        ones of the version.
+        """
+        overrides = self.overrides.get(datastore_version_id, {})
+        capabilities = []
+        for capability in self.capabilities.values():
+            default = Capability(capability)
+            override = overrides.get(capability.id)
+            if override is None:
+                capabilities.append(default)
+            else:
+                capabilities.append(CapabilityOverride(override, default))
+        return capabilities
+
+    def version_metadata(self, datastore_version_id, key):
+        return tuple(self.metadata.get((datastore_version_id, key), ()))
+
+
+class CatalogCache(object):
+    """Cache the datastore catalog in the process.
+
+    The catalog is loaded at once and reloaded when its generation, bumped
+    on each change, differs. The generation is checked at most every
+    datastore_catalog_check_interval seconds, a change made by this process
+    is seen at once.
+    """
+
+    def __init__(self):
+        self._catalog = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _current(self):
+        """Return the current catalog and whether it was just loaded."""
+        now = time.time()
+        catalog = self._catalog
+        interval = CONF.datastore_catalog_check_interval
+        if catalog is not None and now - self._checked_at < interval:
+            return catalog, False
+
+        with self._lock:
+            generation = _load_catalog_generation()
+            catalog = self._catalog
+            loaded = catalog is None or catalog.generation != generation
+            if loaded:
+                catalog = DatastoreCatalog(generation)
+                self._catalog = catalog
+                LOG.debug("Loaded datastore catalog generation %(gen)s, "
+                          "%(hits)s hits and %(misses)s misses so far.",
+                          {'gen': generation, 'hits': self.hits,
+                           'misses': self.misses})
+            self._checked_at = now
+        return catalog, loaded
+
+    def lookup(self, find):
+        """Return find(catalog) for the current catalog.
+
+        The lookup is a miss if the catalog had to be loaded for it, or if
+        find returns None, in which case the caller looks in the database.
+        """
+        catalog, loaded = self._current()
+        result = find(catalog)
+        if loaded or result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._catalog = None
+
+    def stats(self):
+        catalog = self._catalog
+        return {'generation': catalog.generation if catalog else None,
+                'hits': self.hits,
+                'misses': self.misses}
+
+
+_CATALOG_CACHE = CatalogCache()
+
+
+def _load_catalog_generation():
+    generation = DBCatalogGeneration.get_by(id=CATALOG_GENERATION_ID)
+    return generation.generation if generation else 0
+
+
+def bump_catalog_generation():
+    """Make the processes reload the datastore catalog they cached."""
+    now = timeutils.utcnow()
+    if DBCatalogGeneration.get_by(id=CATALOG_GENERATION_ID) is None:
+        try:
+            DBCatalogGeneration.create(id=CATALOG_GENERATION_ID,
+                                       generation=1, updated=now)
+        except exception.DBConstraintError:
+            # Created by another process in the meantime.
+            bump_catalog_generation()
+            return
+    else:
+        DBCatalogGeneration.find_all(id=CATALOG_GENERATION_ID).update(
+            generation=DBCatalogGeneration.generation + 1, updated=now)
+    _CATALOG_CACHE.clear()
+
+
+def catalog_cache_stats():
+    """Return the generation of the datastore catalog cached in the
+    process and the number of lookups served from it (hits) or not
+    (misses).
+    """
+    return _CATALOG_CACHE.stats()
+
+
 class Capabilities(object):
 
     def __init__(self, datastore_version_id=None):
         self.capabilities = []
+        self._names = set()
         self.datastore_version_id = datastore_version_id
 
     def __contains__(self, item):
-        return item in [capability.name for capability in self.capabilities]
+        return item in self._names
 
     def __len__(self):
         return len(self.capabilities)
@@ -110,34 +314,10 @@ class Capabilities(object):
         Bulk load and override default capabilities with configured
         datastore version specific settings.
         """
-        capability_defaults = [Capability(c)
-                               for c in DBCapabilities.find_all()]
-
-        capability_overrides = []
-        if self.datastore_version_id is not None:
-            # This should always happen but if there is any future case where
-            # we don't have a datastore version id number it won't stop
-            # defaults from rendering.
-            capability_overrides = [
-                CapabilityOverride(ce)
-                for ce in DBCapabilityOverrides.find_all(
-                    datastore_version_id=self.datastore_version_id)
-            ]
-
-        def override(cap):
-            # This logic is necessary to apply datastore version specific
-            # capability overrides when they are present in the database.
-            for capability_override in capability_overrides:
-                if cap.id == capability_override.capability_id:
-                    # we have a mapped entity that indicates this datastore
-                    # version has an override so we honor that.
-                    return capability_override
-
-            # There were no overrides for this capability so we just hand it
-            # right back.
-            return cap
-
-        self.capabilities = [override(obj) for obj in capability_defaults]
+        self.capabilities = _CATALOG_CACHE.lookup(
+            lambda catalog: catalog.version_capabilities(
+                self.datastore_version_id))
+        self._names = set(capability.name for capability in self.capabilities)
 
         LOG.debug('Capabilities for datastore %(ds_id)s: %(capabilities)s',
                   {'ds_id': self.datastore_version_id,
@@ -212,11 +392,12 @@ class CapabilityOverride(BaseCapability):
     specific datastore version that overrides the default setting in the
     base capability's entry for Trove.
     """
-    def __init__(self, db_info):
+    def __init__(self, db_info, parent_capability=None):
         super(CapabilityOverride, self).__init__(db_info)
         # This *may* be better solved with a join in the SQLAlchemy model but
         # I was unable to get our query object to work properly for this.
-        parent_capability = Capability.load(db_info.capability_id)
+        if parent_capability is None:
+            parent_capability = Capability.load(db_info.capability_id)
         if parent_capability:
             self.parent_name = parent_capability.name
             self.parent_description = parent_capability.description
@@ -317,6 +498,10 @@ class Capability(BaseCapability):
 
         :returns: Capability
         """
+        db_info = _CATALOG_CACHE.lookup(
+            lambda catalog: catalog.find_capability(capability_id_or_name))
+        if db_info is not None:
+            return cls(db_info)
         try:
             return cls(DBCapabilities.find_by(id=capability_id_or_name))
         except exception.ModelNotFoundError:
@@ -347,6 +532,10 @@ class Datastore(object):
 
     @classmethod
     def load(cls, id_or_name):
+        db_info = _CATALOG_CACHE.lookup(
+            lambda catalog: catalog.find_datastore(id_or_name))
+        if db_info is not None:
+            return cls(db_info)
         try:
             return cls(DBDatastore.find_by(id=id_or_name))
         except exception.ModelNotFoundError:
@@ -401,6 +590,12 @@ class DatastoreVersion(object):
 
     @classmethod
     def load(cls, datastore, id_or_name):
+        versions = _CATALOG_CACHE.lookup(
+            lambda catalog: catalog.find_versions(datastore.id, id_or_name))
+        if versions:
+            if len(versions) > 1:
+                raise exception.NoUniqueMatch(name=id_or_name)
+            return cls(versions[0])
         try:
             return cls(DBDatastoreVersion.find_by(datastore_id=datastore.id,
                                                   id=id_or_name))
@@ -415,6 +610,10 @@ class DatastoreVersion(object):
 
     @classmethod
     def load_by_uuid(cls, uuid):
+        db_info = _CATALOG_CACHE.lookup(
+            lambda catalog: catalog.versions.get(uuid))
+        if db_info is not None:
+            return cls(db_info)
         try:
             return cls(DBDatastoreVersion.find_by(id=uuid))
         except exception.ModelNotFoundError:
@@ -575,6 +774,7 @@ def update_datastore(name, default_version):
         datastore.default_version_id = None
 
     db_api.save(datastore)
+    bump_catalog_generation()
 
 
 def update_datastore_version(datastore, name, manager, image_id, packages,
@@ -596,6 +796,7 @@ def update_datastore_version(datastore, name, manager, image_id, packages,
     version.active = active
 
     db_api.save(version)
+    bump_catalog_generation()
 
 
 class DatastoreVersionMetadata(object):
@@ -607,6 +808,17 @@ class DatastoreVersionMetadata(object):
         datastore and datastore version name.
         """
         db_api.configure_db(CONF)
+
+        def find(catalog):
+            datastore = catalog.datastore_names.get(datastore_name)
+            versions = datastore and catalog.version_names.get(
+                (datastore.id, datastore_version_name))
+            return versions[0].id if versions else None
+
+        datastore_version_id = _CATALOG_CACHE.lookup(find)
+        if datastore_version_id is not None:
+            return datastore_version_id
+
         db_ds_record = DBDatastore.find_by(
             name=datastore_name
         )
@@ -723,12 +935,10 @@ class DatastoreVersionMetadata(object):
             # metadata table return all the associated flavors for
             # that datastore version.
             nova_flavors = create_nova_client(context).flavors.list()
-            bound_flavors = DBDatastoreVersionMetadata.find_all(
-                datastore_version_id=datastore_version.id,
-                key='flavor', deleted=False
-            )
-            if (bound_flavors.count() != 0):
-                bound_flavors = tuple(f.value for f in bound_flavors)
+            bound_flavors = _CATALOG_CACHE.lookup(
+                lambda catalog: catalog.version_metadata(
+                    datastore_version.id, 'flavor'))
+            if bound_flavors:
                 # Generate a filtered list of nova flavors
                 ds_nova_flavors = (f for f in nova_flavors
                                    if f.id in bound_flavors)
@@ -807,9 +1017,14 @@ class DatastoreVersionMetadata(object):
     def datastore_volume_type_associations_exist(cls,
                                                  datastore_name,
                                                  datastore_version_name):
-        return cls.list_datastore_volume_type_associations(
-            datastore_name,
-            datastore_version_name).count() > 0
+        if not (datastore_name and datastore_version_name):
+            msg = _("Specify the datastore_name and datastore_version_name.")
+            raise exception.BadRequest(msg)
+        datastore_version_id = cls._datastore_version_find(
+            datastore_name, datastore_version_name)
+        return len(_CATALOG_CACHE.lookup(
+            lambda catalog: catalog.version_metadata(
+                datastore_version_id, 'volume_type'))) > 0
 
     @classmethod
     def allowed_datastore_version_volume_types(cls, context,
@@ -14,6 +14,9 @@
 #    under the License.
 
 import sqlalchemy.exc
+from sqlalchemy.dialects import mysql
+from sqlalchemy.dialects import postgresql
+from sqlalchemy import orm
 
 from trove.common import exception
 from trove.db.sqlalchemy import migration
@@ -86,6 +89,85 @@ def update_all(query_func, model, conditions, values):
     query_func(model, **conditions).update(values)
 
 
+def insert_all(model, rows):
+    """Insert the rows of the model table in one batch.
+
+    The rows are dicts of column values including the primary key.
+    """
+    if not rows:
+        return
+
+    db_session = session.get_session()
+    db_session.execute(orm.class_mapper(model).local_table.insert(), rows)
+
+
+def upsert_all(model, rows, greatest=()):
+    """Insert the rows of the model table or update them if they exist.
+
+    The rows are dicts of column values including the primary key. MySQL and
+    PostgreSQL write all of them with a single statement, other databases
+    with bulk inserts and updates in one transaction.
+
+    :param greatest: the columns an existing row only updates to a greater
+                     value, it keeps its value if the new one is not greater.
+    """
+    if not rows:
+        return
+
+    mapper = orm.class_mapper(model)
+    table = mapper.local_table
+    pk_columns = [column.name for column in mapper.primary_key]
+    update_columns = [name for name in rows[0] if name not in pk_columns]
+    db_session = session.get_session()
+    dialect = db_session.bind.dialect.name
+
+    def _value(name, new_value):
+        # The value written to a column of an existing row.
+        if name not in greatest:
+            return new_value
+        old_value = table.c[name]
+        return sqlalchemy.case(
+            [(sqlalchemy.or_(old_value.is_(None), old_value < new_value),
+              new_value)],
+            else_=old_value)
+
+    if dialect == 'mysql':
+        statement = mysql.insert(table).values(rows)
+        statement = statement.on_duplicate_key_update(
+            **{name: _value(name, statement.inserted[name])
+               for name in update_columns})
+        db_session.execute(statement)
+    elif dialect == 'postgresql':
+        statement = postgresql.insert(table).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=pk_columns,
+            set_={name: _value(name, statement.excluded[name])
+                  for name in update_columns})
+        db_session.execute(statement)
+    else:
+        with db_session.begin():
+            keys = [tuple(row[name] for name in pk_columns) for row in rows]
+            query = db_session.query(*mapper.primary_key).filter(
+                sqlalchemy.tuple_(*mapper.primary_key).in_(keys))
+            existing = set(tuple(key) for key in query)
+            if greatest:
+                for row, key in zip(rows, keys):
+                    if key in existing:
+                        db_session.execute(
+                            table.update().where(sqlalchemy.and_(*[
+                                table.c[name] == row[name]
+                                for name in pk_columns])).values(
+                                {name: _value(name, row[name])
+                                 for name in update_columns}))
+            else:
+                db_session.bulk_update_mappings(
+                    model, [row for row, key in zip(rows, keys)
+                            if key in existing])
+            db_session.bulk_insert_mappings(
+                model, [row for row, key in zip(rows, keys)
+                        if key not in existing])
+
+
 def configure_db(options, *plugins):
     session.configure_db(options)
     configure_db_for_plugins(options, *plugins)
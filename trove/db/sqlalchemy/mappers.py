@@ -34,6 +34,8 @@ def map(engine, models):
                Table('datastores', meta, autoload=True))
     orm.mapper(models['datastore_versions'],
                Table('datastore_versions', meta, autoload=True))
+    orm.mapper(models['catalog_generations'],
+               Table('catalog_generations', meta, autoload=True))
     orm.mapper(models['datastore_version_metadata'],
                Table('datastore_version_metadata', meta, autoload=True))
     orm.mapper(models['capabilities'],
@@ -76,6 +78,8 @@ def map(engine, models):
                Table('modules', meta, autoload=True))
     orm.mapper(models['instance_modules'],
                Table('instance_modules', meta, autoload=True))
+    orm.mapper(models['jobs'], Table('jobs', meta, autoload=True))
+    orm.mapper(models['job_items'], Table('job_items', meta, autoload=True))
 
 
 def mapping_exists(model):
@@ -0,0 +1,63 @@
+# Copyright 2020 Catalyst Cloud
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from sqlalchemy import ForeignKey
+from sqlalchemy.schema import Column
+from sqlalchemy.schema import Index
+from sqlalchemy.schema import MetaData
+
+from trove.db.sqlalchemy.migrate_repo.schema import create_tables
+from trove.db.sqlalchemy.migrate_repo.schema import DateTime
+from trove.db.sqlalchemy.migrate_repo.schema import String
+from trove.db.sqlalchemy.migrate_repo.schema import Table
+from trove.db.sqlalchemy.migrate_repo.schema import Text
+
+
+meta = MetaData()
+
+jobs = Table(
+    'jobs',
+    meta,
+    Column('id', String(length=64), primary_key=True, nullable=False),
+    Column('type', String(length=64), nullable=False),
+    Column('resource_id', String(length=64), nullable=False),
+    Column('tenant_id', String(length=64)),
+    Column('host', String(length=255)),
+    Column('status', String(length=32), nullable=False),
+    Column('parameters', Text(length=65535)),
+    Column('created', DateTime(), nullable=False),
+    Column('updated', DateTime(), nullable=False),
+    # The unfinished jobs of a host are looked up to resume them.
+    Index('jobs_host_status', 'host', 'status'),
+)
+
+job_items = Table(
+    'job_items',
+    meta,
+    Column('id', String(length=64), primary_key=True, nullable=False),
+    Column('job_id', String(length=64),
+           ForeignKey('jobs.id', ondelete="CASCADE",
+                      onupdate="CASCADE"), nullable=False),
+    Column('instance_id', String(length=64), nullable=False),
+    Column('status', String(length=32), nullable=False),
+    Column('message', String(length=255)),
+    Column('created', DateTime(), nullable=False),
+    Column('updated', DateTime(), nullable=False),
+    Index('job_items_job_id_status', 'job_id', 'status'),
+)
+
+
+def upgrade(migrate_engine):
+    meta.bind = migrate_engine
+    create_tables([jobs, job_items])
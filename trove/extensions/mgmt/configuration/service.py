@@ -37,8 +37,7 @@ class ConfigurationsParameterController(wsgi.Controller):
     def index(self, req, tenant_id, version_id):
         """List all configuration parameters."""
         ds_version = ds_models.DatastoreVersion.load_by_uuid(version_id)
-        config_params = config_models.DatastoreConfigurationParameters
-        rules = config_params.load_parameters(ds_version.id)
+        rules = config_models.load_rule_index(ds_version.id).db_rules
         return wsgi.Result(views.MgmtConfigurationParametersView(rules).data(),
                            200)
 
@@ -46,10 +45,9 @@ class ConfigurationsParameterController(wsgi.Controller):
     def show(self, req, tenant_id, version_id, id):
         """Show a configuration parameter."""
         ds_models.DatastoreVersion.load_by_uuid(version_id)
-        config_params = config_models.DatastoreConfigurationParameters
-        rule = config_params.load_parameter_by_name(version_id, id)
-        return wsgi.Result(views.MgmtConfigurationParameterView(rule).data(),
-                           200)
+        rule = config_models.load_rule(version_id, id)
+        return wsgi.Result(
+            views.MgmtConfigurationParameterView(rule.db_info).data(), 200)
 
     def _validate_data_type(self, parameter):
         min_size = None
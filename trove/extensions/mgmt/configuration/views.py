@@ -46,7 +46,6 @@ class MgmtConfigurationParametersView(object):
 
     def data(self):
         params = []
-        LOG.debug(self.configs.__dict__)
         for p in self.configs:
             param = MgmtConfigurationParameterView(p)
             params.append(param.data())
@@ -11,22 +11,31 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import collections
 import datetime
+import time
 
+import eventlet
 from oslo_log import log as logging
 
 from trove.common import cfg
 from trove.common import clients
-from trove.common import exception
 from trove.common.i18n import _
 from trove.common import timeutils
+from trove.datastore import models as datastore_models
 from trove.extensions.mysql import models as mysql_models
 from trove.instance import models as instance_models
+from trove.instance import service_status as srvstatus
+from trove.instance.tasks import InstanceTasks
 from trove import rpc
 
 LOG = logging.getLogger(__name__)
 CONF = cfg.CONF
 
+# The part of a Nova server used by the exists notifications.
+ServerSummary = collections.namedtuple('ServerSummary',
+                                       ['id', 'status', 'user_id'])
+
 
 def load_mgmt_instances(context, deleted=None, client=None,
                         include_clustered=None):
@@ -82,9 +91,10 @@ def load_mgmt_instance(cls, context, id, include_deleted):
 
 
 class SimpleMgmtInstance(instance_models.BaseInstance):
-    def __init__(self, context, db_info, server, datastore_status):
+    def __init__(self, context, db_info, server, datastore_status,
+                 **kwargs):
         super(SimpleMgmtInstance, self).__init__(context, db_info, server,
-                                                 datastore_status)
+                                                 datastore_status, **kwargs)
 
     @property
     def status(self):
@@ -175,16 +185,40 @@ def _load_servers(instances, find_server):
 
 def publish_exist_events(transformer, admin_context):
     notifier = rpc.get_notifier("taskmanager")
-    notifications = transformer()
+    # Transformers without batches build all the notifications at once.
+    iter_batches = getattr(transformer, 'iter_batches', None)
+    batches = iter_batches() if iter_batches else [transformer()]
     # clear out admin_context.auth_token so it does not get logged
     admin_context.auth_token = None
-    for notification in notifications:
-        notifier.info(admin_context, "trove.instance.exists", notification)
+
+    start = time.time()
+    count = 0
+    for index, batch in enumerate(batches, 1):
+        for notification in batch:
+            notifier.info(admin_context, "trove.instance.exists", notification)
+        count += len(batch)
+        LOG.debug("Published batch %(index)d of exists notifications, "
+                  "%(count)d notifications in %(elapsed).3fs so far.",
+                  {'index': index, 'count': count,
+                   'elapsed': time.time() - start})
+        # Let the other green threads run between the batches.
+        eventlet.sleep(0)
+    LOG.info("Published %(count)d exists notifications in %(elapsed).3fs.",
+             {'count': count, 'elapsed': time.time() - start})
 
 
 class NotificationTransformer(object):
+    """Build the exists notifications of the instances.
+
+    The instances are loaded with their service status a page of
+    exists_notification_batch_size at a time by iter_batches, which
+    generates the notifications of each page. Calling the transformer
+    returns the notifications of all the instances.
+    """
+
     def __init__(self, **kwargs):
-        pass
+        self.batch_size = CONF.exists_notification_batch_size
+        self._datastore_versions = {}
 
     @staticmethod
     def _get_audit_period():
@@ -204,6 +238,21 @@ class NotificationTransformer(object):
                       datastore_manager)
         return datastore_manager_id
 
+    def _load_instance(self, context, db_info, server, service_status):
+        # The instances share a few datastore versions, each one is loaded
+        # once per run instead of once per instance.
+        version_id = db_info.datastore_version_id
+        if version_id not in self._datastore_versions:
+            ds_version = ds = None
+            if version_id:
+                ds_version = datastore_models.DatastoreVersion.load_by_uuid(
+                    version_id)
+                ds = datastore_models.Datastore.load(ds_version.datastore_id)
+            self._datastore_versions[version_id] = (ds_version, ds)
+        ds_version, ds = self._datastore_versions[version_id]
+        return SimpleMgmtInstance(context, db_info, server, service_status,
+                                  ds_version=ds_version, ds=ds)
+
     def transform_instance(self, instance, audit_start, audit_end):
         payload = {
             'audit_period_beginning': audit_start,
@@ -224,27 +273,26 @@ class NotificationTransformer(object):
             instance.datastore_version.manager, CONF.notification_service_id)
         return payload
 
-    def __call__(self):
+    def iter_batches(self):
+        """Generate the notifications a page of instances at a time.
+
+        There is a small window of opportunity during when the db resource
+        for an instance exists, but no InstanceServiceStatus for it has yet
+        been created. Such instances are left out, they are too new and will
+        get picked up the next round of notifications.
+        """
         audit_start, audit_end = NotificationTransformer._get_audit_period()
-        messages = []
-        db_infos = instance_models.DBInstance.find_all(deleted=False)
-        for db_info in db_infos:
-            try:
-                service_status = instance_models.InstanceServiceStatus.find_by(
-                    instance_id=db_info.id)
-            except exception.ModelNotFoundError:
-                # There is a small window of opportunity during when the db
-                # resource for an instance exists, but no InstanceServiceStatus
-                # for it has yet been created. We skip sending the notification
-                # message for all such instances. These instance are too new
-                # and will get picked up the next round of notifications.
-                LOG.debug("InstanceServiceStatus not found for %s. "
-                          "Will wait to send notification.", db_info.id)
-                continue
-            instance = SimpleMgmtInstance(None, db_info, None, service_status)
-            message = self.transform_instance(instance, audit_start, audit_end)
-            messages.append(message)
-        return messages
+        self._datastore_versions = {}
+        for page in instance_models.page_instances_with_status(
+                self.batch_size, deleted=False):
+            yield [self.transform_instance(
+                self._load_instance(None, db_info, None, service_status),
+                audit_start, audit_end)
+                for db_info, service_status in page]
+
+    def __call__(self):
+        return [message for batch in self.iter_batches()
+                for message in batch]
 
 
 class NovaNotificationTransformer(NotificationTransformer):
@@ -264,20 +312,67 @@ class NovaNotificationTransformer(NotificationTransformer):
         self._flavor_cache[flavor_id] = flavor.name if flavor else 'unknown'
         return self._flavor_cache[flavor_id]
 
-    def __call__(self):
+    def _load_servers(self):
+        """List the servers of all the projects a page at a time.
+
+        Only the status and the user of each server are kept.
+
+        :returns a dict of the servers by id.
+        """
+        servers = {}
+        marker = None
+        while True:
+            page = self.nova_client.servers.list(
+                search_opts={'all_tenants': 1}, marker=marker,
+                limit=self.batch_size)
+            if not page:
+                break
+            for server in page:
+                servers[server.id] = ServerSummary(server.id, server.status,
+                                                   server.user_id)
+            marker = page[-1].id
+        LOG.info("Found %d servers in Nova", len(servers))
+        return servers
+
+    def iter_batches(self):
+        """Generate the notifications a page of instances at a time.
+
+        The clustered instances and the instances without a server are left
+        out, like the SHUTDOWN instances.
+        """
         audit_start, audit_end = NotificationTransformer._get_audit_period()
-        instances = load_mgmt_instances(self.context, deleted=False,
-                                        client=self.nova_client)
-        messages = []
-        for instance in filter(
-                lambda inst: inst.status != 'SHUTDOWN' and inst.server,
-                instances):
-            message = {
-                'instance_type': self._lookup_flavor(instance.flavor_id),
-                'user_id': instance.server.user_id
-            }
-            message.update(self.transform_instance(instance,
-                                                   audit_start,
-                                                   audit_end))
-            messages.append(message)
-        return messages
+        self._datastore_versions = {}
+        servers = self._load_servers()
+        agent_expiry_interval = datetime.timedelta(
+            seconds=CONF.agent_heartbeat_expiry)
+        for page in instance_models.page_instances_with_status(
+                self.batch_size, deleted=False, cluster_id=None):
+            now = timeutils.utcnow()
+            messages = []
+            for db_info, service_status in page:
+                server = servers.get(db_info.compute_instance_id)
+                if server is None:
+                    continue
+                if InstanceTasks.BUILDING == db_info.task_status:
+                    db_info.server_status = "BUILD"
+                else:
+                    db_info.server_status = server.status
+                if (db_info.task_status == InstanceTasks.NONE and
+                        now - service_status.updated_at >
+                        agent_expiry_interval):
+                    service_status.status = (
+                        srvstatus.ServiceStatuses.FAILED_TIMEOUT_GUESTAGENT)
+
+                instance = self._load_instance(self.context, db_info, server,
+                                               service_status)
+                if instance.status == 'SHUTDOWN':
+                    continue
+                message = {
+                    'instance_type': self._lookup_flavor(instance.flavor_id),
+                    'user_id': server.user_id
+                }
+                message.update(self.transform_instance(instance,
+                                                       audit_start,
+                                                       audit_end))
+                messages.append(message)
+            yield messages
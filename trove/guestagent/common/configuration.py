@@ -14,6 +14,7 @@
 #    under the License.
 
 import abc
+import copy
 import os
 import re
 
@@ -91,6 +92,7 @@ class ConfigurationManager(object):
         self._codec = codec
         self._requires_root = requires_root
         self._value_cache = None
+        self._file_cache = ParsedFileCache(codec, requires_root)
 
         if not override_strategy:
             # Use OneFile strategy by default. Store the revisions in a
@@ -121,9 +123,8 @@ class ConfigurationManager(object):
         """
 
         try:
-            base_options = operating_system.read_file(
-                self._base_config_path, codec=self._codec,
-                as_root=self._requires_root)
+            base_options = copy.deepcopy(
+                self._file_cache.read(self._base_config_path))
         except Exception:
             LOG.warning('File %s not found', self._base_config_path)
             return None
@@ -148,15 +149,18 @@ class ConfigurationManager(object):
             self._override_strategy.remove(self.SYSTEM_PRE_USER_GROUP)
             self._override_strategy.remove(self.SYSTEM_POST_USER_GROUP)
 
-            operating_system.write_file(
-                self._base_config_path, options, as_root=self._requires_root)
-            operating_system.chown(
-                self._base_config_path, self._owner, self._group,
-                as_root=self._requires_root)
-            operating_system.chmod(
-                self._base_config_path, FileMode.ADD_READ_ALL,
-                as_root=self._requires_root)
-
+            with operating_system.batch():
+                operating_system.write_file(
+                    self._base_config_path, options,
+                    as_root=self._requires_root)
+                operating_system.chown(
+                    self._base_config_path, self._owner, self._group,
+                    as_root=self._requires_root)
+                operating_system.chmod(
+                    self._base_config_path, FileMode.ADD_READ_ALL,
+                    as_root=self._requires_root)
+
+            self._file_cache.invalidate(self._base_config_path)
             self.refresh_cache()
 
     def has_system_override(self, change_id):
@@ -203,6 +207,8 @@ class ConfigurationManager(object):
                 group_name, change_id, self._codec.deserialize(options))
         else:
             self._override_strategy.apply(group_name, change_id, options)
+            # The strategy may have rewritten the configuration file.
+            self._file_cache.invalidate(self._base_config_path)
             self.refresh_cache()
 
     def remove_system_override(self, change_id=DEFAULT_CHANGE_ID):
@@ -218,12 +224,75 @@ class ConfigurationManager(object):
 
     def _remove_override(self, group_name, change_id):
         self._override_strategy.remove(group_name, change_id)
+        self._file_cache.invalidate(self._base_config_path)
         self.refresh_cache()
 
     def refresh_cache(self):
         self._value_cache = self.parse_configuration()
 
 
+class ParsedFileCache(object):
+    """Cache the parsed contents of configuration files.
+
+    A file is read and parsed again only if its size or modification time
+    changed. The files written by the guestagent itself are invalidated
+    explicitly, their modification time may not change within the
+    resolution of the file system clock.
+
+    The cached contents are shared and must not be modified.
+    """
+
+    def __init__(self, codec, requires_root):
+        self._codec = codec
+        self._requires_root = requires_root
+        self._entries = {}
+
+    def read(self, path):
+        return self.read_all([path])[0][1]
+
+    def read_all(self, paths):
+        """Return a (signature, contents) pair for each of the files.
+
+        The files that changed are read with one request. The signature is
+        None if the file can't be checked, it is then never cached.
+        """
+        signatures = operating_system.stat_files(
+            paths, as_root=self._requires_root)
+        stale = [path for path, signature in zip(paths, signatures)
+                 if signature is None or
+                 self._entries.get(path, (None,))[0] != signature]
+        if stale:
+            contents = operating_system.read_files(
+                stale, codec=self._codec, as_root=self._requires_root)
+            fresh = dict(zip(stale, contents))
+        else:
+            fresh = {}
+
+        results = []
+        for path, signature in zip(paths, signatures):
+            if path in fresh:
+                if signature is None:
+                    self._entries.pop(path, None)
+                else:
+                    self._entries[path] = (signature, fresh[path])
+                results.append((signature, fresh[path]))
+            else:
+                results.append(self._entries[path])
+        return results
+
+    def invalidate(self, path=None):
+        """Forget a given file or all of them if 'path' is None."""
+        if path is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(path, None)
+
+    def retain(self, paths):
+        """Forget the files not in 'paths'."""
+        for path in set(self._entries).difference(paths):
+            del self._entries[path]
+
+
 @six.add_metaclass(abc.ABCMeta)
 class ConfigurationOverrideStrategy(object):
     """ConfigurationOverrideStrategy handles configuration files.
@@ -347,6 +416,10 @@ class ImportOverrideStrategy(ConfigurationOverrideStrategy):
         self._group = group
         self._codec = codec
         self._requires_root = requires_root
+        self._file_cache = ParsedFileCache(codec, requires_root)
+        # The options merged up to each revision file, as a list of
+        # (path, signature, options) in the order they were applied.
+        self._merged_revisions = []
 
     def exists(self, group_name, change_id):
         return self._find_revision_file(group_name, change_id) is not None
@@ -364,18 +437,20 @@ class ImportOverrideStrategy(ConfigurationOverrideStrategy):
                 self._revision_ext)
         else:
             # Update the existing file.
-            current = operating_system.read_file(
-                revision_file, codec=self._codec, as_root=self._requires_root)
+            current = copy.deepcopy(self._file_cache.read(revision_file))
             options = guestagent_utils.update_dict(options, current)
 
-        operating_system.write_file(
-            revision_file, options, codec=self._codec,
-            as_root=self._requires_root)
-        operating_system.chown(
-            revision_file, self._owner, self._group,
-            as_root=self._requires_root)
-        operating_system.chmod(
-            revision_file, FileMode.ADD_READ_ALL, as_root=self._requires_root)
+        with operating_system.batch():
+            operating_system.write_file(
+                revision_file, options, codec=self._codec,
+                as_root=self._requires_root)
+            operating_system.chown(
+                revision_file, self._owner, self._group,
+                as_root=self._requires_root)
+            operating_system.chmod(
+                revision_file, FileMode.ADD_READ_ALL,
+                as_root=self._requires_root)
+        self._invalidate_revisions([revision_file])
 
     def _initialize_import_directory(self):
         """Lazy-initialize the directory for imported revision files.
@@ -399,6 +474,21 @@ class ImportOverrideStrategy(ConfigurationOverrideStrategy):
         for path in removed:
             operating_system.remove(path, force=True,
                                     as_root=self._requires_root)
+        self._invalidate_revisions(removed)
+
+    def _invalidate_revisions(self, paths):
+        """Forget the cached contents of the written or removed revision
+        files, and the options merged from the first of them on.
+
+        A file rewritten with the same size within a tick of the file
+        timestamps keeps its signature, it must not be trusted.
+        """
+        for path in paths:
+            self._file_cache.invalidate(path)
+        for index, merged in enumerate(self._merged_revisions):
+            if merged[0] in paths:
+                del self._merged_revisions[index:]
+                break
 
     def get(self, group_name, change_id):
         revision_file = self._find_revision_file(group_name, change_id)
@@ -408,11 +498,33 @@ class ImportOverrideStrategy(ConfigurationOverrideStrategy):
                                           as_root=self._requires_root)
 
     def parse_updates(self):
-        parsed_options = {}
-        for path in self._collect_revision_files():
-            options = operating_system.read_file(path, codec=self._codec,
-                                                 as_root=self._requires_root)
-            guestagent_utils.update_dict(options, parsed_options)
+        """Merge the revision files in the order they were applied.
+
+        Only the revisions from the first one that changed since the last
+        call are merged again, on top of the saved results of the unchanged
+        ones.
+        """
+        revision_files = self._collect_revision_files()
+        revisions = self._file_cache.read_all(revision_files)
+        self._file_cache.retain(revision_files)
+
+        unchanged = 0
+        for path, (signature, _options), merged in zip(
+                revision_files, revisions, self._merged_revisions):
+            if signature is None or (path, signature) != merged[:2]:
+                break
+            unchanged += 1
+
+        merged_revisions = self._merged_revisions[:unchanged]
+        parsed_options = (copy.deepcopy(merged_revisions[-1][2])
+                          if merged_revisions else {})
+        for path, (signature, options) in list(
+                zip(revision_files, revisions))[unchanged:]:
+            guestagent_utils.update_dict(copy.deepcopy(options),
+                                         parsed_options)
+            merged_revisions.append(
+                (path, signature, copy.deepcopy(parsed_options)))
+        self._merged_revisions = merged_revisions
 
         return parsed_options
 
@@ -508,6 +620,7 @@ class OneFileOverrideStrategy(ConfigurationOverrideStrategy):
         self._requires_root = requires_root
         self._base_revision_file = guestagent_utils.build_file_path(
             self._revision_dir, self.BASE_REVISION_NAME, self.REVISION_EXT)
+        self._file_cache = ParsedFileCache(codec, requires_root)
 
         self._import_strategy.configure(
             base_config_path, owner, group, codec, requires_root)
@@ -529,6 +642,7 @@ class OneFileOverrideStrategy(ConfigurationOverrideStrategy):
                 # configuration file on the first 'apply()'.
                 operating_system.remove(self._base_revision_file, force=True,
                                         as_root=self._requires_root)
+                self._file_cache.invalidate(self._base_revision_file)
 
     def get(self, group_name, change_id):
         return self._import_strategy.get(group_name, change_id)
@@ -545,9 +659,8 @@ class OneFileOverrideStrategy(ConfigurationOverrideStrategy):
                 self._base_config_path, self._base_revision_file,
                 force=True, preserve=True, as_root=self._requires_root)
 
-        base_revision = operating_system.read_file(
-            self._base_revision_file, codec=self._codec,
-            as_root=self._requires_root)
+        base_revision = copy.deepcopy(
+            self._file_cache.read(self._base_revision_file))
         changes = self._import_strategy.parse_updates()
         updated_revision = guestagent_utils.update_dict(changes, base_revision)
         operating_system.write_file(
@@ -0,0 +1,317 @@
+# Copyright 2020 Catalyst Cloud
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""A long-lived privileged helper for the file operations of the guest agent.
+
+The helper is started once with sudo and serves batches of file operations
+(read, write, exists, stat, chown, chmod, list) sent over its stdin and
+stdout, instead of running a sudo command for each operation.
+
+Each message is a 4 bytes length followed by a JSON document. A request is a
+list of [operation, kwargs] pairs, the response the list of their results,
+{"result": value} or {"error": message}. File contents are base64 encoded.
+"""
+
+import base64
+import grp
+import json
+import os
+import pwd
+import re
+import stat
+import struct
+import subprocess
+import sys
+import threading
+
+from oslo_log import log as logging
+
+from trove.common import exception
+from trove.common.i18n import _
+
+LOG = logging.getLogger(__name__)
+
+HEADER = struct.Struct('>I')
+# Larger requests are rejected rather than buffered by the helper.
+MAX_REQUEST_SIZE = 64 * 2 ** 20
+
+
+def _read_message(stream, max_size=None):
+    """Read a message, None at the end of the stream.
+
+    :raises ValueError: if the message is truncated, too large or not JSON.
+    """
+    header = stream.read(HEADER.size)
+    if not header:
+        return None
+    if len(header) < HEADER.size:
+        raise ValueError('Truncated message header')
+    size = HEADER.unpack(header)[0]
+    if max_size is not None and size > max_size:
+        raise ValueError('Message of %d bytes is too large' % size)
+    data = stream.read(size)
+    if len(data) < size:
+        raise ValueError('Truncated message')
+    return json.loads(data.decode('utf-8'))
+
+
+def _write_message(stream, message):
+    data = json.dumps(message).encode('utf-8')
+    stream.write(HEADER.pack(len(data)) + data)
+    stream.flush()
+
+
+def _walk(path, recursive=True):
+    yield path
+    if recursive and os.path.isdir(path) and not os.path.islink(path):
+        for root, dirs, files in os.walk(path):
+            for name in dirs + files:
+                yield os.path.join(root, name)
+
+
+def _apply(func, path, recursive, force):
+    for item in _walk(path, recursive):
+        try:
+            func(item)
+        except OSError:
+            if not force:
+                raise
+
+
+def _read(path):
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'rb') as fp:
+        return base64.b64encode(fp.read()).decode('ascii')
+
+
+def _write(path, data):
+    # New files are only readable by root, like the copies of the temporary
+    # files written by the sudo path.
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as fp:
+        fp.write(base64.b64decode(data))
+
+
+def _exists(path, is_directory=False):
+    return os.path.isdir(path) if is_directory else os.path.isfile(path)
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return {'size': st.st_size, 'mtime': st.st_mtime_ns, 'mode': st.st_mode,
+            'uid': st.st_uid, 'gid': st.st_gid}
+
+
+def _get_id(name, getter):
+    if name is None or name == '':
+        return -1
+    if str(name).isdigit():
+        return int(name)
+    return getter(name)
+
+
+def _chown(path, user=None, group=None, recursive=True, force=False):
+    uid = _get_id(user, lambda name: pwd.getpwnam(name).pw_uid)
+    gid = _get_id(group, lambda name: grp.getgrnam(name).gr_gid)
+    # Like chown, symbolic links are only followed if not recursive.
+    chown = os.lchown if recursive else os.chown
+    _apply(lambda item: chown(item, uid, gid), path, recursive, force)
+
+
+def _chmod(path, reset=None, add=None, remove=None, recursive=True,
+           force=False):
+    def _chmod_item(item):
+        if os.path.islink(item):
+            return
+        mode = stat.S_IMODE(os.stat(item).st_mode)
+        if reset is not None:
+            mode = reset
+        mode = (mode | (add or 0)) & ~(remove or 0)
+        os.chmod(item, mode)
+
+    _apply(_chmod_item, path, recursive, force)
+
+
+def _list(root_dir, recursive=False, pattern=None, include_dirs=False):
+    return sorted(
+        os.path.abspath(os.path.join(root, name))
+        for (root, dirs, files) in os.walk(root_dir, topdown=True)
+        if recursive or (root == root_dir)
+        for name in (files + (dirs if include_dirs else []))
+        if not pattern or re.match(pattern, name))
+
+
+OPERATIONS = {
+    'read': _read,
+    'write': _write,
+    'exists': _exists,
+    'stat': _stat,
+    'chown': _chown,
+    'chmod': _chmod,
+    'list': _list,
+}
+
+
+def serve(stdin, stdout):
+    """Run the requests read from stdin until it is closed.
+
+    The helper exits on an invalid request, the stream may be out of sync
+    and the client starts a new helper.
+    """
+    while True:
+        try:
+            request = _read_message(stdin, max_size=MAX_REQUEST_SIZE)
+            if request is not None and not isinstance(request, list):
+                raise ValueError('The request is not a list')
+        except ValueError as e:
+            LOG.error("Invalid request to the privileged file helper: %s",
+                      e)
+            return
+        if request is None:
+            return
+
+        results = []
+        for operation in request:
+            try:
+                name, kwargs = operation
+                results.append({'result': OPERATIONS[name](**kwargs)})
+            except Exception as e:
+                results.append({'error': '%s: %s' % (type(e).__name__, e)})
+        _write_message(stdout, results)
+
+
+class FileHelper(object):
+    """The client of the privileged helper process.
+
+    Operations sent with defer() are queued and sent with the next call(),
+    or when the outermost batch() context exits. The helper is started
+    again by the next request if it exited.
+
+    The guest agent is monkey patched by eventlet, the pipes of the helper
+    are then green and waiting for a response only blocks the calling green
+    thread. The lock is a green lock too, the requests of the other green
+    threads wait for the current one.
+    """
+
+    def __init__(self, command=None):
+        if command is None:
+            command = [sys.executable, '-m', __name__]
+            if os.geteuid() != 0:
+                command = ['sudo', '-n'] + command
+        self.command = command
+        self._process = None
+        self._queue = []
+        self._batch_depth = 0
+        self._lock = threading.RLock()
+
+    def _start(self):
+        LOG.debug("Starting the privileged file helper: %s", self.command)
+        self._process = subprocess.Popen(
+            self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            close_fds=True)
+
+    def _send(self, operations):
+        if self._process is None or self._process.poll() is not None:
+            self._start()
+        try:
+            _write_message(self._process.stdin, operations)
+            results = _read_message(self._process.stdout)
+        except (IOError, ValueError):
+            results = None
+        if results is None:
+            self.stop()
+            raise exception.ProcessExecutionError(
+                description=_("The privileged file helper exited."))
+        return results
+
+    def execute(self, operations):
+        """Run a batch of [operation, kwargs] and return their results.
+
+        :raises:  :class:`ProcessExecutionError` if any operation failed.
+        """
+        with self._lock:
+            results = self._send(operations)
+
+        for (name, kwargs), result in zip(operations, results):
+            if 'error' in result:
+                raise exception.ProcessExecutionError(
+                    description=_("Privileged %(name)s failed on "
+                                  "%(path)s") % {
+                        'name': name,
+                        'path': kwargs.get('path', kwargs.get('root_dir'))},
+                    stderr=result['error'])
+        return [result['result'] for result in results]
+
+    def call(self, name, **kwargs):
+        """Run an operation after the queued ones, return its result."""
+        with self._lock:
+            operations, self._queue = self._queue, []
+            operations.append([name, kwargs])
+            return self.execute(operations)[-1]
+
+    def call_many(self, name, kwargs_list):
+        """Run an operation for each kwargs in one batch."""
+        with self._lock:
+            operations, self._queue = self._queue, []
+            operations.extend([name, kwargs] for kwargs in kwargs_list)
+            results = self.execute(operations)
+            return results[len(results) - len(kwargs_list):]
+
+    def defer(self, name, **kwargs):
+        """Queue an operation without a result inside of a batch."""
+        with self._lock:
+            self._queue.append([name, kwargs])
+            if not self._batch_depth:
+                self.flush()
+
+    def flush(self):
+        with self._lock:
+            operations, self._queue = self._queue, []
+            if operations:
+                self.execute(operations)
+
+    def begin_batch(self):
+        self._lock.acquire()
+        self._batch_depth += 1
+
+    def end_batch(self):
+        try:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.flush()
+        finally:
+            self._lock.release()
+
+    def stop(self):
+        with self._lock:
+            if self._process is not None:
+                try:
+                    self._process.stdin.close()
+                    self._process.wait()
+                except Exception:
+                    LOG.debug("Failed to stop the privileged file helper.",
+                              exc_info=True)
+                self._process = None
+
+
+def main():
+    serve(sys.stdin.buffer, sys.stdout.buffer)
+
+
+if __name__ == '__main__':
+    main()
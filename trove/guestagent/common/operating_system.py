@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import base64
+import contextlib
 from functools import reduce
 import inspect
 import operator
@@ -23,16 +25,70 @@ import stat
 import tempfile
 
 from oslo_concurrency.processutils import UnknownArgumentError
+from oslo_log import log as logging
 
+from trove.common import cfg
 from trove.common import exception
 from trove.common import utils
 from trove.common.i18n import _
 from trove.common.stream_codecs import IdentityCodec
+from trove.guestagent.common import file_helper
+
+CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
 
 REDHAT = 'redhat'
 DEBIAN = 'debian'
 SUSE = 'suse'
 
+_FILE_HELPER = None
+_FILE_HELPER_DISABLED = False
+
+
+def _file_helper():
+    """Get the privileged file helper.
+
+    :returns: None if the helper is disabled or failed to start, the file
+              operations then run a sudo command each.
+    """
+    global _FILE_HELPER, _FILE_HELPER_DISABLED
+    if _FILE_HELPER_DISABLED or not CONF.guest_file_helper:
+        return None
+
+    if _FILE_HELPER is None:
+        helper = file_helper.FileHelper()
+        try:
+            helper.call('exists', path='/', is_directory=True)
+        except Exception:
+            LOG.warning("Failed to start the privileged file helper, "
+                        "falling back to sudo commands.", exc_info=True)
+            helper.stop()
+            _FILE_HELPER_DISABLED = True
+            return None
+        _FILE_HELPER = helper
+
+    return _FILE_HELPER
+
+
+@contextlib.contextmanager
+def batch():
+    """Send the privileged writes, chown and chmod of the block at once.
+
+    The operations are sent to the privileged file helper with the next
+    operation that returns a result or when the block exits, so their errors
+    may be raised later than without a batch.
+    """
+    helper = _file_helper()
+    if helper is None:
+        yield
+        return
+
+    helper.begin_batch()
+    try:
+        yield
+    finally:
+        helper.end_batch()
+
 
 def read_file(path, codec=IdentityCodec(), as_root=False, decode=True):
     """
@@ -56,6 +112,10 @@ def read_file(path, codec=IdentityCodec(), as_root=False, decode=True):
     :raises:                :class:`UnprocessableEntity` if file doesn't exist.
     :raises:                :class:`UnprocessableEntity` if codec not given.
     """
+    if path and as_root and _file_helper():
+        return read_files([path], codec=codec, as_root=True,
+                          decode=decode)[0]
+
     if path and exists(path, is_directory=False, as_root=as_root):
         if decode:
             open_flag = 'r'
@@ -68,11 +128,43 @@ def read_file(path, codec=IdentityCodec(), as_root=False, decode=True):
             return _read_file_as_root(path, open_flag, convert_func)
 
         with open(path, open_flag) as fp:
+            if decode:
+                return codec.deserialize_from(fp)
             return convert_func(fp.read())
 
     raise exception.UnprocessableEntity(_("File does not exist: %s") % path)
 
 
+def read_files(paths, codec=IdentityCodec(), as_root=False, decode=True):
+    """Read several files like 'read_file'.
+
+    The files are read as root with one request to the privileged file
+    helper.
+
+    :returns:               A list of the file contents.
+
+    :raises:                :class:`UnprocessableEntity` if a file doesn't
+                            exist.
+    """
+    helper = _file_helper() if as_root else None
+    if helper is None:
+        return [read_file(path, codec=codec, as_root=as_root, decode=decode)
+                for path in paths]
+
+    contents = helper.call_many('read', [{'path': path} for path in paths])
+    results = []
+    for path, data in zip(paths, contents):
+        if data is None:
+            raise exception.UnprocessableEntity(
+                _("File does not exist: %s") % path)
+        data = base64.b64decode(data)
+        if decode:
+            results.append(codec.deserialize(data.decode('utf-8')))
+        else:
+            results.append(codec.serialize(data))
+    return results
+
+
 def exists(path, is_directory=False, as_root=False):
     """Check a given path exists.
 
@@ -92,7 +184,10 @@ def exists(path, is_directory=False, as_root=False):
 
     # Only check as root if we can't see it as the regular user, since
     # this is more expensive
-    if not found and as_root:
+    if not found and as_root and _file_helper():
+        found = _file_helper().call('exists', path=path,
+                                    is_directory=is_directory)
+    elif not found and as_root:
         test_flag = '-d' if is_directory else '-f'
         cmd = 'test %s %s && echo 1 || echo 0' % (test_flag, path)
         stdout, _ = utils.execute_with_timeout(
@@ -103,6 +198,36 @@ def exists(path, is_directory=False, as_root=False):
     return found
 
 
+def stat_files(paths, as_root=False):
+    """Return the size and modification time (in ns) of several files.
+
+    The files the regular user can't see are checked as root with one
+    request to the privileged file helper.
+
+    :returns:               A list of (size, mtime) tuples, None for the
+                            files that don't exist or can't be checked.
+    """
+    results = []
+    hidden = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            results.append((st.st_size, st.st_mtime_ns))
+        except OSError:
+            results.append(None)
+            hidden.append(len(results) - 1)
+
+    helper = _file_helper() if as_root else None
+    if hidden and helper is not None:
+        stats = helper.call_many(
+            'stat', [{'path': paths[index]} for index in hidden])
+        for index, st in zip(hidden, stats):
+            if st is not None:
+                results[index] = (st['size'], st['mtime'])
+
+    return results
+
+
 def find_executable(executable, path=None):
     """Finds a location of an executable in the locations listed in 'path'
 
@@ -172,11 +297,21 @@ def write_file(path, data, codec=IdentityCodec(), as_root=False, encode=True):
             open_flag = 'wb'
             convert_func = codec.deserialize
 
-        if as_root:
+        if as_root and _file_helper():
+            data = convert_func(data)
+            if not isinstance(data, bytes):
+                data = data.encode('utf-8')
+            _file_helper().defer(
+                'write', path=path,
+                data=base64.b64encode(data).decode('ascii'))
+        elif as_root:
             _write_file_as_root(path, data, open_flag, convert_func)
         else:
             with open(path, open_flag) as fp:
-                fp.write(convert_func(data))
+                if encode:
+                    codec.serialize_to(data, fp)
+                else:
+                    fp.write(convert_func(data))
                 fp.flush()
     else:
         raise exception.UnprocessableEntity(_("Invalid path: %s") % path)
@@ -576,6 +711,11 @@ def chown(path, user, group, recursive=True, force=False, **kwargs):
         raise exception.UnprocessableEntity(
             _("Please specify owner or group, or both."))
 
+    if kwargs.get('as_root') and _file_helper():
+        _file_helper().defer('chown', path=path, user=user, group=group,
+                             recursive=recursive, force=force)
+        return
+
     owner_group_modifier = _build_user_group_pair(user, group)
     options = (('f', force), ('R', recursive))
     _execute_shell_cmd('chown', options, owner_group_modifier, path, **kwargs)
@@ -625,7 +765,16 @@ def chmod(path, mode, recursive=True, force=False, **kwargs):
     :raises:                :class:`UnprocessableEntity` if no mode given.
     """
 
-    if path:
+    if path and kwargs.get('as_root') and _file_helper():
+        # Validate the mode like the shell command does.
+        _build_shell_chmod_mode(mode)
+        if inspect.ismethod(mode):
+            mode = mode()
+        _file_helper().defer(
+            'chmod', path=path, reset=mode.get_reset_mode(),
+            add=mode.get_add_mode(), remove=mode.get_remove_mode(),
+            recursive=recursive, force=force)
+    elif path:
         options = (('f', force), ('R', recursive))
         shell_modes = _build_shell_chmod_mode(mode)
         _execute_shell_cmd('chmod', options, shell_modes, path, **kwargs)
@@ -819,6 +968,11 @@ def list_files_in_directory(root_dir, recursive=False, pattern=None,
     :param include_dirs        Include paths to individual sub-directories.
     :type include_dirs         boolean
     """
+    if as_root and _file_helper():
+        return set(_file_helper().call(
+            'list', root_dir=root_dir, recursive=recursive, pattern=pattern,
+            include_dirs=include_dirs))
+
     if as_root:
         cmd_args = [root_dir, '-noleaf']
         if not recursive:
@@ -14,6 +14,7 @@
 
 import abc
 import re
+import time
 
 from oslo_log import log as logging
 from oslo_utils import encodeutils
@@ -67,23 +68,57 @@ BACKUP_LOG = re.compile(r'.*Backup successfully, checksum: (?P<checksum>.*), '
 class BaseMySqlAppStatus(service.BaseDbStatus):
     def __init__(self, docker_client):
         super(BaseMySqlAppStatus, self).__init__(docker_client)
+        self._probe_status = None
+        self._probe_time = 0
 
     def get_actual_db_status(self):
-        """Check database service status."""
-        status = docker_util.get_container_status(self.docker_client)
-        if status == "running":
+        """Check database service status.
+
+        The status is cached for status_probe_cache_ttl seconds, so the
+        periodic status update, the status waits and the heartbeats share
+        the same probe.
+        """
+        if (self._probe_status is not None and
+                time.time() - self._probe_time < CONF.status_probe_cache_ttl):
+            return self._probe_status
+
+        self._probe_status = self._probe_db_status()
+        self._probe_time = time.time()
+        return self._probe_status
+
+    def _ping_db(self):
+        """Check the database accepts connections.
+
+        A connection of the admin engine pool is checked out, which pings
+        it. Until the admin user is created, the mysql client is run in the
+        database container instead.
+        """
+        try:
+            engine = commmon_service.BaseMySqlApp.get_engine(admin_only=True)
+        except exception.UnprocessableEntity:
             root_pass = commmon_service.BaseMySqlApp.get_auth_password(
                 file="root.cnf")
             cmd = 'mysql -uroot -p%s -e "select 1;"' % root_pass
+            docker_util.run_command(self.docker_client, cmd)
+            return
+
+        engine.connect().close()
+
+    def _probe_db_status(self):
+        status = docker_util.get_container_status(self.docker_client)
+        if status == "running":
             try:
-                docker_util.run_command(self.docker_client, cmd)
+                self._ping_db()
                 return service_status.ServiceStatuses.HEALTHY
             except Exception as exc:
-                LOG.warning('Failed to run docker command, error: %s',
+                LOG.warning('Failed to connect to the database, error: %s',
                             str(exc))
-                container_log = docker_util.get_container_logs(
-                    self.docker_client, tail='all')
-                LOG.debug('container log: \n%s', '\n'.join(container_log))
+                if LOG.isEnabledFor(logging.DEBUG):
+                    container_log = docker_util.get_container_logs(
+                        self.docker_client,
+                        tail=CONF.status_probe_log_lines)
+                    LOG.debug('container log: \n%s',
+                              '\n'.join(container_log))
                 return service_status.ServiceStatuses.RUNNING
         elif status == "not running":
             return service_status.ServiceStatuses.SHUTDOWN
@@ -105,21 +140,32 @@ class BaseMySqlAdmin(object):
         self.mysql_root_access = mysql_root_access
         self.mysql_app = mysql_app
 
-    def _associate_dbs(self, user):
-        """Internal. Given a MySQLUser, populate its databases attribute."""
-        LOG.debug("Associating dbs to user %(name)s at %(host)s.",
-                  {'name': user.name, 'host': user.host})
+    def _associate_dbs(self, users):
+        """Internal. Given MySQLUsers, populate their databases attribute.
+
+        The databases of all the users are loaded with one query.
+        """
+        grantees = {"'%s'@'%s'" % (user.name, user.host): user
+                    for user in users}
+        if not grantees:
+            return
+        LOG.debug("Associating dbs to users %s.", ', '.join(grantees))
         with mysql_util.SqlClient(self.mysql_app.get_engine()) as client:
             q = sql_query.Query()
             q.columns = ["grantee", "table_schema"]
             q.tables = ["information_schema.SCHEMA_PRIVILEGES"]
             q.group = ["grantee", "table_schema"]
-            q.where = ["privilege_type != 'USAGE'"]
-            t = text(str(q))
-            db_result = client.execute(t)
+            q.where = ["privilege_type != 'USAGE'",
+                       "grantee IN :grantees"]
+            t = text(str(q)).bindparams(
+                sqlalchemy.bindparam('grantees', expanding=True))
+            db_result = client.execute(t, grantees=list(grantees))
             for db in db_result:
                 LOG.debug("\t db: %s.", db)
-                if db['grantee'] == "'%s'@'%s'" % (user.name, user.host):
+                # The grantee is compared case-insensitively by the query,
+                # only the rows of the exact user are theirs.
+                user = grantees.get(db['grantee'])
+                if user is not None:
                     user.databases = db['table_schema']
 
     def change_passwords(self, users):
@@ -257,8 +303,8 @@ class BaseMySqlAdmin(object):
                 return None
             found_user = result[0]
             user.host = found_user['Host']
-            self._associate_dbs(user)
-            return user
+        self._associate_dbs([user])
+        return user
 
     def grant_access(self, username, hostname, databases):
         """Grant a user permission to use a given database."""
@@ -397,9 +443,10 @@ class BaseMySqlAdmin(object):
                 mysql_user = models.MySQLUser(name=row['User'],
                                               host=row['Host'])
                 mysql_user.check_reserved()
-                self._associate_dbs(mysql_user)
                 next_marker = row['Marker']
-                users.append(mysql_user.serialize())
+                users.append(mysql_user)
+        self._associate_dbs(users)
+        users = [user.serialize() for user in users]
         if limit is not None and result.rowcount <= limit:
             next_marker = None
         LOG.info("users = %s", str(users))
@@ -440,23 +487,34 @@ class BaseMySqlApp(object):
         self.status = status
         self.docker_client = docker_client
 
-    def get_engine(self):
+    @classmethod
+    def get_engine(cls, admin_only=False):
         """Create the default engine with the updated admin user.
 
         If admin user not created yet, use root instead.
+
+        :param admin_only: Raise UnprocessableEntity instead of creating
+                           an engine for root if the admin user is not
+                           created yet.
         """
         global ENGINE
-        if ENGINE:
+        if ENGINE and (not admin_only or
+                       ENGINE.url.username == ADMIN_USER_NAME):
             return ENGINE
 
         user = ADMIN_USER_NAME
         password = ""
         try:
-            password = self.get_auth_password()
+            password = cls.get_auth_password()
         except exception.UnprocessableEntity:
+            if admin_only:
+                raise
             # os_admin user not created yet
             user = 'root'
 
+        if ENGINE:
+            # The cached engine of root is replaced by the admin one.
+            ENGINE.dispose()
         ENGINE = sqlalchemy.create_engine(
             CONNECTION_STR_FORMAT % (user,
                                      urllib.parse.quote(password.strip())),
@@ -733,6 +791,21 @@ class BaseMySqlApp(object):
                 f'--parent-checksum={backup_info["parent"]["checksum"]}')
             backup_type = 'incremental'
 
+        upload_opts = ''
+        if CONF.backup_upload_workers > 1:
+            upload_opts = (
+                f'--swift-upload-workers={CONF.backup_upload_workers} '
+                f'--swift-segment-size={CONF.backup_segment_max_size} ')
+
+        compression_opts = ''
+        if CONF.backup_compression != 'gzip':
+            compression_opts = (
+                f'--compression={CONF.backup_compression} '
+                f'--compression-threads={CONF.backup_compression_threads} ')
+        if CONF.backup_compression_level is not None:
+            compression_opts += (
+                f'--compression-level={CONF.backup_compression_level} ')
+
         backup_id = backup_info["id"]
         image = CONF.backup_docker_image
         name = 'db_backup'
@@ -752,6 +825,8 @@ class BaseMySqlApp(object):
             f'--os-token={user_token} --os-auth-url={auth_url} '
             f'--os-tenant-id={user_tenant} '
             f'--swift-extra-metadata={metadata} '
+            f'{upload_opts}'
+            f'{compression_opts}'
             f'{incremental}'
         )
 
@@ -833,6 +908,9 @@ class BaseMySqlApp(object):
             f'--restore-from={backup_info["location"]} '
             f'--restore-checksum={backup_info["checksum"]}'
         )
+        if CONF.backup_download_workers > 1:
+            command += (
+                f' --restore-workers={CONF.backup_download_workers}')
 
         LOG.debug('Stop the database and clean up the data before restore '
                   'from %s', backup_id)
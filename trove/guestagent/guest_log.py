@@ -13,11 +13,13 @@
 #    under the License.
 
 import enum
+import gzip
 import hashlib
 import os
 from requests.exceptions import ConnectionError
 
 from oslo_log import log as logging
+from oslo_utils import encodeutils
 from swiftclient.client import ClientException
 
 from trove.common import cfg
@@ -339,44 +341,63 @@ class GuestLog(object):
         self._published_size = 0
 
     def _publish_to_container(self, log_filename):
-        log_component, log_lines = '', 0
+        """Publish the log from the published size to its current end.
+
+        The log is read in binary in chunks of guest_log_limit bytes, each
+        chunk up to its last complete line is uploaded as one component
+        straight from the file. The published size is saved in the meta
+        file after each component, an interrupted publish resumes after
+        the last uploaded one.
+        """
         chunk_size = CONF.guest_log_limit
         container_name = self.get_container_name(force=True)
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
 
-        def _read_chunk(f):
-            while True:
-                current_chunk = f.read(chunk_size)
-                if not current_chunk:
-                    break
-                yield current_chunk
-
-        def _write_log_component():
-            object_headers.update({'x-object-meta-lines': str(log_lines)})
+        def _write_log_component(log, offset, length, log_lines):
+            headers = dict(object_headers)
+            headers['x-object-meta-lines'] = str(log_lines)
             component_name = '%s%s' % (self._object_prefix(),
                                        self._object_name())
-            self.swift_client.put_object(container_name,
-                                         component_name, log_component,
-                                         headers=object_headers)
-            self._published_size = (
-                self._published_size + len(log_component))
+            if CONF.guest_log_compression:
+                headers['x-object-meta-compression'] = 'gzip'
+                self.swift_client.put_object(
+                    container_name, component_name + '.gz',
+                    gzip.compress(view[:length]),
+                    content_type='application/gzip', headers=headers)
+            else:
+                log.seek(offset)
+                self.swift_client.put_object(
+                    container_name, component_name, log,
+                    content_length=length, headers=headers)
+            self._published_size = offset + length
             self._published_header_digest = self._header_digest
+            self._put_meta_details()
 
         self._refresh_details()
         self._put_meta_details()
         object_headers = self._get_headers()
-        with open(log_filename, 'r') as log:
-            LOG.debug("seeking to %s", self._published_size)
-            log.seek(self._published_size)
-            for chunk in _read_chunk(log):
-                for log_line in chunk.splitlines():
-                    if len(log_component) + len(log_line) > chunk_size:
-                        _write_log_component()
-                        log_component, log_lines = '', 0
-                    log_component = log_component + log_line + '\n'
+        with open(log_filename, 'rb') as log:
+            end = os.fstat(log.fileno()).st_size
+            offset = self._published_size
+            LOG.debug("Publishing log from %(offset)s to %(end)s",
+                      {'offset': offset, 'end': end})
+            while offset < end:
+                log.seek(offset)
+                length = log.readinto(view[:min(chunk_size, end - offset)])
+                if not length:
+                    break
+                if offset + length < end:
+                    # Cut the component after its last complete line, a
+                    # line longer than a chunk is split.
+                    last_newline = buffer.rfind(b'\n', 0, length)
+                    if last_newline >= 0:
+                        length = last_newline + 1
+                log_lines = buffer.count(b'\n', 0, length)
+                if buffer[length - 1] != ord('\n'):
                     log_lines += 1
-        if log_lines > 0:
-            _write_log_component()
-        self._put_meta_details()
+                _write_log_component(log, offset, length, log_lines)
+                offset += length
 
     def _put_meta_details(self):
         metafile_name = self._metafile_name()
@@ -413,4 +434,6 @@ class GuestLog(object):
         headers, metafile_details = self.swift_client.get_object(
             container_name, metafile_name)
         LOG.debug("Found meta details for '%s'", self._name)
-        return self._codec.deserialize(metafile_details)
+        # swiftclient returns the contents of the object as bytes.
+        return self._codec.deserialize(
+            encodeutils.safe_decode(metafile_details))
@@ -15,6 +15,8 @@
 #    under the License.
 
 """Model classes that form the core of instances functionality."""
+import base64
+import binascii
 from datetime import datetime
 from datetime import timedelta
 import os.path
@@ -26,7 +28,9 @@ from oslo_log import log as logging
 from oslo_utils import encodeutils
 from oslo_utils import netutils
 import six
+from sqlalchemy import and_
 from sqlalchemy import func
+from sqlalchemy import or_
 
 from trove.backup.models import Backup
 from trove.common import cfg
@@ -62,6 +66,9 @@ LOG = logging.getLogger(__name__)
 # Invalid states to contact the agent
 AGENT_INVALID_STATUSES = ["BUILD", "REBOOT", "RESIZE", "PROMOTE", "EJECT",
                           "UPGRADE"]
+# Maximum number of concurrent requests to Nova when loading servers by id
+SERVER_LOAD_POOL_SIZE = 10
+MARKER_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
 
 
 def ip_visible(ip, white_list_regex, black_list_regex):
@@ -95,6 +102,94 @@ def load_server(context, instance_id, server_id, region_name):
     return server
 
 
+def load_servers(context, region_name, server_ids):
+    """Get the servers by id.
+
+    The servers are fetched with up to SERVER_LOAD_POOL_SIZE concurrent
+    requests. Only the requested servers are fetched, listing the servers
+    of the project would grow with the project rather than with the page.
+
+    :returns a dict of the servers by id, the servers not found in Nova are
+             left out.
+    """
+    server_ids = set(server_ids)
+    client = clients.create_nova_client(context, region_name=region_name)
+
+    def _get_server(server_id):
+        try:
+            return client.servers.get(server_id)
+        except nova_exceptions.NotFound:
+            LOG.debug("Could not find nova server_id(%s).", server_id)
+            return None
+
+    servers = {}
+    for server_id, result in utils.map_concurrently(
+            _get_server, server_ids, pool_size=SERVER_LOAD_POOL_SIZE):
+        if isinstance(result, Exception):
+            raise result
+        if result is not None:
+            servers[server_id] = result
+    return servers
+
+
+def load_instance_statuses(instance_ids):
+    """Load the task and service statuses of the instances in one query.
+
+    :returns a dict of (task status, service status) tuples by instance id.
+    :raises ModelNotFoundError: if an instance or its service status doesn't
+                                exist.
+    """
+    instance_ids = list(instance_ids)
+    if not instance_ids:
+        return {}
+
+    query = DBInstance.query().filter_by(deleted=False).filter(
+        DBInstance.id.in_(instance_ids)).join(
+        InstanceServiceStatus,
+        InstanceServiceStatus.instance_id == DBInstance.id)
+    statuses = {
+        instance_id: (InstanceTask.from_code(task_id),
+                      srvstatus.ServiceStatus.from_code(status_id))
+        for instance_id, task_id, status_id in query.with_entities(
+            DBInstance.id, DBInstance.task_id,
+            InstanceServiceStatus.status_id)}
+
+    missing = set(instance_ids).difference(statuses)
+    if missing:
+        raise exception.ModelNotFoundError(
+            _("InstanceServiceStatus Not Found for instances: %s") %
+            ', '.join(sorted(missing)))
+    return statuses
+
+
+def page_instances_with_status(page_size, **conditions):
+    """Page through the instances joined with their service status.
+
+    The instances are ordered by id and each page is loaded with one query
+    starting after the last id of the previous page, so only one page is
+    held in memory. The instances without a service status are left out.
+
+    :param conditions: the DBInstance columns to filter on.
+    :returns a generator of lists of (DBInstance, InstanceServiceStatus).
+    """
+    marker = None
+    while True:
+        query = DBInstance.query().filter_by(**conditions)
+        if marker is not None:
+            query = query.filter(DBInstance.id > marker)
+        page = query.join(
+            InstanceServiceStatus,
+            InstanceServiceStatus.instance_id == DBInstance.id).with_entities(
+            DBInstance, InstanceServiceStatus).order_by(
+            DBInstance.id).limit(page_size).all()
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        marker = page[-1][0].id
+
+
 class InstanceStatus(object):
     HEALTHY = "HEALTHY"
     ACTIVE = "ACTIVE"
@@ -139,35 +234,67 @@ def load_simple_instance_server_status(context, db_info):
 
 def load_simple_instance_addresses(context, db_info):
     """Get addresses of the instance from Neutron."""
-    if 'BUILDING' == db_info.task_status.action:
-        db_info.addresses = []
-        return
-
-    addresses = []
-    user_ports = []
-    client = clients.create_neutron_client(context, db_info.region_id)
-    ports = client.list_ports(device_id=db_info.compute_instance_id)['ports']
-    for port in ports:
-        if 'Management port' not in port['description']:
-            LOG.debug('Found user port %s for instance %s', port['id'],
-                      db_info.id)
-
-            user_ports.append(port['id'])
-            for ip in port['fixed_ips']:
-                # TODO(lxkong): IPv6 is not supported
-                if netutils.is_valid_ipv4(ip.get('ip_address')):
-                    addresses.append(
-                        {'address': ip['ip_address'], 'type': 'private'})
-
-            fips = client.list_floatingips(port_id=port['id'])
-            if len(fips['floatingips']) == 0:
-                continue
-            fip = fips['floatingips'][0]
-            addresses.append(
-                {'address': fip['floating_ip_address'], 'type': 'public'})
+    load_instances_addresses(context, [db_info])
+
+
+def load_instances_addresses(context, db_infos):
+    """Get addresses of the instances from Neutron.
+
+    The ports and the floating IPs of all the instances in a region are
+    listed in one request each, so the number of Neutron calls doesn't depend
+    on the number of instances.
+    """
+    regions = {}
+    for db_info in db_infos:
+        if 'BUILDING' == db_info.task_status.action:
+            db_info.addresses = []
+            continue
+        regions.setdefault(db_info.region_id, []).append(db_info)
+
+    def _load_region_addresses(region_id):
+        region_infos = regions[region_id]
+        client = clients.create_neutron_client(context, region_id)
+        ports = client.list_ports(
+            device_id=[db_info.compute_instance_id
+                       for db_info in region_infos])['ports']
+        user_ports = [port for port in ports
+                      if 'Management port' not in port['description']]
+
+        fips = {}
+        if user_ports:
+            for fip in client.list_floatingips(
+                    port_id=[port['id'] for port in user_ports]
+            )['floatingips']:
+                fips.setdefault(fip['port_id'], fip)
+
+        for db_info in region_infos:
+            addresses = []
+            instance_ports = []
+            for port in user_ports:
+                if port['device_id'] != db_info.compute_instance_id:
+                    continue
 
-    db_info.ports = user_ports
-    db_info.addresses = addresses
+                LOG.debug('Found user port %s for instance %s', port['id'],
+                          db_info.id)
+                instance_ports.append(port['id'])
+                for ip in port['fixed_ips']:
+                    # TODO(lxkong): IPv6 is not supported
+                    if netutils.is_valid_ipv4(ip.get('ip_address')):
+                        addresses.append(
+                            {'address': ip['ip_address'], 'type': 'private'})
+
+                fip = fips.get(port['id'])
+                if fip:
+                    addresses.append({'address': fip['floating_ip_address'],
+                                      'type': 'public'})
+
+            db_info.ports = instance_ports
+            db_info.addresses = addresses
+
+    for region_id, result in utils.map_concurrently(_load_region_addresses,
+                                                    regions):
+        if isinstance(result, Exception):
+            raise result
 
 
 class SimpleInstance(object):
@@ -203,8 +330,8 @@ class SimpleInstance(object):
         self.root_pass = root_password
         self._fault = None
         self._fault_loaded = False
-        self.ds_version = None
-        self.ds = None
+        self.ds_version = ds_version
+        self.ds = ds
         self.locality = locality
         self.slave_list = None
 
@@ -651,7 +778,7 @@ class BaseInstance(SimpleInstance):
     -----------
     """
 
-    def __init__(self, context, db_info, server, datastore_status):
+    def __init__(self, context, db_info, server, datastore_status, **kwargs):
         """
         Creates a new initialized representation of an instance composed of its
         state in the database and its state from Nova
@@ -669,7 +796,8 @@ class BaseInstance(SimpleInstance):
         :type server: novaclient.v2.servers.Server
         :typdatastore_statusus: trove.instance.models.InstanceServiceStatus
         """
-        super(BaseInstance, self).__init__(context, db_info, datastore_status)
+        super(BaseInstance, self).__init__(context, db_info, datastore_status,
+                                           **kwargs)
         self.server = server
         self._guest = None
         self._nova_client = None
@@ -1700,35 +1828,70 @@ class Instances(object):
 
         if context is None:
             raise TypeError(_("Argument context not defined."))
-        client = clients.create_nova_client(context)
-        servers = client.servers.list()
         query_opts = {'tenant_id': context.project_id,
                       'deleted': False}
         if not include_clustered:
             query_opts['cluster_id'] = None
+        query = DBInstance.query()
         if instance_ids:
             if context.is_admin:
                 query_opts.pop('tenant_id')
-            filters = [DBInstance.id.in_(instance_ids)]
-            db_infos = DBInstance.find_by_filter(filters=filters, **query_opts)
-        else:
-            db_infos = DBInstance.find_all(**query_opts)
+            query = query.filter(DBInstance.id.in_(instance_ids))
+        query = query.filter_by(**query_opts)
         limit = utils.pagination_limit(context.limit, Instances.DEFAULT_LIMIT)
-        data_view = DBInstance.find_by_pagination('instances', db_infos, "foo",
-                                                  limit=limit,
-                                                  marker=context.marker)
-        next_marker = data_view.next_page_marker
-
-        find_server = create_server_list_matcher(servers)
-        for db in db_infos:
-            LOG.debug("Checking for db [id=%(db_id)s, "
-                      "compute_instance_id=%(instance_id)s].",
-                      {'db_id': db.id, 'instance_id': db.compute_instance_id})
+        db_infos, next_marker = Instances._paginate(query, limit,
+                                                    context.marker)
+
         ret = Instances._load_servers_status(load_simple_instance, context,
-                                             data_view.collection,
-                                             find_server)
+                                             db_infos)
         return ret, next_marker
 
+    @staticmethod
+    def _encode_marker(db_info):
+        marker = '%s,%s' % (db_info.created.strftime(MARKER_TIME_FORMAT),
+                            db_info.id)
+        return base64.urlsafe_b64encode(marker.encode()).decode()
+
+    @staticmethod
+    def _decode_marker(marker):
+        """Get the (created, id) key of the page marker.
+
+        Markers created before the instances were ordered by creation time
+        are plain instance ids.
+        """
+        try:
+            created, id = base64.urlsafe_b64decode(
+                marker.encode()).decode().split(',')
+            return datetime.strptime(created, MARKER_TIME_FORMAT), id
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            db_info = DBInstance.get_by(id=marker)
+            if not db_info:
+                raise exception.BadRequest(
+                    _("Invalid marker %s.") % marker)
+            return db_info.created, db_info.id
+
+    @staticmethod
+    def _paginate(query, limit, marker=None):
+        """Get a page of the instances ordered by (created, id).
+
+        The page is selected in the database by the key of the last instance
+        of the previous page encoded in the marker.
+
+        :returns the instances of the page and the marker of the next page.
+        """
+        if marker:
+            created, id = Instances._decode_marker(marker)
+            query = query.filter(or_(
+                DBInstance.created > created,
+                and_(DBInstance.created == created, DBInstance.id > id)))
+        db_infos = query.order_by(DBInstance.created,
+                                  DBInstance.id).limit(limit + 1).all()
+
+        if len(db_infos) > limit:
+            db_infos = db_infos[:limit]
+            return db_infos, Instances._encode_marker(db_infos[-1])
+        return db_infos, None
+
     @staticmethod
     def load_all_by_cluster_id(context, cluster_id, load_servers=True):
         db_instances = DBInstance.find_all(cluster_id=cluster_id,
@@ -1747,59 +1910,101 @@ class Instances(object):
         return db_insts
 
     @staticmethod
-    def _load_servers_status(load_instance, context, db_items, find_server):
-        ret = []
+    def _load_servers(context, db_items, find_server=None):
+        """Get the servers of the instances, the regions concurrently.
+
+        Only the servers of the given instances are fetched. If find_server
+        is given, it is used for the servers of the local region.
+
+        :returns a dict of server matchers by region name.
+        """
+        local_region = CONF.service_credentials.region_name
+        regions = {}
         for db in db_items:
-            server = None
+            regions.setdefault(db.region_id or local_region, []).append(
+                db.compute_instance_id)
+
+        matchers = {}
+        if find_server:
+            regions.pop(local_region, None)
+            matchers[local_region] = find_server
+
+        def _load_region_servers(region_name):
+            servers = load_servers(context, region_name, regions[region_name])
+            return create_server_list_matcher(list(servers.values()))
+
+        for region_name, result in utils.map_concurrently(
+                _load_region_servers, regions):
+            if isinstance(result, Exception):
+                raise result
+            matchers[region_name] = result
+        return matchers
+
+    @staticmethod
+    def _load_servers_status(load_instance, context, db_items,
+                             find_server=None):
+        """Load the instances with their server and service status.
+
+        The remote calls and queries are done for the whole list at once:
+        the servers of each region are fetched concurrently, the ports and
+        floating IPs are listed once per region and the service statuses are
+        loaded with one query.
+        """
+        db_items = list(db_items)
+        find_servers = Instances._load_servers(
+            context, [db for db in db_items
+                      if InstanceTasks.BUILDING != db.task_status],
+            find_server)
+        local_region = CONF.service_credentials.region_name
+
+        servers = {}
+        with_server = []
+        for db in db_items:
+            if InstanceTasks.BUILDING == db.task_status:
+                db.server_status = "BUILD"
+                db.addresses = []
+                continue
+
             try:
-                if InstanceTasks.BUILDING == db.task_status:
-                    db.server_status = "BUILD"
-                    db.addresses = []
-                else:
-                    try:
-                        region = CONF.service_credentials.region_name
-                        if (not db.region_id or db.region_id == region):
-                            server = find_server(db.id, db.compute_instance_id)
-                        else:
-                            nova_client = clients.create_nova_client(
-                                context, region_name=db.region_id)
-                            server = nova_client.servers.get(
-                                db.compute_instance_id)
-                        db.server_status = server.status
-
-                        load_simple_instance_addresses(context, db)
-                    except exception.ComputeInstanceNotFound:
-                        db.server_status = "SHUTDOWN"  # Fake it...
-                        db.addresses = []
-
-                datastore_status = InstanceServiceStatus.find_by(
-                    instance_id=db.id)
-                if not datastore_status.status:  # This should never happen.
-                    LOG.error("Server status could not be read for "
-                              "instance id(%s).", db.id)
-                    continue
+                server = find_servers[db.region_id or local_region](
+                    db.id, db.compute_instance_id)
+                db.server_status = server.status
+                servers[db.id] = server
+                with_server.append(db)
+            except exception.ComputeInstanceNotFound:
+                db.server_status = "SHUTDOWN"  # Fake it...
+                db.addresses = []
+
+        load_instances_addresses(context, with_server)
+        statuses = InstanceServiceStatus.find_all_by_instance_ids(
+            [db.id for db in db_items])
 
-                # Get the real-time service status.
-                LOG.debug('Task status for instance %s: %s', db.id,
-                          db.task_status)
-                if db.task_status == InstanceTasks.NONE:
-                    last_heartbeat_delta = (
-                        timeutils.utcnow() - datastore_status.updated_at)
-                    agent_expiry_interval = timedelta(
-                        seconds=CONF.agent_heartbeat_expiry)
-                    if last_heartbeat_delta > agent_expiry_interval:
-                        LOG.warning(
-                            'Guest agent heartbeat for instance %s has '
-                            'expried', id)
-                        datastore_status.status = \
-                            srvstatus.ServiceStatuses.FAILED_TIMEOUT_GUESTAGENT
-            except exception.ModelNotFoundError:
+        ret = []
+        for db in db_items:
+            datastore_status = statuses.get(db.id)
+            # This should never happen.
+            if not datastore_status or not datastore_status.status:
                 LOG.error("Server status could not be read for "
                           "instance id(%s).", db.id)
                 continue
 
+            # Get the real-time service status.
+            LOG.debug('Task status for instance %s: %s', db.id,
+                      db.task_status)
+            if db.task_status == InstanceTasks.NONE:
+                last_heartbeat_delta = (
+                    timeutils.utcnow() - datastore_status.updated_at)
+                agent_expiry_interval = timedelta(
+                    seconds=CONF.agent_heartbeat_expiry)
+                if last_heartbeat_delta > agent_expiry_interval:
+                    LOG.warning(
+                        'Guest agent heartbeat for instance %s has '
+                        'expried', db.id)
+                    datastore_status.status = \
+                        srvstatus.ServiceStatuses.FAILED_TIMEOUT_GUESTAGENT
+
             ret.append(load_instance(context, db, datastore_status,
-                                     server=server))
+                                     server=servers.get(db.id)))
         return ret
 
 
@@ -2050,6 +2255,18 @@ class InstanceServiceStatus(dbmodels.DatabaseModelBase):
         self['updated_at'] = timeutils.utcnow()
         return get_db_api().save(self)
 
+    @classmethod
+    def find_all_by_instance_ids(cls, instance_ids):
+        """Load the service statuses of the instances in one query.
+
+        :returns a dict of the service statuses by instance id.
+        """
+        if not instance_ids:
+            return {}
+        statuses = cls.find_by_filter(
+            filters=[cls.instance_id.in_(instance_ids)])
+        return {status.instance_id: status for status in statuses}
+
     def is_uptodate(self):
         """Check if the service status heartbeat is up to date."""
         heartbeat_expiry = timedelta(seconds=CONF.agent_heartbeat_expiry)
@@ -0,0 +1,238 @@
+# Copyright 2020 Catalyst Cloud
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Model classes for the jobs the task manager runs on many instances."""
+
+import collections
+import copy
+import datetime
+import json
+
+from oslo_log import log as logging
+
+from trove.common import cfg
+from trove.common import timeutils
+from trove.common import utils
+from trove.db import get_db_api
+from trove.db import models as dbmodels
+
+CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
+
+
+def persisted_models():
+    return {
+        'jobs': DBJob,
+        'job_items': DBJobItem,
+    }
+
+
+class JobStatus(object):
+    RUNNING = 'RUNNING'
+    COMPLETED = 'COMPLETED'
+
+
+class JobItemStatus(object):
+    PENDING = 'PENDING'
+    SUCCEEDED = 'SUCCEEDED'
+    SKIPPED = 'SKIPPED'
+    FAILED = 'FAILED'
+
+
+class DBJob(dbmodels.DatabaseModelBase):
+    _data_fields = ['type', 'resource_id', 'tenant_id', 'host', 'status',
+                    'parameters', 'created', 'updated']
+    _table_name = 'jobs'
+
+
+class DBJobItem(dbmodels.DatabaseModelBase):
+    _data_fields = ['job_id', 'instance_id', 'status', 'message', 'created',
+                    'updated']
+    _table_name = 'job_items'
+
+
+class Job(object):
+    """A job run by a task manager on a list of instances.
+
+    The job and the status of each of its instances are stored, a task
+    manager restarted in the middle of a job resumes it with the instances
+    still pending.
+    """
+
+    def __init__(self, db_info):
+        self.db_info = db_info
+
+    @property
+    def id(self):
+        return self.db_info.id
+
+    @property
+    def type(self):
+        return self.db_info.type
+
+    @property
+    def resource_id(self):
+        return self.db_info.resource_id
+
+    @property
+    def tenant_id(self):
+        return self.db_info.tenant_id
+
+    @property
+    def status(self):
+        return self.db_info.status
+
+    @property
+    def parameters(self):
+        return json.loads(self.db_info.parameters or '{}')
+
+    @property
+    def created(self):
+        return self.db_info.created
+
+    @property
+    def updated(self):
+        return self.db_info.updated
+
+    @classmethod
+    def create(cls, context, job_type, resource_id, parameters,
+               instance_ids, claimed=True):
+        """Create a running job, its instances pending.
+
+        :param claimed: whether the job is run by this host, else the task
+                        manager running it claims it.
+        """
+        db_info = DBJob.create(type=job_type,
+                               resource_id=resource_id,
+                               tenant_id=context.project_id,
+                               host=CONF.host if claimed else None,
+                               status=JobStatus.RUNNING,
+                               parameters=json.dumps(parameters))
+        now = timeutils.utcnow()
+        get_db_api().insert_all(DBJobItem, [
+            {'id': utils.generate_uuid(), 'job_id': db_info.id,
+             'instance_id': instance_id, 'status': JobItemStatus.PENDING,
+             'message': None, 'created': now, 'updated': now}
+            for instance_id in instance_ids])
+        LOG.debug("Created %(type)s job %(id)s for %(count)d instances.",
+                  {'type': job_type, 'id': db_info.id,
+                   'count': len(instance_ids)})
+        return cls(db_info)
+
+    @classmethod
+    def load(cls, context, job_id):
+        return cls(DBJob.find_by(context, id=job_id))
+
+    @classmethod
+    def load_unfinished(cls, job_type, host=None):
+        """Load the running jobs of a type started by a host, this one by
+        default.
+        """
+        return [cls(db_info) for db_info in DBJob.find_all(
+            type=job_type, host=host or CONF.host,
+            status=JobStatus.RUNNING).all()]
+
+    @classmethod
+    def load_unclaimed(cls, job_type, older_than):
+        """Load the running jobs of a type no host claimed in the
+        older_than seconds since their creation.
+        """
+        created_before = (timeutils.utcnow() -
+                          datetime.timedelta(seconds=older_than))
+        return [cls(db_info) for db_info in get_db_api().find_by_filter(
+            DBJob, filters=[DBJob.host.is_(None),
+                            DBJob.created < created_before],
+            type=job_type, status=JobStatus.RUNNING)]
+
+    @classmethod
+    def purge(cls, older_than, batch_size=1000):
+        """Delete the completed jobs last updated more than older_than
+        seconds ago, and their items.
+
+        :returns the number of jobs deleted.
+        """
+        db_api = get_db_api()
+        updated_before = (timeutils.utcnow() -
+                          datetime.timedelta(seconds=older_than))
+        count = 0
+        while True:
+            job_ids = [db_info.id for db_info in db_api.find_by_filter(
+                DBJob, filters=[DBJob.updated < updated_before],
+                status=JobStatus.COMPLETED).limit(batch_size)]
+            if not job_ids:
+                return count
+            db_api.find_by_filter(
+                DBJobItem, filters=[DBJobItem.job_id.in_(job_ids)]).delete(
+                synchronize_session=False)
+            db_api.find_by_filter(
+                DBJob, filters=[DBJob.id.in_(job_ids)]).delete(
+                synchronize_session=False)
+            count += len(job_ids)
+            LOG.debug("Purged %d completed jobs.", len(job_ids))
+
+    def claim(self):
+        """Make this host the one running the job unless another host
+        claimed it.
+
+        :returns True if this host claimed the job.
+        """
+        claimed = get_db_api().find_by_filter(
+            DBJob, filters=[DBJob.host.is_(None)], id=self.id).update(
+            {'host': CONF.host, 'updated': timeutils.utcnow()},
+            synchronize_session=False) > 0
+        self.db_info = DBJob.find_by(id=self.id)
+        return claimed
+
+    def resume_context(self, context):
+        """Get the context a job resumed by a task manager runs in.
+
+        The request that created the job is gone and the context of the
+        task manager is neither an admin one nor of the tenant of the job,
+        the instances of the job would not be found with it.
+        """
+        context = copy.copy(context)
+        context.is_admin = True
+        context.project_id = self.tenant_id
+        return context
+
+    def load_items(self, status=None):
+        conditions = {'job_id': self.id}
+        if status:
+            conditions['status'] = status
+        return DBJobItem.find_all(**conditions).all()
+
+    def pending_instance_ids(self):
+        return [item.instance_id
+                for item in self.load_items(JobItemStatus.PENDING)]
+
+    def count_items(self):
+        """Return the number of instances by status."""
+        return collections.Counter(item.status for item in self.load_items())
+
+    def set_item_status(self, instance_id, status, message=None):
+        DBJobItem.find_all(job_id=self.id, instance_id=instance_id).update(
+            status=status, message=message and message[:255],
+            updated=timeutils.utcnow())
+
+    def finish(self):
+        """Complete the job, the instances still pending are failed.
+
+        An instance is left pending if recording its result raised.
+        """
+        DBJobItem.find_all(job_id=self.id,
+                           status=JobItemStatus.PENDING).update(
+            status=JobItemStatus.FAILED,
+            message="The result of the instance was not recorded.",
+            updated=timeutils.utcnow())
+        self.db_info = self.db_info.update(status=JobStatus.COMPLETED)
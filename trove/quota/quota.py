@@ -107,6 +107,55 @@ class DbQuotaDriver(object):
 
         return result_usages
 
+    def get_quota_snapshot(self, resources, tenant_ids=None):
+        """
+        Retrieve the quotas and quota usages of many tenants at once.
+
+        The quotas and the quota usages of all the tenants are each loaded
+        with one query. Only the tenants with a quota or a quota usage in
+        the database are included. Like for a single tenant the quotas
+        missing in the database get the default value, the missing quota
+        usages are empty but they are not created.
+
+        :param resources: A list of the registered resources to get.
+        :param tenant_ids: The IDs of the tenants, all of them if None.
+        :returns: a dict of (quota, usage) tuples by resource, by tenant id.
+        """
+
+        resources = sorted(resources)
+        quota_filters = [Quota.resource.in_(resources)]
+        usage_filters = [QuotaUsage.resource.in_(resources)]
+        if tenant_ids is not None:
+            quota_filters.append(Quota.tenant_id.in_(tenant_ids))
+            usage_filters.append(QuotaUsage.tenant_id.in_(tenant_ids))
+
+        quotas = {(quota.tenant_id, quota.resource): quota
+                  for quota in Quota.find_by_filter(filters=quota_filters)}
+        usages = {(usage.tenant_id, usage.resource): usage
+                  for usage in QuotaUsage.find_by_filter(
+                      filters=usage_filters)}
+
+        snapshot = {}
+        for tenant_id in sorted({key[0] for key in quotas} |
+                                {key[0] for key in usages}):
+            tenant_snapshot = {}
+            for resource in resources:
+                quota = quotas.get((tenant_id, resource))
+                if quota is None:
+                    quota = Quota(tenant_id, resource,
+                                  self.resources[resource].default)
+                usage = usages.get((tenant_id, resource))
+                if usage is None:
+                    usage = QuotaUsage(tenant_id=tenant_id,
+                                       in_use=0,
+                                       reserved=0,
+                                       resource=resource,
+                                       updated=None)
+                tenant_snapshot[resource] = (quota, usage)
+            snapshot[tenant_id] = tenant_snapshot
+
+        return snapshot
+
     def get_defaults(self, resources):
         """Given a list of resources, retrieve the default quotas.
 
@@ -283,6 +332,16 @@ class QuotaEngine(object):
         return self._driver.get_all_quota_usages_by_tenant(tenant_id,
                                                            self._resources)
 
+    def get_quota_snapshot(self, tenant_ids=None):
+        """Retrieve the quotas and quota usages of many tenants at once.
+
+        :param tenant_ids: The IDs of the tenants, all the tenants with a
+                           quota or a quota usage if None.
+        :returns: a dict of (quota, usage) tuples by resource, by tenant id.
+        """
+
+        return self._driver.get_quota_snapshot(self._resources, tenant_ids)
+
     def check_quotas(self, tenant_id, **deltas):
         self._driver.check_quotas(tenant_id, self._resources, deltas)
 
@@ -282,6 +282,24 @@ class API(object):
                    include_clustered=include_clustered,
                    batch_size=batch_size, batch_delay=batch_delay, force=force)
 
+    def refresh_configuration(self, configuration_id, job_id):
+        LOG.debug("Making async call to refresh configuration %s",
+                  configuration_id)
+        version = self.API_BASE_VERSION
+
+        cctxt = self.client.prepare(version=version)
+        cctxt.cast(self.context, "refresh_configuration",
+                   configuration_id=configuration_id, job_id=job_id)
+
+    def instance_status_changed(self, instance_ids):
+        LOG.debug("Making async fanout call for the status change of "
+                  "instances: %s", instance_ids)
+        version = self.API_BASE_VERSION
+
+        cctxt = self.client.prepare(version=version, fanout=True)
+        cctxt.cast(self.context, "instance_status_changed",
+                   instance_ids=instance_ids)
+
 
 def load(context, manager=None):
     if manager:
@@ -13,13 +13,16 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
+import copy
+import time
+
 from oslo_log import log as logging
 from oslo_service import periodic_task
 from oslo_utils import importutils
 
 from trove.backup.models import Backup
 import trove.common.cfg as cfg
-from trove.common import clients
 from trove.common.context import TroveContext
 from trove.common import exception
 from trove.common.exception import ReplicationSlaveAttachError
@@ -27,12 +30,15 @@ from trove.common.exception import TroveError
 from trove.common.i18n import _
 from trove.common.notification import DBaaSQuotas, EndNotification
 from trove.common import server_group as srv_grp
+from trove.common import utils
 from trove.common.strategies.cluster import strategy
 from trove.datastore.models import DatastoreVersion
 import trove.extensions.mgmt.instances.models as mgmtmodels
 from trove.instance.tasks import InstanceTasks
+from trove.job import models as job_models
 from trove.taskmanager import models
 from trove.taskmanager.models import FreshInstanceTasks, BuiltInstanceTasks
+from trove.taskmanager import status_waiter
 from trove.quota.quota import QUOTAS
 
 LOG = logging.getLogger(__name__)
@@ -88,6 +94,76 @@ class Manager(periodic_task.PeriodicTasks):
             setattr(instance.db_info, 'task_status', status)
             instance.db_info.save()
 
+    @contextlib.contextmanager
+    def _failover_phase(self, operation, instance_id, phase, timings):
+        """Time a phase of a failover, the time is logged and added to
+        timings.
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            timings.append((phase, time.time() - start))
+            LOG.info("%(operation)s %(id)s: %(phase)s took %(elapsed).3fs.",
+                     {'operation': operation, 'id': instance_id,
+                      'phase': phase, 'elapsed': timings[-1][1]})
+
+    def _report_failover_timings(self, context, operation, instance_id,
+                                 timings):
+        """Log the phase timings of a failover and add them to the payload
+        of its end or error notification.
+        """
+        LOG.info("%(operation)s %(id)s: phase timings %(timings)s, "
+                 "%(total).3fs in total.",
+                 {'operation': operation, 'id': instance_id,
+                  'timings': ', '.join('%s=%.3fs' % timing
+                                       for timing in timings),
+                  'total': sum(elapsed for _, elapsed in timings)})
+        context.notification.payload['failover_timings'] = {
+            phase: round(elapsed, 3) for phase, elapsed in timings}
+
+    def _migrate_replicas(self, operation, old_master, master_candidate,
+                          replica_models):
+        """Detach the replicas from the old master and attach them to the
+        new one, at most replica_migration_concurrency at the same time.
+
+        :returns: the replicas that failed to be migrated and the error
+                  messages.
+        """
+        def _migrate(replica):
+            replica.detach_replica(old_master, for_failover=True)
+            replica.attach_replica(master_candidate)
+
+        results = utils.map_concurrently(
+            _migrate,
+            [replica for replica in replica_models
+             if replica.id != master_candidate.id],
+            CONF.replica_migration_concurrency)
+
+        exception_replicas = []
+        error_messages = ""
+        for replica, result in results:
+            if not isinstance(result, Exception):
+                continue
+            if not isinstance(result, exception.TroveError):
+                raise result
+            log_fmt = ("Unable to migrate replica %(slave)s from "
+                       "old replica source %(old_master)s to "
+                       "new source %(new_master)s on %(operation)s.")
+            exc_fmt = _("Unable to migrate replica %(slave)s from "
+                        "old replica source %(old_master)s to "
+                        "new source %(new_master)s on %(operation)s.")
+            msg_content = {
+                "slave": replica.id,
+                "old_master": old_master.id,
+                "new_master": master_candidate.id,
+                "operation": operation}
+            LOG.error(log_fmt, msg_content)
+
+            exception_replicas.append(replica)
+            error_messages += "%s (%s)\n" % (exc_fmt % msg_content, result)
+        return exception_replicas, error_messages
+
     def promote_to_replica_source(self, context, instance_id):
         # TODO(atomic77) Promote and eject need to be able to handle the case
         # where a datastore like Postgresql needs to treat the slave to be
@@ -119,53 +195,52 @@ class Manager(periodic_task.PeriodicTasks):
             # What we changed here is the order of the 6th step, previously
             # this step took place right after step 4, which causes failures
             # with MariaDB replications.
-            old_master.make_read_only(True)
-            latest_txn_id = old_master.get_latest_txn_id()
-            master_candidate.wait_for_txn(latest_txn_id)
-            master_candidate.detach_replica(old_master, for_failover=True)
-            master_candidate.enable_as_master()
-            master_candidate.make_read_only(False)
-
-            # At this point, should something go wrong, there
-            # should be a working master with some number of working slaves,
-            # and possibly some number of "orphaned" slaves
-
-            exception_replicas = []
-            error_messages = ""
-            for replica in replica_models:
-                try:
-                    if replica.id != master_candidate.id:
-                        replica.detach_replica(old_master, for_failover=True)
-                        replica.attach_replica(master_candidate)
-                except exception.TroveError as ex:
-                    log_fmt = ("Unable to migrate replica %(slave)s from "
-                               "old replica source %(old_master)s to "
-                               "new source %(new_master)s on promote.")
-                    exc_fmt = _("Unable to migrate replica %(slave)s from "
-                                "old replica source %(old_master)s to "
-                                "new source %(new_master)s on promote.")
-                    msg_content = {
-                        "slave": replica.id,
-                        "old_master": old_master.id,
-                        "new_master": master_candidate.id}
-                    LOG.error(log_fmt, msg_content)
-
-                    exception_replicas.append(replica)
-                    error_messages += "%s (%s)\n" % (
-                        exc_fmt % msg_content, ex)
-
-            # dealing with the old master after all the other replicas
-            # has been migrated.
-            old_master.attach_replica(master_candidate)
+            timings = []
+
+            def phase(name):
+                return self._failover_phase('promote', master_candidate.id,
+                                            name, timings)
+
             try:
-                old_master.demote_replication_master()
-            except Exception as ex:
-                log_fmt = "Exception demoting old replica source %s."
-                exc_fmt = _("Exception demoting old replica source %s.")
-                LOG.error(log_fmt, old_master.id)
-                exception_replicas.append(old_master)
-                error_messages += "%s (%s)\n" % (
-                    exc_fmt % old_master.id, ex)
+                with phase('read_only'):
+                    old_master.make_read_only(True)
+                with phase('txn_catch_up'):
+                    latest_txn_id = old_master.get_latest_txn_id()
+                    master_candidate.wait_for_txn(latest_txn_id)
+                with phase('detach'):
+                    master_candidate.detach_replica(old_master,
+                                                    for_failover=True)
+                with phase('enable'):
+                    master_candidate.enable_as_master()
+                    master_candidate.make_read_only(False)
+
+                # At this point, should something go wrong, there
+                # should be a working master with some number of working
+                # slaves, and possibly some number of "orphaned" slaves
+
+                with phase('repoint'):
+                    exception_replicas, error_messages = (
+                        self._migrate_replicas('promote', old_master,
+                                               master_candidate,
+                                               replica_models))
+
+                # dealing with the old master after all the other replicas
+                # has been migrated.
+                with phase('demote'):
+                    old_master.attach_replica(master_candidate)
+                    try:
+                        old_master.demote_replication_master()
+                    except Exception as ex:
+                        log_fmt = "Exception demoting old replica source %s."
+                        exc_fmt = _("Exception demoting old replica source "
+                                    "%s.")
+                        LOG.error(log_fmt, old_master.id)
+                        exception_replicas.append(old_master)
+                        error_messages += "%s (%s)\n" % (
+                            exc_fmt % old_master.id, ex)
+            finally:
+                self._report_failover_timings(context, 'promote',
+                                              master_candidate.id, timings)
 
             self._set_task_status([old_master] + replica_models,
                                   InstanceTasks.NONE)
@@ -226,35 +301,32 @@ class Manager(periodic_task.PeriodicTasks):
 
         def _eject_replica_source(old_master, replica_models):
 
-            master_candidate = self._most_current_replica(old_master,
-                                                          replica_models)
-            LOG.info('New master selected: %s', master_candidate.id)
-
-            master_candidate.detach_replica(old_master, for_failover=True)
-            master_candidate.enable_as_master()
-            master_candidate.make_read_only(False)
-
-            exception_replicas = []
-            error_messages = ""
-            for replica in replica_models:
-                try:
-                    if replica.id != master_candidate.id:
-                        replica.detach_replica(old_master, for_failover=True)
-                        replica.attach_replica(master_candidate)
-                except exception.TroveError as ex:
-                    log_fmt = ("Unable to migrate replica %(slave)s from "
-                               "old replica source %(old_master)s to "
-                               "new source %(new_master)s on eject.")
-                    exc_fmt = _("Unable to migrate replica %(slave)s from "
-                                "old replica source %(old_master)s to "
-                                "new source %(new_master)s on eject.")
-                    msg_content = {
-                        "slave": replica.id,
-                        "old_master": old_master.id,
-                        "new_master": master_candidate.id}
-                    LOG.error(log_fmt, msg_content)
-                    exception_replicas.append(replica)
-                    error_messages += "%s (%s)\n" % (exc_fmt % msg_content, ex)
+            timings = []
+
+            def phase(name):
+                return self._failover_phase('eject', old_master.id, name,
+                                            timings)
+
+            try:
+                with phase('select'):
+                    master_candidate = self._most_current_replica(
+                        old_master, replica_models)
+                LOG.info('New master selected: %s', master_candidate.id)
+
+                with phase('detach'):
+                    master_candidate.detach_replica(old_master,
+                                                    for_failover=True)
+                with phase('enable'):
+                    master_candidate.enable_as_master()
+                    master_candidate.make_read_only(False)
+                with phase('repoint'):
+                    exception_replicas, error_messages = (
+                        self._migrate_replicas('eject', old_master,
+                                               master_candidate,
+                                               replica_models))
+            finally:
+                self._report_failover_timings(context, 'eject',
+                                              old_master.id, timings)
 
             self._set_task_status([old_master] + replica_models,
                                   InstanceTasks.NONE)
@@ -325,9 +397,7 @@ class Manager(periodic_task.PeriodicTasks):
         else:
             ids = [instance_id]
             root_passwords = [root_password]
-        replica_number = 0
         replica_backup_id = backup_id
-        replicas = []
 
         master_instance_tasks = BuiltInstanceTasks.load(context, slave_of_id)
         server_group = master_instance_tasks.server_group
@@ -356,33 +426,40 @@ class Manager(periodic_task.PeriodicTasks):
 
         # Create replicas using the master backup
         replica_backup_id = snapshot['dataset']['snapshot_id']
+
+        def _create_replica(replica_index):
+            LOG.info("Creating replica %(num)d of %(count)d.",
+                     {'num': replica_index + 1, 'count': len(ids)})
+            replica = FreshInstanceTasks.load(copy.copy(context),
+                                              ids[replica_index])
+            replica.create_instance(
+                flavor, image_id, databases, users, datastore_manager,
+                packages, volume_size, replica_backup_id,
+                availability_zone, root_passwords[replica_index],
+                nics, overrides, None, snapshot, volume_type,
+                modules, scheduler_hints, access=access,
+                ds_version=ds_version)
+            replica.wait_for_instance(CONF.restore_usage_timeout, flavor)
+            LOG.info('Replica %s created successfully', replica.id)
+
+        # The replicas are built and restored at the same time, a failed
+        # one doesn't stop the others. The snapshot is deleted once all of
+        # them are done with it.
         try:
-            for replica_index in range(0, len(ids)):
-                replica_number += 1
-                LOG.info("Creating replica %(num)d of %(count)d.",
-                         {'num': replica_number, 'count': len(ids)})
-
-                instance_tasks = FreshInstanceTasks.load(
-                    context, ids[replica_index])
-                instance_tasks.create_instance(
-                    flavor, image_id, databases, users, datastore_manager,
-                    packages, volume_size, replica_backup_id,
-                    availability_zone, root_passwords[replica_index],
-                    nics, overrides, None, snapshot, volume_type,
-                    modules, scheduler_hints, access=access,
-                    ds_version=ds_version)
-                replicas.append(instance_tasks)
-
-            for replica in replicas:
-                replica.wait_for_instance(CONF.restore_usage_timeout, flavor)
-                LOG.info('Replica %s created successfully', replica.id)
-        except Exception as err:
-            LOG.error('Failed to create replica from %s, error: %s',
-                      slave_of_id, str(err))
-            raise
+            results = utils.map_concurrently(_create_replica,
+                                             range(len(ids)))
         finally:
             Backup.delete(context, replica_backup_id)
 
+        errors = [(ids[replica_index], result)
+                  for replica_index, result in results
+                  if isinstance(result, Exception)]
+        for replica_id, err in errors:
+            LOG.error('Failed to create replica %s from %s, error: %s',
+                      replica_id, slave_of_id, str(err))
+        if errors:
+            raise errors[0][1]
+
     def _create_instance(self, context, instance_id, name, flavor,
                          image_id, databases, users, datastore_manager,
                          packages, volume_size, backup_id, availability_zone,
@@ -491,6 +568,13 @@ class Manager(periodic_task.PeriodicTasks):
             context, module_id, md5, include_clustered,
             batch_size, batch_delay, force)
 
+    def refresh_configuration(self, context, configuration_id, job_id):
+        models.ConfigurationTasks.refresh_configuration(
+            context, configuration_id, job_id)
+
+    def instance_status_changed(self, context, instance_ids):
+        status_waiter.notify(instance_ids)
+
     if CONF.exists_notification_transformer:
         @periodic_task.periodic_task
         def publish_exists_event(self, context):
@@ -501,14 +585,29 @@ class Manager(periodic_task.PeriodicTasks):
             mgmtmodels.publish_exist_events(self.exists_transformer,
                                             self.admin_context)
 
+    if CONF.job_resume_interval:
+        @periodic_task.periodic_task(spacing=CONF.job_resume_interval,
+                                     run_immediately=True)
+        def resume_jobs(self, context):
+            models.ModuleTasks.resume_reapply_jobs(self.admin_context)
+            models.ConfigurationTasks.resume_refresh_jobs(self.admin_context)
+
+    if CONF.job_retention_period:
+        @periodic_task.periodic_task(spacing=3600)
+        def purge_jobs(self, context):
+            count = job_models.Job.purge(CONF.job_retention_period)
+            if count:
+                LOG.info("Purged %d completed jobs.", count)
+
     if CONF.quota_notification_interval:
         @periodic_task.periodic_task(spacing=CONF.quota_notification_interval)
         def publish_quota_notifications(self, context):
-            nova_client = clients.create_nova_client(self.admin_context)
-            for tenant in nova_client.tenants.list():
-                for quota in QUOTAS.get_all_quotas_by_tenant(tenant.id):
-                    usage = QUOTAS.get_quota_usage(quota)
+            snapshot = QUOTAS.get_quota_snapshot()
+            for tenant_snapshot in snapshot.values():
+                for quota, usage in tenant_snapshot.values():
                     DBaaSQuotas(self.admin_context, quota, usage).notify()
+            LOG.debug("Published the quota notifications of %d tenants.",
+                      len(snapshot))
 
     def __getattr__(self, name):
         """
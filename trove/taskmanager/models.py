@@ -14,10 +14,11 @@
 
 import copy
 import os.path
-import time
+import threading
 import traceback
 
 from cinderclient import exceptions as cinder_exceptions
+import eventlet
 from eventlet import greenthread
 from eventlet.timeout import Timeout
 from oslo_log import log as logging
@@ -31,6 +32,7 @@ from trove.backup.state import BackupState
 from trove.cluster import tasks
 from trove.cluster.models import Cluster
 from trove.cluster.models import DBCluster
+from trove.cluster.models import rolling_node_group
 from trove.common import cfg
 from trove.common import clients
 from trove.common import exception
@@ -49,6 +51,7 @@ from trove.common.exception import PollTimeOut
 from trove.common.exception import TroveError
 from trove.common.exception import VolumeCreationFailure
 from trove.common.i18n import _
+from trove.common.notification import DBaaSConfigurationEdit
 from trove.common.notification import DBaaSInstanceRestart
 from trove.common.notification import DBaaSInstanceUpgrade
 from trove.common.notification import EndNotification
@@ -58,6 +61,7 @@ from trove.common.notification import TroveInstanceModifyFlavor
 from trove.common.notification import TroveInstanceModifyVolume
 from trove.common.strategies.cluster import strategy
 from trove.common.utils import try_recover
+from trove.configuration import models as config_models
 from trove.extensions.mysql import models as mysql_models
 from trove.instance import models as inst_models
 from trove.instance import service_status as srvstatus
@@ -68,9 +72,11 @@ from trove.instance.models import Instance
 from trove.instance.models import InstanceServiceStatus
 from trove.instance.models import InstanceStatus
 from trove.instance.tasks import InstanceTasks
+from trove.job import models as job_models
 from trove.module import models as module_models
 from trove.module import views as module_views
 from trove.quota.quota import run_with_quotas
+from trove.taskmanager import status_waiter
 
 LOG = logging.getLogger(__name__)
 CONF = cfg.CONF
@@ -240,12 +246,15 @@ class ClusterTasks(Cluster):
                     ((status == fast_fail_statuses) or
                      (status in fast_fail_statuses)))
 
-        def _all_have_status(ids):
-            for instance_id in ids:
-                status = InstanceServiceStatus.find_by(
-                    instance_id=instance_id).get_status()
-                task_status = DBInstance.find_by(
-                    id=instance_id).get_task_status()
+        def _instance_ids_with_failures(statuses):
+            return [instance_id for instance_id in instance_ids
+                    if (_is_fast_fail_status(statuses[instance_id][1]) or
+                        (statuses[instance_id][0] ==
+                         InstanceTasks.BUILDING_ERROR_SERVER))]
+
+        def _all_have_status(statuses):
+            for instance_id in instance_ids:
+                task_status, status = statuses[instance_id]
                 if (_is_fast_fail_status(status) or
                     (task_status == InstanceTasks.BUILDING_ERROR_SERVER)):
                     # if one has failed, no need to continue polling
@@ -255,6 +264,9 @@ class ClusterTasks(Cluster):
                               {'id': instance_id, 'status': status,
                                'task_status': task_status})
                     return True
+
+            for instance_id in instance_ids:
+                status = statuses[instance_id][1]
                 if status != expected_status:
                     # if one is not in the expected state, continue polling
                     LOG.debug("Instance %(id)s was %(status)s.",
@@ -263,34 +275,21 @@ class ClusterTasks(Cluster):
 
             return True
 
-        def _instance_ids_with_failures(ids):
-            LOG.debug("Checking for service failures on instances: %s", ids)
-            failed_instance_ids = []
-            for instance_id in ids:
-                status = InstanceServiceStatus.find_by(
-                    instance_id=instance_id).get_status()
-                task_status = DBInstance.find_by(
-                    id=instance_id).get_task_status()
-                if (_is_fast_fail_status(status) or
-                    (task_status == InstanceTasks.BUILDING_ERROR_SERVER)):
-                    failed_instance_ids.append(instance_id)
-            return failed_instance_ids
-
         LOG.debug("Polling until all instances acquire %(expected)s "
                   "status: %(ids)s",
                   {'expected': expected_status, 'ids': instance_ids})
         try:
-            utils.poll_until(lambda: instance_ids,
-                             lambda ids: _all_have_status(ids),
-                             sleep_time=CONF.usage_sleep_time,
-                             time_out=CONF.usage_timeout)
+            statuses = status_waiter.wait_for_statuses(
+                instance_ids, _all_have_status,
+                sleep_time=CONF.usage_sleep_time,
+                time_out=CONF.usage_timeout)
         except PollTimeOut:
             LOG.exception("Timed out while waiting for all instances "
                           "to become %s.", expected_status)
             self.update_statuses_on_failure(cluster_id, shard_id)
             return False
 
-        failed_ids = _instance_ids_with_failures(instance_ids)
+        failed_ids = _instance_ids_with_failures(statuses)
         if failed_ids:
             LOG.error("Some instances failed: %s", failed_ids)
             self.update_statuses_on_failure(cluster_id, shard_id)
@@ -326,15 +325,75 @@ class ClusterTasks(Cluster):
         cluster.save()
         LOG.debug("end delete_cluster for id: %s", cluster_id)
 
-    def rolling_restart_cluster(self, context, cluster_id, delay_sec=0):
+    def _rolling_node_group(self, node):
+        """The group of a node, a rolling batch has one node per group."""
+        return rolling_node_group(node)
+
+    def _rolling_batches(self, nodes):
+        return utils.rolling_batches(nodes, CONF.cluster_rolling_batch_size,
+                                     self._rolling_node_group)
+
+    def _wait_for_healthy_nodes(self, instance_ids):
+        """Wait for the nodes of a rolling batch to be in service again.
+
+        :raises TroveError: if a node failed or isn't healthy in time.
+        """
+        healthy_statuses = [srvstatus.ServiceStatuses.HEALTHY,
+                            srvstatus.ServiceStatuses.RUNNING]
+        failed_statuses = [srvstatus.ServiceStatuses.FAILED,
+                           srvstatus.ServiceStatuses.FAILED_TIMEOUT_GUESTAGENT]
+
+        def _has_failed(task_status, status):
+            return task_status.is_error or status in failed_statuses
+
+        def _is_healthy(task_status, status):
+            return (task_status == InstanceTasks.NONE and
+                    status in healthy_statuses)
+
+        def _all_done(statuses):
+            return all(_has_failed(*statuses[instance_id]) or
+                       _is_healthy(*statuses[instance_id])
+                       for instance_id in instance_ids)
+
+        try:
+            statuses = status_waiter.wait_for_statuses(
+                instance_ids, _all_done,
+                sleep_time=CONF.usage_sleep_time,
+                time_out=CONF.usage_timeout)
+        except PollTimeOut:
+            raise TroveError(_("Timed out waiting for the nodes %s to be "
+                               "healthy.") % instance_ids)
+
+        failed_ids = [instance_id for instance_id in instance_ids
+                      if _has_failed(*statuses[instance_id])]
+        if failed_ids:
+            raise TroveError(_("The nodes %s failed.") % failed_ids)
+        LOG.debug("The nodes %s are healthy.", instance_ids)
+
+    def _run_rolling_batch(self, func, instances):
+        """Call func on the instances of a batch at the same time and wait
+        for them to be healthy.
+        """
+        results = utils.map_concurrently(func, instances)
+        for instance, result in results:
+            if isinstance(result, Exception):
+                LOG.error("Failed to process node %(id)s: %(error)s",
+                          {'id': instance.id, 'error': result})
+        for instance, result in results:
+            if isinstance(result, Exception):
+                raise result
+        self._wait_for_healthy_nodes([instance.id for instance in instances])
+
+    def rolling_restart_cluster(self, context, cluster_id):
         LOG.debug("Begin rolling cluster restart for id: %s", cluster_id)
 
         def _restart_cluster_instance(instance):
             LOG.debug("Restarting instance with id: %s", instance.id)
-            context.notification = (
-                DBaaSInstanceRestart(context, **request_info))
-            with StartNotification(context, instance_id=instance.id):
-                with EndNotification(context):
+            instance_context = copy.copy(context)
+            instance_context.notification = (
+                DBaaSInstanceRestart(instance_context, **request_info))
+            with StartNotification(instance_context, instance_id=instance.id):
+                with EndNotification(instance_context):
                     instance.update_db(task_status=InstanceTasks.REBOOTING)
                     instance.restart()
 
@@ -344,21 +403,17 @@ class ClusterTasks(Cluster):
         try:
             node_db_inst = DBInstance.find_all(cluster_id=cluster_id,
                                                deleted=False).all()
-            for index, db_inst in enumerate(node_db_inst):
-                if index > 0:
-                    LOG.debug(
-                        "Waiting (%ds) for restarted nodes to rejoin the "
-                        "cluster before proceeding.", delay_sec)
-                    time.sleep(delay_sec)
-                instance = BuiltInstanceTasks.load(context, db_inst.id)
-                _restart_cluster_instance(instance)
+            for batch in self._rolling_batches(node_db_inst):
+                instances = [BuiltInstanceTasks.load(context, db_inst.id)
+                             for db_inst in batch]
+                self._run_rolling_batch(_restart_cluster_instance, instances)
         except Timeout as t:
             if t is not timeout:
                 raise  # not my timeout
             LOG.exception("Timeout for restarting cluster.")
             raise
         except Exception:
-            LOG.exception("Error restarting cluster.", cluster_id)
+            LOG.exception("Error restarting cluster %s.", cluster_id)
             raise
         finally:
             context.notification = cluster_notification
@@ -373,12 +428,13 @@ class ClusterTasks(Cluster):
 
         def _upgrade_cluster_instance(instance):
             LOG.debug("Upgrading instance with id: %s.", instance.id)
-            context.notification = (
-                DBaaSInstanceUpgrade(context, **request_info))
+            instance_context = copy.copy(context)
+            instance_context.notification = (
+                DBaaSInstanceUpgrade(instance_context, **request_info))
             with StartNotification(
-                context, instance_id=instance.id,
+                instance_context, instance_id=instance.id,
                 datastore_version_id=datastore_version.id):
-                with EndNotification(context):
+                with EndNotification(instance_context):
                     instance.update_db(
                         datastore_version_id=datastore_version.id,
                         task_status=InstanceTasks.UPGRADING)
@@ -398,8 +454,8 @@ class ClusterTasks(Cluster):
             if ordering_function is not None:
                 instances.sort(key=ordering_function)
 
-            for instance in instances:
-                _upgrade_cluster_instance(instance)
+            for batch in self._rolling_batches(instances):
+                self._run_rolling_batch(_upgrade_cluster_instance, batch)
 
             self.reset_task()
         except Timeout as t:
@@ -1425,10 +1481,22 @@ class BackupTasks(object):
 
 class ModuleTasks(object):
 
+    JOB_TYPE = 'module_reapply'
+
+    # The ids of the reapply jobs running in this task manager.
+    _running_jobs = set()
+    _jobs_lock = threading.Lock()
+
     @classmethod
     def reapply_module(cls, context, module_id, md5, include_clustered,
                        batch_size, batch_delay, force):
-        """Reapply module."""
+        """Reapply module.
+
+        The module is applied to up to batch_size instances at a time, and
+        to at most batch_size instances every batch_delay seconds. The
+        result of each instance is stored in a job, which is resumed if the
+        task manager is restarted before the end.
+        """
         LOG.info("Reapplying module %s.", module_id)
 
         batch_size = batch_size or CONF.module_reapply_max_batch_size
@@ -1441,56 +1509,238 @@ class ModuleTasks(object):
         current_md5 = modules[0].md5
         LOG.debug("MD5: %(md5)s  Force: %(f)s.", {'md5': md5, 'f': force})
 
-        # Process all the instances
-        instance_modules = module_models.InstanceModules.load_all(
-            context, module_id=module_id, md5=md5)
-        total_count = instance_modules.count()
-        reapply_count = 0
+        instance_ids = []
         skipped_count = 0
-        if instance_modules:
-            module_list = module_views.convert_modules_to_list(modules)
-            for instance_module in instance_modules:
-                instance_id = instance_module.instance_id
-                if (instance_module.md5 != current_md5 or force) and (
+        for instance_module in module_models.InstanceModules.load_all(
+                context, module_id=module_id, md5=md5):
+            if (instance_module.md5 != current_md5 or force) and (
                     not md5 or md5 == instance_module.md5):
-                    instance = BuiltInstanceTasks.load(context, instance_id,
-                                                       needs_server=False)
-                    if instance and (
-                        include_clustered or not instance.cluster_id):
-                        try:
-                            module_models.Modules.validate(
-                                modules, instance.datastore.id,
-                                instance.datastore_version.id)
-                            client = create_guest_client(context, instance_id)
-                            client.module_apply(module_list)
-                            Instance.add_instance_modules(
-                                context, instance_id, modules)
-                            reapply_count += 1
-                        except exception.ModuleInvalid as ex:
-                            LOG.info("Skipping: %s", ex)
-                            skipped_count += 1
-
-                        # Sleep if we've fired off too many in a row.
-                        if (batch_size and
-                            not reapply_count % batch_size and
-                            (reapply_count + skipped_count) < total_count):
-                            LOG.debug("Applied module to %(cnt)d of %(total)d "
-                                      "instances - sleeping for %(batch)ds",
-                                      {'cnt': reapply_count,
-                                       'total': total_count,
-                                       'batch': batch_delay})
-                            time.sleep(batch_delay)
-                    else:
-                        LOG.debug("Instance '%s' not found or doesn't match "
-                                  "criteria, skipping reapply.", instance_id)
-                        skipped_count += 1
-                else:
-                    LOG.debug("Instance '%s' does not match "
-                              "criteria, skipping reapply.", instance_id)
-                    skipped_count += 1
+                instance_ids.append(instance_module.instance_id)
+            else:
+                LOG.debug("Instance '%s' does not match "
+                          "criteria, skipping reapply.",
+                          instance_module.instance_id)
+                skipped_count += 1
+
+        with cls._jobs_lock:
+            job = job_models.Job.create(
+                context, cls.JOB_TYPE, module_id,
+                {'include_clustered': include_clustered,
+                 'batch_size': batch_size,
+                 'batch_delay': batch_delay},
+                instance_ids)
+            cls._running_jobs.add(job.id)
+        cls._run_reapply_job(context, job, modules, skipped_count)
+
+    @classmethod
+    def resume_reapply_jobs(cls, context):
+        """Resume the reapply jobs of this host that are not running.
+
+        A job is left running if the task manager is stopped in the middle
+        of it, it is resumed with the instances still pending.
+        """
+        with cls._jobs_lock:
+            jobs = [job for job in job_models.Job.load_unfinished(
+                cls.JOB_TYPE) if job.id not in cls._running_jobs]
+            cls._running_jobs.update(job.id for job in jobs)
+
+        for job in jobs:
+            LOG.info("Resuming job %(job)s reapplying module %(module)s.",
+                     {'job': job.id, 'module': job.resource_id})
+            job_context = job.resume_context(context)
+            modules = module_models.Modules.load_by_ids(
+                job_context, [job.resource_id])
+            greenthread.spawn_n(cls._run_reapply_job, job_context, job,
+                                modules)
+
+    @classmethod
+    def _run_reapply_job(cls, context, job, modules, skipped_count=0):
+        try:
+            parameters = job.parameters
+            instance_ids = job.pending_instance_ids()
+            if not modules:
+                LOG.info("Module %s no longer exists, skipping its reapply.",
+                         job.resource_id)
+                for instance_id in instance_ids:
+                    job.set_item_status(
+                        instance_id, job_models.JobItemStatus.SKIPPED,
+                        "Module not found.")
+            elif instance_ids:
+                module_list = module_views.convert_modules_to_list(modules)
+                # The batches of the previous versions map to a bounded
+                # number of concurrent applies and to a rate limit.
+                pool = eventlet.GreenPool(
+                    parameters['batch_size'] or len(instance_ids))
+                limiter = utils.RateLimiter(parameters['batch_size'],
+                                            parameters['batch_delay'])
+                for instance_id in instance_ids:
+                    limiter.acquire()
+                    pool.spawn_n(cls._reapply_instance, context, job,
+                                 instance_id, modules, module_list,
+                                 parameters['include_clustered'])
+                pool.waitall()
+            job.finish()
+        finally:
+            with cls._jobs_lock:
+                cls._running_jobs.discard(job.id)
+
+        counts = job.count_items()
         LOG.info("Reapplied module to %(num)d instances "
-                 "(skipped %(skip)d).",
-                 {'num': reapply_count, 'skip': skipped_count})
+                 "(skipped %(skip)d, failed %(fail)d).",
+                 {'num': counts[job_models.JobItemStatus.SUCCEEDED],
+                  'skip': (counts[job_models.JobItemStatus.SKIPPED] +
+                           skipped_count),
+                  'fail': counts[job_models.JobItemStatus.FAILED]})
+
+    @staticmethod
+    def _reapply_instance(context, job, instance_id, modules, module_list,
+                          include_clustered):
+        status = job_models.JobItemStatus.SKIPPED
+        message = None
+        try:
+            instance = BuiltInstanceTasks.load(context, instance_id,
+                                               needs_server=False)
+            if instance and (include_clustered or not instance.cluster_id):
+                module_models.Modules.validate(
+                    modules, instance.datastore.id,
+                    instance.datastore_version.id)
+                client = create_guest_client(context, instance_id)
+                client.module_apply(module_list)
+                Instance.add_instance_modules(context, instance_id, modules)
+                status = job_models.JobItemStatus.SUCCEEDED
+            else:
+                LOG.debug("Instance '%s' not found or doesn't match "
+                          "criteria, skipping reapply.", instance_id)
+        except exception.ModuleInvalid as ex:
+            LOG.info("Skipping: %s", ex)
+            message = str(ex)
+        except Exception as ex:
+            LOG.warning("Failed to reapply module to instance %(id)s: "
+                        "%(ex)s", {'id': instance_id, 'ex': ex})
+            status = job_models.JobItemStatus.FAILED
+            message = str(ex)
+        job.set_item_status(instance_id, status, message)
+
+
+class ConfigurationTasks(object):
+
+    # The ids of the refresh jobs running in this task manager.
+    _running_jobs = set()
+    _jobs_lock = threading.Lock()
+
+    @classmethod
+    def refresh_configuration(cls, context, configuration_id, job_id):
+        """Refresh a configuration group on the instances and clusters of a
+        job created by the API.
+
+        Up to configuration_refresh_concurrency of them are refreshed at the
+        same time and the result of each one is stored in the job.
+        """
+        job = job_models.Job.load(context, job_id)
+        with cls._jobs_lock:
+            if not job.claim():
+                LOG.info("Job %(job)s refreshing configuration %(config)s "
+                         "was already claimed by %(host)s.",
+                         {'job': job.id, 'config': configuration_id,
+                          'host': job.db_info.host})
+                return
+            cls._running_jobs.add(job.id)
+        cls._run_refresh_job(context, job)
+
+    @classmethod
+    def resume_refresh_jobs(cls, context):
+        """Resume the refresh jobs of this host that are not running.
+
+        The jobs no task manager claimed within job_claim_timeout of their
+        creation are claimed and run too.
+        """
+        with cls._jobs_lock:
+            jobs = [job for job in job_models.Job.load_unfinished(
+                config_models.REFRESH_JOB_TYPE)
+                if job.id not in cls._running_jobs]
+            jobs.extend(job for job in job_models.Job.load_unclaimed(
+                config_models.REFRESH_JOB_TYPE, CONF.job_claim_timeout)
+                if job.claim())
+            cls._running_jobs.update(job.id for job in jobs)
+
+        for job in jobs:
+            LOG.info("Resuming job %(job)s refreshing configuration "
+                     "%(config)s.", {'job': job.id, 'config': job.resource_id})
+            greenthread.spawn_n(cls._run_refresh_job,
+                                job.resume_context(context), job)
+
+    @classmethod
+    def _run_refresh_job(cls, context, job):
+        try:
+            parameters = job.parameters
+            cluster_ids = set(parameters.get('cluster_ids', []))
+            if parameters.get('notification'):
+                # The clusters notify the changes of their nodes.
+                context = copy.copy(context)
+                context.notification = DBaaSConfigurationEdit(
+                    context, **parameters['notification'])
+                context.notification.server_type = 'taskmanager'
+            configuration = config_models.Configuration(context,
+                                                        job.resource_id)
+
+            def _refresh(item_id):
+                if item_id in cluster_ids:
+                    cls._refresh_cluster(context, job, item_id)
+                else:
+                    cls._refresh_instance(context, job, item_id,
+                                          configuration)
+
+            utils.map_concurrently(_refresh, job.pending_instance_ids(),
+                                   CONF.configuration_refresh_concurrency)
+            job.finish()
+        finally:
+            with cls._jobs_lock:
+                cls._running_jobs.discard(job.id)
+
+        counts = job.count_items()
+        LOG.info("Refreshed configuration %(config)s on %(num)d instances "
+                 "and clusters (failed %(fail)d).",
+                 {'config': job.resource_id,
+                  'num': counts[job_models.JobItemStatus.SUCCEEDED],
+                  'fail': counts[job_models.JobItemStatus.FAILED]})
+
+    @staticmethod
+    def _refresh_instance(context, job, instance_id, configuration):
+        LOG.info("Re-applying configuration %(config)s to instance: "
+                 "%(id)s", {'config': configuration.configuration_id,
+                            'id': instance_id})
+        try:
+            instance = Instance.load(context, instance_id)
+            if (instance.db_info.configuration_id !=
+                    configuration.configuration_id):
+                LOG.debug("Instance '%s' no longer has the configuration "
+                          "attached, skipping.", instance_id)
+                job.set_item_status(instance_id,
+                                    job_models.JobItemStatus.SKIPPED)
+                return
+            instance.update_configuration(configuration)
+        except Exception as ex:
+            LOG.warning("Failed to re-apply configuration to instance "
+                        "%(id)s: %(ex)s", {'id': instance_id, 'ex': ex})
+            job.set_item_status(instance_id, job_models.JobItemStatus.FAILED,
+                                str(ex))
+            return
+        job.set_item_status(instance_id, job_models.JobItemStatus.SUCCEEDED)
+
+    @staticmethod
+    def _refresh_cluster(context, job, cluster_id):
+        LOG.info("Re-applying configuration %(config)s to cluster: %(id)s",
+                 {'config': job.resource_id, 'id': cluster_id})
+        try:
+            cluster = Cluster.load(context, cluster_id)
+            cluster.configuration_attach(job.resource_id)
+        except Exception as ex:
+            LOG.warning("Failed to re-apply configuration to cluster "
+                        "%(id)s: %(ex)s", {'id': cluster_id, 'ex': ex})
+            job.set_item_status(cluster_id, job_models.JobItemStatus.FAILED,
+                                str(ex))
+            return
+        job.set_item_status(cluster_id, job_models.JobItemStatus.SUCCEEDED)
 
 
 class ResizeVolumeAction(object):
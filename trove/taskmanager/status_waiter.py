@@ -0,0 +1,99 @@
+# Copyright 2020 Catalyst Cloud
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Wait for a set of instances to acquire a status.
+
+The task and service statuses of all the instances are loaded with one query
+per iteration. A wait sleeps sleep_time seconds between the iterations, but
+is woken up as soon as the conductor reports a change of the service status
+of one of its instances.
+"""
+
+import collections
+import threading
+import time
+
+from oslo_log import log as logging
+
+from trove.common import exception
+from trove.instance import models as inst_models
+
+LOG = logging.getLogger(__name__)
+
+_waiters = collections.defaultdict(set)
+_lock = threading.Lock()
+
+
+def notify(instance_ids):
+    """Wake up the waits for any of the instances."""
+    with _lock:
+        events = set()
+        for instance_id in instance_ids:
+            events.update(_waiters.get(instance_id, ()))
+
+    if events:
+        LOG.debug("Waking up %(count)d status waits for instances %(ids)s.",
+                  {'count': len(events), 'ids': instance_ids})
+    for event in events:
+        event.set()
+
+
+def _register(instance_ids, event):
+    with _lock:
+        for instance_id in instance_ids:
+            _waiters[instance_id].add(event)
+
+
+def _unregister(instance_ids, event):
+    with _lock:
+        for instance_id in instance_ids:
+            events = _waiters.get(instance_id)
+            if events is not None:
+                events.discard(event)
+                if not events:
+                    del _waiters[instance_id]
+
+
+def wait_for_statuses(instance_ids, condition, sleep_time, time_out=0):
+    """Load the statuses of the instances until they pass a condition.
+
+    :param condition: called with a dict of (task status, service status)
+                      tuples by instance id.
+    :param time_out: the maximum time to wait in seconds, 0 to wait forever.
+    :returns the statuses that passed the condition.
+    :raises PollTimeOut: if the statuses didn't pass the condition in time.
+    """
+    instance_ids = list(instance_ids)
+    deadline = time.time() + time_out if time_out else None
+    event = threading.Event()
+
+    _register(instance_ids, event)
+    try:
+        while True:
+            # The conductor reports a change after it is written, a change
+            # reported from here on is either loaded or wakes up the wait.
+            event.clear()
+            statuses = inst_models.load_instance_statuses(instance_ids)
+            if condition(statuses):
+                return statuses
+
+            timeout = sleep_time
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise exception.PollTimeOut()
+                timeout = min(timeout, remaining)
+            event.wait(timeout)
+    finally:
+        _unregister(instance_ids, event)
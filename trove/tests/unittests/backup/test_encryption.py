@@ -0,0 +1,188 @@
+# Copyright 2020 Catalyst Cloud
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import base64
+import io
+import os
+
+from cryptography import exceptions
+
+from backup.utils import encryption
+from trove.tests.unittests import trove_testtools
+
+PASSPHRASE = 'default_aes_cbc_key'
+
+# The output of:
+#   openssl enc -aes-256-cbc -md sha512 -pbkdf2 -iter 10000 -salt \
+#       -pass pass:default_aes_cbc_key
+OPENSSL_PLAINTEXT = b'Legacy backup data encrypted by openssl enc.\n'
+OPENSSL_CIPHERTEXT = base64.b64decode(
+    'U2FsdGVkX18t5AdZvYXBqrDc0B8ABxaGEBYH9f0AAdgB/KMIy3NDhswwuYJSyG4N'
+    'ND/hhdhzOgXcaKbAJCaZnw==')
+
+
+def encrypt(data, chunk_size=16, threads=2):
+    encryptor = encryption.Encryptor(io.BytesIO(data), PASSPHRASE,
+                                     threads=threads, chunk_size=chunk_size)
+    encrypted = bytearray()
+    while True:
+        chunk = encryptor.read(7)
+        if not chunk:
+            return bytes(encrypted)
+        encrypted += chunk
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def frames(data):
+    """Split encrypted data into the header and the frames."""
+    header = data[:encryption.HEADER.size]
+    offset = len(header)
+    result = []
+    while offset < len(data):
+        length = encryption.FRAME.unpack_from(data, offset)[0]
+        end = offset + encryption.FRAME.size + length
+        result.append(data[offset:end])
+        offset = end
+    return header, result
+
+
+def decrypt(data, chunk_size=5, threads=2):
+    return b''.join(encryption.decrypt(split(data, chunk_size), PASSPHRASE,
+                                       threads=threads))
+
+
+class EncryptionTest(trove_testtools.TestCase):
+
+    def test_round_trip(self):
+        data = os.urandom(100)
+        for size in (1, 15, 16, 17, 32, 33, 100):
+            for threads in (1, 2, 8):
+                encrypted = encrypt(data[:size], threads=threads)
+                self.assertEqual(data[:size],
+                                 decrypt(encrypted, threads=threads))
+
+    def test_frames(self):
+        header, result = frames(encrypt(os.urandom(40)))
+
+        self.assertEqual(encryption.MAGIC, header[:len(encryption.MAGIC)])
+        # Three data frames and the empty final frame.
+        self.assertEqual(
+            [16, 16, 8, 0],
+            [len(frame) - encryption.FRAME.size - encryption.TAG_SIZE
+             for frame in result])
+
+    def test_empty(self):
+        encrypted = encrypt(b'')
+
+        self.assertEqual(b'', decrypt(encrypted))
+        self.assertEqual(1, len(frames(encrypted)[1]))
+
+    def test_unknown_format(self):
+        self.assertRaisesRegex(Exception, 'Unknown encryption format',
+                               encryption.decrypt, [], PASSPHRASE)
+        self.assertRaisesRegex(Exception, 'Unknown encryption format',
+                               encryption.decrypt, [b'plain data'],
+                               PASSPHRASE)
+
+    def test_wrong_passphrase(self):
+        encrypted = encrypt(b'data')
+
+        self.assertRaises(
+            exceptions.InvalidTag, b''.join,
+            encryption.decrypt([encrypted], 'wrong_key'))
+
+    def test_truncated_header(self):
+        encrypted = encrypt(b'data')
+
+        self.assertRaisesRegex(Exception, 'header is truncated',
+                               decrypt, encrypted[:encryption.HEADER.size - 1])
+
+    def test_missing_final_frame(self):
+        header, result = frames(encrypt(os.urandom(40)))
+
+        self.assertRaisesRegex(Exception, 'truncated',
+                               decrypt, header + b''.join(result[:-1]))
+
+    def test_truncated_frame(self):
+        encrypted = encrypt(os.urandom(40))
+
+        for size in (1, 2, 3, 10, encryption.FRAME.size + 1):
+            self.assertRaisesRegex(Exception, 'truncated',
+                                   decrypt, encrypted[:-size])
+
+    def test_invalid_frame_length(self):
+        header, result = frames(encrypt(os.urandom(40)))
+
+        for length in (0, encryption.TAG_SIZE - 1,
+                       16 + encryption.TAG_SIZE + 1, 2 ** 32 - 1):
+            frame = encryption.FRAME.pack(length) + result[0][
+                encryption.FRAME.size:]
+            self.assertRaisesRegex(
+                Exception, 'Invalid frame length',
+                decrypt, header + frame + b''.join(result[1:]))
+
+    def test_tampered_frame(self):
+        header, result = frames(encrypt(os.urandom(40)))
+        frame = bytearray(result[1])
+        frame[-1] ^= 1
+
+        self.assertRaises(
+            exceptions.InvalidTag, decrypt,
+            header + result[0] + bytes(frame) + b''.join(result[2:]))
+
+    def test_tampered_header(self):
+        header, result = frames(encrypt(os.urandom(40)))
+        # The chunk size is not used by the key derivation, the header is
+        # authenticated as the associated data of every frame.
+        tampered = bytearray(header)
+        tampered[len(encryption.MAGIC) + 7] ^= 1
+
+        self.assertRaises(exceptions.InvalidTag, decrypt,
+                          bytes(tampered) + b''.join(result))
+
+    def test_reordered_frames(self):
+        header, result = frames(encrypt(os.urandom(40)))
+
+        self.assertRaises(
+            exceptions.InvalidTag, decrypt,
+            header + result[1] + result[0] + b''.join(result[2:]))
+
+    def test_final_frame_moved(self):
+        header, result = frames(encrypt(os.urandom(40)))
+
+        self.assertRaises(
+            exceptions.InvalidTag, decrypt,
+            header + result[0] + result[-1] + b''.join(result[1:-1]))
+
+    def test_data_after_final_frame(self):
+        encrypted = encrypt(os.urandom(40))
+        header, result = frames(encrypted)
+
+        self.assertRaisesRegex(Exception, 'after the final frame',
+                               decrypt, encrypted + b'x')
+        self.assertRaisesRegex(Exception, 'after the final frame',
+                               decrypt, encrypted + result[0])
+
+    def test_decrypt_openssl(self):
+        for size in (1, 7, 16, len(OPENSSL_CIPHERTEXT)):
+            self.assertEqual(OPENSSL_PLAINTEXT,
+                             decrypt(OPENSSL_CIPHERTEXT, chunk_size=size))
+
+    def test_decrypt_openssl_wrong_passphrase(self):
+        self.assertRaises(
+            ValueError, b''.join,
+            encryption.decrypt([OPENSSL_CIPHERTEXT], 'wrong_key'))
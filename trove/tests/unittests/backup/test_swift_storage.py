@@ -0,0 +1,342 @@
+# Copyright 2020 Catalyst Cloud
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import hashlib
+import io
+import json
+from unittest.mock import patch
+
+from oslo_config import cfg
+
+from backup import main
+from backup.storage import swift
+from trove.tests.unittests import trove_testtools
+
+# Two and a half segments of 1 MiB.
+DATA = bytes(range(256)) * (10 * 2 ** 10)
+
+
+class FakeSwiftConnection(object):
+    """In memory swift, static large objects included."""
+
+    url = 'http://swift/v1/AUTH_tenant'
+
+    def __init__(self, objects):
+        self.objects = objects
+
+    def put_container(self, container):
+        pass
+
+    def put_object(self, container, obj, contents, content_length=None,
+                   headers=None, query_string=None):
+        headers = dict((k.lower(), v) for k, v in (headers or {}).items())
+        if 'x-copy-from' in headers:
+            data = self.objects[headers.pop('x-copy-from')]['data']
+        elif hasattr(contents, 'read'):
+            chunks = []
+            chunk = contents.read()
+            while chunk:
+                chunks.append(chunk)
+                chunk = contents.read()
+            data = b''.join(chunks)
+        elif isinstance(contents, str):
+            data = contents.encode()
+        else:
+            data = contents
+
+        entry = {'data': data, 'headers': headers, 'manifest': None}
+        if query_string == 'multipart-manifest=put':
+            entry['manifest'] = json.loads(data)
+        self.objects['%s/%s' % (container, obj)] = entry
+        return hashlib.md5(data).hexdigest()
+
+    def content(self, container, obj):
+        entry = self.objects['%s/%s' % (container, obj)]
+        if entry['manifest'] is None:
+            return entry['data']
+        return b''.join(self.objects[segment['path']]['data']
+                        for segment in entry['manifest'])
+
+    def head_object(self, container, obj):
+        entry = self.objects['%s/%s' % (container, obj)]
+        headers = dict(entry['headers'])
+        if entry['manifest'] is None:
+            etag = hashlib.md5(entry['data']).hexdigest()
+        else:
+            etag = hashlib.md5(''.join(
+                segment['etag'] for segment in entry['manifest']).encode()
+            ).hexdigest()
+            headers['x-static-large-object'] = 'True'
+        headers['etag'] = '"%s"' % etag
+        headers['content-length'] = str(len(self.content(container, obj)))
+        return headers
+
+    def get_object(self, container, obj, resp_chunk_size=None,
+                   query_string=None, headers=None):
+        entry = self.objects['%s/%s' % (container, obj)]
+        if (query_string == 'multipart-manifest=get' and
+                entry['manifest'] is not None):
+            manifest = [{'name': '/' + segment['path'],
+                         'bytes': segment['size_bytes'],
+                         'hash': segment['etag']}
+                        for segment in entry['manifest']]
+            return (self.head_object(container, obj),
+                    json.dumps(manifest).encode())
+
+        data = self.content(container, obj)
+        if headers and 'Range' in headers:
+            start, end = headers['Range'][len('bytes='):].split('-')
+            data = data[int(start):int(end) + 1]
+        if resp_chunk_size:
+            data = iter([data[i:i + resp_chunk_size]
+                         for i in range(0, len(data), resp_chunk_size)])
+        return self.head_object(container, obj), data
+
+    def delete_object(self, container, obj):
+        del self.objects['%s/%s' % (container, obj)]
+
+
+class FakeStream(object):
+    """The output of a backup process."""
+
+    manifest = 'backup-1.xbstream.gz'
+
+    def __init__(self, data):
+        self.data = io.BytesIO(data)
+
+    def read(self, chunk_size):
+        return self.data.read(chunk_size)
+
+    def get_metadata(self):
+        return {'lsn': '1234'}
+
+
+class FakeRunner(object):
+    """A backup runner of the backup and restore commands."""
+
+    restored = []
+
+    def __init__(self, filename=None, storage=None, location=None,
+                 checksum=None, lsn=None, compression=None, **kwargs):
+        self.manifest = '%s.xbstream.zst' % filename
+        self.storage = storage
+        self.location = location
+        self.checksum = checksum
+        self.compression = compression
+        self.stream = io.BytesIO(DATA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def read(self, chunk_size):
+        return self.stream.read(chunk_size)
+
+    def get_metadata(self):
+        return {'compression': self.compression}
+
+    def restore(self):
+        contents = self.storage.load(self.location, self.checksum)
+        FakeRunner.restored.append(
+            (self.compression, b''.join(contents)))
+        return len(DATA)
+
+
+class SwiftStorageTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(SwiftStorageTest, self).setUp()
+        self.conf = cfg.ConfigOpts()
+        self.conf.register_cli_opts(main.cli_opts)
+        self.conf([])
+        self.conf.set_override('swift_segment_size', 2 ** 20)
+        for module in (main, swift):
+            patcher = patch.object(module, 'CONF', self.conf)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.objects = {}
+        self.swift = FakeSwiftConnection(self.objects)
+        patcher = patch.object(swift.swiftclient, 'Connection',
+                               side_effect=lambda session: self.swift)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch.object(swift, '_get_user_keystone_session')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _save(self, data, workers=1):
+        self.conf.set_override('swift_upload_workers', workers)
+        return swift.SwiftStorage().save(
+            FakeStream(data), metadata={'parent_location': 'parent'})
+
+    def _test_save_segments(self, workers):
+        checksum, location = self._save(DATA, workers)
+
+        self.assertEqual(
+            '%s/database_backups/backup-1.xbstream.gz' % self.swift.url,
+            location)
+        manifest = self.objects['database_backups/backup-1.xbstream.gz']
+        # The segments are listed in the stream order.
+        self.assertEqual(
+            [('database_backups/backup-1_%08d' % number, size)
+             for number, size in enumerate([2 ** 20, 2 ** 20, 2 ** 19])],
+            [(segment['path'], segment['size_bytes'])
+             for segment in manifest['manifest']])
+        self.assertEqual(DATA, self.swift.content('database_backups',
+                                                  'backup-1.xbstream.gz'))
+        self.assertEqual(hashlib.md5(''.join(
+            hashlib.md5(DATA[start:start + 2 ** 20]).hexdigest()
+            for start in range(0, len(DATA), 2 ** 20)).encode()).hexdigest(),
+            checksum)
+        # The metadata is kept on the manifest of a large object.
+        self.assertEqual('1234', manifest['headers']['x-object-meta-lsn'])
+        self.assertEqual(
+            'parent', manifest['headers']['x-object-meta-parent-location'])
+
+    def test_save_segments(self):
+        self._test_save_segments(1)
+
+    def test_save_segments_parallel(self):
+        self._test_save_segments(2)
+
+    def test_save_segments_parallel_many_workers(self):
+        self._test_save_segments(8)
+
+    def test_save_single_segment(self):
+        for workers in (1, 2):
+            self.objects.clear()
+
+            checksum, _ = self._save(DATA[:1000], workers)
+
+            # The segment is renamed to the backup object.
+            self.assertEqual(['database_backups/backup-1.xbstream.gz'],
+                             list(self.objects))
+            backup = self.objects['database_backups/backup-1.xbstream.gz']
+            self.assertEqual(DATA[:1000], backup['data'])
+            self.assertEqual('1234', backup['headers']['x-object-meta-lsn'])
+            self.assertEqual(hashlib.md5(DATA[:1000]).hexdigest(), checksum)
+
+    def test_save_empty(self):
+        for workers in (1, 2):
+            self.objects.clear()
+
+            checksum, _ = self._save(b'', workers)
+
+            self.assertEqual(
+                b'', self.objects['database_backups/backup-1.xbstream.gz'][
+                    'data'])
+            self.assertEqual(hashlib.md5(b'').hexdigest(), checksum)
+
+    def _test_save_bad_etag(self, workers):
+        put_object = self.swift.put_object
+
+        def _put_object(container, obj, *args, **kwargs):
+            etag = put_object(container, obj, *args, **kwargs)
+            return 'bad' if obj == 'backup-1_00000001' else etag
+
+        with patch.object(self.swift, 'put_object', side_effect=_put_object):
+            self.assertRaisesRegex(Exception, 'Failed to upload data segment',
+                                   self._save, DATA, workers)
+        self.assertNotIn('database_backups/backup-1.xbstream.gz',
+                         self.objects)
+
+    def test_save_bad_etag(self):
+        self._test_save_bad_etag(1)
+
+    def test_save_bad_etag_parallel(self):
+        self._test_save_bad_etag(2)
+
+    def test_load(self):
+        checksum, location = self._save(DATA)
+
+        self.assertEqual(DATA, b''.join(
+            swift.SwiftStorage().load(location, checksum)))
+
+    def test_load_bad_checksum(self):
+        _, location = self._save(DATA)
+
+        self.assertRaisesRegex(Exception, 'Checksum validation failure',
+                               swift.SwiftStorage().load, location, 'bad')
+
+    def test_load_parts(self):
+        checksum, location = self._save(DATA)
+        storage = swift.SwiftStorage()
+
+        parts = storage.load_parts(location, checksum, 384 * 2 ** 10)
+
+        # Each segment is split separately.
+        ranges = ['bytes=0-393215', 'bytes=393216-786431',
+                  'bytes=786432-1048575']
+        self.assertEqual(
+            [('backup-1_00000000', byte_range) for byte_range in ranges] +
+            [('backup-1_00000001', byte_range) for byte_range in ranges] +
+            [('backup-1_00000002', 'bytes=0-393215'),
+             ('backup-1_00000002', 'bytes=393216-524287')],
+            [(part['name'], part['range']) for part in parts])
+        self.assertEqual({'database_backups'},
+                         {part['container'] for part in parts})
+        self.assertEqual(DATA, b''.join(storage.load_part(part)
+                                        for part in parts))
+
+    def test_load_parts_single_object(self):
+        checksum, location = self._save(DATA[:1000])
+        storage = swift.SwiftStorage()
+
+        parts = storage.load_parts(location, checksum, 384)
+
+        self.assertEqual(
+            [('backup-1.xbstream.gz', 'bytes=0-383'),
+             ('backup-1.xbstream.gz', 'bytes=384-767'),
+             ('backup-1.xbstream.gz', 'bytes=768-999')],
+            [(part['name'], part['range']) for part in parts])
+        self.assertEqual(DATA[:1000], b''.join(storage.load_part(part)
+                                               for part in parts))
+
+    def test_load_parts_bad_checksum(self):
+        _, location = self._save(DATA)
+
+        self.assertRaisesRegex(Exception, 'Checksum validation failure',
+                               swift.SwiftStorage().load_parts, location,
+                               'bad', 2 ** 20)
+
+    def _test_backup_and_restore_segments(self, workers):
+        self.conf.set_override('backup_id', 'backup-1')
+        self.conf.set_override('compression', 'zstd')
+        self.conf.set_override('swift_upload_workers', workers)
+        FakeRunner.restored = []
+        storage = swift.SwiftStorage()
+
+        main.stream_backup_to_storage(FakeRunner, storage)
+
+        manifest = self.objects['database_backups/backup-1.xbstream.zst']
+        self.assertEqual(3, len(manifest['manifest']))
+        self.assertEqual('zstd',
+                         manifest['headers']['x-object-meta-compression'])
+
+        self.conf.set_override(
+            'restore_from',
+            '%s/database_backups/backup-1.xbstream.zst' % self.swift.url)
+        main.stream_restore_from_storage(FakeRunner, storage)
+
+        # The restore selects the codec of the backup.
+        self.assertEqual([('zstd', DATA)], FakeRunner.restored)
+
+    def test_backup_and_restore_segments(self):
+        self._test_backup_and_restore_segments(1)
+
+    def test_backup_and_restore_segments_parallel(self):
+        self._test_backup_and_restore_segments(2)
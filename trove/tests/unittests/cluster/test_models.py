@@ -205,3 +205,55 @@ class TestModels(trove_testtools.TestCase):
                           models.validate_instance_nics,
                           Mock(),
                           test_instances)
+
+    def test_rolling_node_group(self):
+        self.assertEqual('shard-1', models.rolling_node_group(
+            Mock(shard_id='shard-1', cluster_id='cluster-1')))
+        self.assertEqual('cluster-1', models.rolling_node_group(
+            Mock(shard_id=None, cluster_id='cluster-1')))
+
+    @patch('trove.common.utils.map_concurrently')
+    def test_rolling_map(self, mock_map):
+        self.patch_conf_property('cluster_rolling_batch_size', 3)
+        mock_map.side_effect = lambda func, batch: [
+            (instance, None) for instance in batch]
+        instances = [Mock(id=1, shard_id='shard-1'),
+                     Mock(id=2, shard_id='shard-1'),
+                     Mock(id=3, shard_id='shard-2'),
+                     Mock(id=4, shard_id='shard-3'),
+                     Mock(id=5, shard_id='shard-4')]
+
+        models.Cluster._rolling_map(Mock(), Mock(), instances)
+
+        self.assertEqual(
+            [[1, 3, 4], [2, 5]],
+            [[instance.id for instance in mock_call[0][1]]
+             for mock_call in mock_map.call_args_list])
+
+    @patch('trove.common.utils.map_concurrently')
+    def test_rolling_map_not_sharded(self, mock_map):
+        self.patch_conf_property('cluster_rolling_batch_size', 3)
+        mock_map.side_effect = lambda func, batch: [
+            (instance, None) for instance in batch]
+        # The nodes of a Galera cluster, for example, have no shard.
+        instances = [Mock(id=i, shard_id=None, cluster_id='cluster-1')
+                     for i in range(1, 4)]
+
+        models.Cluster._rolling_map(Mock(), Mock(), instances)
+
+        self.assertEqual(
+            [[1], [2], [3]],
+            [[instance.id for instance in mock_call[0][1]]
+             for mock_call in mock_map.call_args_list])
+
+    @patch('trove.common.utils.map_concurrently')
+    def test_rolling_map_failure(self, mock_map):
+        mock_map.side_effect = lambda func, batch: [
+            (instance, exception.TroveError('failed')) for instance in batch]
+        instances = [Mock(shard_id=None, cluster_id='cluster-1')
+                     for _ in range(2)]
+
+        self.assertRaises(exception.TroveError, models.Cluster._rolling_map,
+                          Mock(), Mock(), instances)
+        # The next batch doesn't start after a failed one.
+        self.assertEqual(1, mock_map.call_count)
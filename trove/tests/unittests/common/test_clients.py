@@ -0,0 +1,81 @@
+# Copyright 2020 Catalyst Cloud
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+from unittest.mock import Mock
+from unittest.mock import patch
+
+from trove.common import clients
+from trove.common import timeutils
+from trove.tests.unittests import trove_testtools
+
+
+class ClientCacheTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(ClientCacheTest, self).setUp()
+        clients.clear_client_cache()
+        self.addCleanup(clients.clear_client_cache)
+
+    def _context(self, auth_token='token-1', auth_token_expires=None):
+        return Mock(auth_token=auth_token, project_id='tenant-1',
+                    auth_token_expires=auth_token_expires,
+                    service_catalog=[])
+
+    @patch.object(clients, 'get_endpoint', return_value='http://nova/')
+    @patch.object(clients, 'Client')
+    def test_nova_client(self, mock_client, mock_get_endpoint):
+        ctx = self._context()
+
+        client = clients.nova_client(ctx)
+
+        self.assertIs(client, clients.nova_client(self._context()))
+        self.assertEqual(1, mock_client.call_count)
+        self.assertEqual(1, mock_get_endpoint.call_count)
+
+        clients.nova_client(self._context(auth_token='token-2'))
+        clients.nova_client(ctx, region_name='other')
+        self.assertEqual(3, mock_client.call_count)
+
+    @patch.object(clients, 'get_endpoint', return_value='http://nova/')
+    @patch.object(clients, 'Client')
+    def test_nova_client_token_expired(self, mock_client, mock_get_endpoint):
+        expires = timeutils.isotime(
+            timeutils.utcnow() - datetime.timedelta(seconds=1))
+        ctx = self._context(auth_token_expires=expires)
+
+        clients.nova_client(ctx)
+        clients.nova_client(ctx)
+
+        self.assertEqual(2, mock_client.call_count)
+
+    @patch.object(clients, 'get_endpoint', return_value='http://nova/')
+    @patch.object(clients, 'Client')
+    def test_nova_client_cache_disabled(self, mock_client, mock_get_endpoint):
+        self.patch_conf_property('client_cache_ttl', 0)
+
+        clients.nova_client(self._context())
+        clients.nova_client(self._context())
+
+        self.assertEqual(2, mock_client.call_count)
+
+    @patch.object(clients, 'get_endpoint', return_value='http://swift/')
+    @patch.object(clients, 'Connection')
+    def test_swift_client(self, mock_connection, mock_get_endpoint):
+        clients.swift_client(self._context())
+        clients.swift_client(self._context())
+
+        # The connections are not shared, the endpoint is.
+        self.assertEqual(2, mock_connection.call_count)
+        self.assertEqual(1, mock_get_endpoint.call_count)
@@ -283,6 +283,20 @@ class TestDBaaSQuota(trove_testtools.TestCase):
         self.assertTrue(notifier().info.called)
 
 
+class TestDBaaSInstancePromote(trove_testtools.TestCase):
+
+    @patch.object(rpc, 'get_notifier')
+    def test_failover_timings(self, notifier):
+        promote = notification.DBaaSInstancePromote(Mock(), request=Mock())
+        promote.payload['failover_timings'] = {'detach': 0.5}
+
+        promote.notify_end()
+
+        a, _ = notifier().info.call_args
+        self.assertEqual('dbaas.instance_promote.end', a[1])
+        self.assertEqual({'detach': 0.5}, a[2]['failover_timings'])
+
+
 class DBaaSTestNotification(notification.DBaaSAPINotification):
 
     def event_type(self):
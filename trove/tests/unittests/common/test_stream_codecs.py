@@ -16,6 +16,9 @@
 
 import os
 
+import six
+from six.moves import configparser
+
 from trove.common import stream_codecs
 from trove.tests.unittests import trove_testtools
 
@@ -41,3 +44,96 @@ class TestStreamCodecs(trove_testtools.TestCase):
             deserialized_data = codec.deserialize(serialized_data)
             self. assertEqual(datum, deserialized_data,
                               "Serialize/Deserialize failed")
+
+    def test_serialize_deserialize_inicodec(self):
+        data = {'mysqld': {'port': 3306, 'skip-name-resolve': None,
+                           'datadir': '/var/lib/mysql', 'quoted': "'q'"},
+                'client': {'user': 'root'}}
+
+        codec = stream_codecs.IniCodec()
+        serialized_data = codec.serialize(data)
+        self.assertEqual('[mysqld]\n'
+                         'port = 3306\n'
+                         'skip-name-resolve\n'
+                         'datadir = /var/lib/mysql\n'
+                         "quoted = 'q'\n"
+                         '\n'
+                         '[client]\n'
+                         'user = root\n'
+                         '\n', serialized_data)
+        self.assertEqual(data, codec.deserialize(serialized_data))
+
+    def test_deserialize_inicodec(self):
+        codec = stream_codecs.IniCodec(default_value=True)
+        data = codec.deserialize('# comment\n'
+                                 '[DEFAULT]\n'
+                                 'shared = 1\n'
+                                 '[mysqld]\n'
+                                 '  Port: 3306  \n'
+                                 '  ; comment\n'
+                                 'flag\n'
+                                 'name = None\n'
+                                 'shared = 2\n'
+                                 '[client]\n'
+                                 'zero = 007\n')
+
+        self.assertEqual({'mysqld': {'shared': 2, 'port': 3306,
+                                     'flag': True, 'name': None},
+                          'client': {'shared': 1, 'zero': '007'}}, data)
+
+    def test_deserialize_inicodec_errors(self):
+        codec = stream_codecs.IniCodec()
+        self.assertRaises(configparser.MissingSectionHeaderError,
+                          codec.deserialize, 'key = value\n')
+        self.assertRaises(configparser.DuplicateSectionError,
+                          codec.deserialize, '[a]\n[a]\n')
+        self.assertRaises(configparser.DuplicateOptionError,
+                          codec.deserialize, '[a]\nkey = 1\nKey = 2\n')
+        self.assertRaises(configparser.ParsingError,
+                          codec.deserialize, '[a]\n= value\n')
+
+    def test_serialize_inicodec_errors(self):
+        codec = stream_codecs.IniCodec()
+        self.assertRaises(ValueError, codec.serialize, {'DEFAULT': {}})
+        self.assertRaises(ValueError, codec.serialize,
+                          {'a': {'key': 'invalid % value'}})
+
+    def test_stream_inicodec(self):
+        text = '[mysqld]\nport = 3306\nflag\n\n'
+        codec = stream_codecs.IniCodec()
+
+        data = codec.deserialize_from(six.StringIO(text))
+        self.assertEqual(codec.deserialize(text), data)
+        output = six.StringIO()
+        codec.serialize_to(data, output)
+        self.assertEqual(text, output.getvalue())
+
+    def test_serialize_deserialize_keyvaluecodec(self):
+        data = {'key1': 'value1', 'key2': True, 'key3': 10}
+
+        codec = stream_codecs.KeyValueCodec(value_quoting=True,
+                                            bool_case=stream_codecs.
+                                            KeyValueCodec.BOOL_LOWER)
+        serialized_data = codec.serialize(data)
+        self.assertEqual("key1='value1'\r\nkey2=true\r\nkey3=10",
+                         serialized_data)
+        self.assertEqual({'key1': 'value1', 'key2': 'true', 'key3': '10'},
+                         codec.deserialize(serialized_data))
+
+        output = six.StringIO()
+        codec.serialize_to(data, output)
+        self.assertEqual(serialized_data, output.getvalue())
+        self.assertEqual(
+            codec.deserialize(serialized_data),
+            codec.deserialize_from(six.StringIO(serialized_data)))
+
+    def test_deserialize_keyvaluecodec_comments(self):
+        codec = stream_codecs.KeyValueCodec(value_quoting=True,
+                                            hidden_marker='_')
+        data = codec.deserialize("# comment\n"
+                                 " key1='value1' # comment\n"
+                                 "key2=value2#comment\n"
+                                 "key3=_hidden\n"
+                                 "\n")
+
+        self.assertEqual({'key1': 'value1', 'key2': 'value2'}, data)
@@ -186,3 +186,43 @@ class TestUtils(trove_testtools.TestCase):
         expected = (u'GET / HTTP/1.0\r\nHost: localhost:80\r\n'
                     u'X-Auth-Project-Id: \u6d4b\u8bd5')
         self.assertEqual(expected, utils.req_to_text(req))
+
+    def test_rolling_batches(self):
+        nodes = [('a', 'shard-1'), ('b', 'shard-1'), ('c', 'shard-2'),
+                 ('d', None), ('e', 'shard-2'), ('f', None)]
+
+        batches = utils.rolling_batches(nodes, 3, lambda node: node[1])
+
+        self.assertEqual([['a', 'c', 'd'], ['b', 'e', 'f']],
+                         [[node[0] for node in batch] for batch in batches])
+
+    def test_rolling_batches_no_group(self):
+        self.assertEqual([[1, 2], [3, 4], [5]],
+                         list(utils.rolling_batches(range(1, 6), 2)))
+        self.assertEqual([[1], [2]],
+                         list(utils.rolling_batches([1, 2], 0)))
+
+    @patch.object(utils.eventlet, 'sleep')
+    @patch.object(utils.time, 'time')
+    def test_rate_limiter(self, mock_time, mock_sleep):
+        mock_time.return_value = 100.0
+
+        def _sleep(seconds):
+            mock_time.return_value += seconds
+        mock_sleep.side_effect = _sleep
+
+        limiter = utils.RateLimiter(2, 10)
+        for _ in range(5):
+            limiter.acquire()
+
+        # Two operations start at once, then one every 5 seconds.
+        self.assertEqual(115.0, mock_time.return_value)
+        self.assertEqual(3, mock_sleep.call_count)
+
+    @patch.object(utils.eventlet, 'sleep')
+    def test_rate_limiter_no_limit(self, mock_sleep):
+        for limiter in (utils.RateLimiter(0, 10), utils.RateLimiter(2, 0)):
+            for _ in range(5):
+                limiter.acquire()
+
+        mock_sleep.assert_not_called()
@@ -19,9 +19,12 @@ from trove.backup import models as bkup_models
 from trove.backup import state
 from trove.common import exception as t_exception
 from trove.common import utils
+from trove.conductor import heartbeat
 from trove.conductor import manager as conductor_manager
+from trove.conductor.models import LastSeen
 from trove.instance import models as t_models
 from trove.instance.service_status import ServiceStatuses
+from trove.taskmanager import api as task_api
 from trove.tests.unittests import trove_testtools
 from trove.tests.unittests.util import util
 
@@ -35,8 +38,14 @@ class ConductorMethodTests(trove_testtools.TestCase):
         bkup_models.DBBackup.save = OLD_DBB_SAVE
         super(ConductorMethodTests, self).setUp()
         util.init_db()
+        self.patch_conf_property('heartbeat_flush_interval', 0)
         self.cond_mgr = conductor_manager.Manager()
         self.instance_id = utils.generate_uuid()
+        # The task managers waiting for a status are woken up over RPC.
+        patcher = patch.object(task_api, 'API')
+        self.mock_status_changed = (
+            patcher.start().return_value.instance_status_changed)
+        self.addCleanup(patcher.stop)
 
     def tearDown(self):
         super(ConductorMethodTests, self).tearDown()
@@ -107,6 +116,77 @@ class ConductorMethodTests(trove_testtools.TestCase):
         self.cond_mgr.heartbeat(None, self.instance_id, payload)
         iss = self._get_iss(iss_id)
         self.assertEqual(ServiceStatuses.BUILDING, iss.status)
+        self.mock_status_changed.assert_called_once_with([self.instance_id])
+
+    @patch('trove.conductor.manager.LOG')
+    def test_heartbeat_buffered(self, mock_logging):
+        iss_id = self._create_iss()
+        self.cond_mgr.heartbeats = heartbeat.HeartbeatBuffer(
+            flush_interval=60)
+        now = timeutils.utcnow_ts(microsecond=True)
+        build_p = {'service_status': ServiceStatuses.BUILDING.description}
+        healthy_p = {'service_status': ServiceStatuses.HEALTHY.description}
+        self.cond_mgr.heartbeat(None, self.instance_id, build_p, sent=now)
+        self.cond_mgr.heartbeat(None, self.instance_id, healthy_p,
+                                sent=now + 1)
+        self.cond_mgr.heartbeat(None, self.instance_id, build_p, sent=now - 1)
+
+        self.assertEqual(ServiceStatuses.NEW, self._get_iss(iss_id).status)
+        self.mock_status_changed.assert_not_called()
+
+        self.cond_mgr.heartbeats.flush()
+
+        self.assertEqual(ServiceStatuses.HEALTHY,
+                         self._get_iss(iss_id).status)
+        self.mock_status_changed.assert_called_once_with([self.instance_id])
+        self.assertEqual(now + 1, LastSeen.load(
+            instance_id=self.instance_id, method_name='heartbeat').sent)
+        metrics = self.cond_mgr.heartbeats.metrics
+        self.assertEqual(1, metrics['batches'])
+        self.assertEqual(1, metrics['last_batch_size'])
+        self.assertEqual(1, metrics['coalesced'])
+        self.assertEqual(1, metrics['dropped_stale'])
+
+    @patch('trove.conductor.heartbeat.LOG')
+    def test_heartbeat_buffered_many_instances(self, mock_logging):
+        buffer = heartbeat.HeartbeatBuffer(flush_interval=60)
+        now = timeutils.utcnow_ts(microsecond=True)
+        iss_ids = []
+        instance_ids = []
+        for i in range(5):
+            self.instance_id = utils.generate_uuid()
+            instance_ids.append(self.instance_id)
+            iss_ids.append(self._create_iss())
+            LastSeen.create(instance_id=self.instance_id,
+                            method_name='heartbeat', sent=now)
+            # The heartbeats of the odd instances are older than last seen.
+            sent = now + 1 if i % 2 == 0 else now - 1
+            buffer.add(self.instance_id, ServiceStatuses.HEALTHY, sent=sent)
+
+        buffer.flush()
+
+        statuses = [self._get_iss(iss_id).status for iss_id in iss_ids]
+        self.assertEqual([ServiceStatuses.HEALTHY, ServiceStatuses.NEW,
+                          ServiceStatuses.HEALTHY, ServiceStatuses.NEW,
+                          ServiceStatuses.HEALTHY], statuses)
+        self.assertEqual(3, buffer.metrics['heartbeats'])
+        self.assertEqual(2, buffer.metrics['dropped_stale'])
+        self.mock_status_changed.assert_called_once_with(instance_ids[::2])
+
+    @patch('trove.conductor.heartbeat.LOG')
+    def test_heartbeat_buffer_full(self, mock_logging):
+        buffer = heartbeat.HeartbeatBuffer(flush_interval=60, max_size=2)
+        iss_id = self._create_iss()
+        buffer.add(self.instance_id, ServiceStatuses.HEALTHY)
+        self.assertEqual(ServiceStatuses.NEW, self._get_iss(iss_id).status)
+
+        buffer.add(utils.generate_uuid(), ServiceStatuses.HEALTHY)
+
+        # The buffer is written when full, the missing instance is logged.
+        self.assertEqual(ServiceStatuses.HEALTHY,
+                         self._get_iss(iss_id).status)
+        self.assertTrue(mock_logging.exception.called)
+        self.mock_status_changed.assert_called_once_with([self.instance_id])
 
     # --- Tests for update_backup ---
 
@@ -0,0 +1,109 @@
+# Copyright 2020 Catalyst Cloud
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from unittest.mock import patch
+
+from trove.common import utils
+from trove.conductor.models import LastSeen
+from trove.conductor.models import LastSeenCache
+from trove.tests.unittests import trove_testtools
+from trove.tests.unittests.util import util
+
+
+class LastSeenCacheTest(trove_testtools.TestCase):
+    def setUp(self):
+        super(LastSeenCacheTest, self).setUp()
+        util.init_db()
+        self.cache = LastSeenCache(size=2)
+        self.instance_id = utils.generate_uuid()
+
+    def _load(self, instance_id=None):
+        return LastSeen.load(instance_id=instance_id or self.instance_id,
+                             method_name='heartbeat').sent
+
+    def test_check_and_set(self):
+        self.assertTrue(self.cache.check_and_set(
+            self.instance_id, 'heartbeat', 10.0))
+        self.assertEqual(10.0, self._load())
+
+        with patch.object(LastSeen, 'load') as mock_load:
+            self.assertFalse(self.cache.check_and_set(
+                self.instance_id, 'heartbeat', 9.0))
+            self.assertTrue(self.cache.check_and_set(
+                self.instance_id, 'heartbeat', 11.0))
+            mock_load.assert_not_called()
+        self.assertEqual(11.0, self._load())
+
+    def test_rebuild_lazily(self):
+        LastSeen.create(instance_id=self.instance_id,
+                        method_name='heartbeat', sent=10.0)
+
+        self.assertFalse(self.cache.check_and_set(
+            self.instance_id, 'heartbeat', 10.0))
+        self.assertEqual(10.0, self.cache.get(self.instance_id, 'heartbeat'))
+
+    def test_updated_by_another_process(self):
+        self.cache.check_and_set(self.instance_id, 'heartbeat', 10.0)
+        LastSeen.update_if_older(self.instance_id, 'heartbeat', 20.0)
+
+        self.assertFalse(self.cache.check_and_set(
+            self.instance_id, 'heartbeat', 15.0))
+        self.assertEqual(20.0, self.cache.get(self.instance_id, 'heartbeat'))
+        self.assertEqual(20.0, self._load())
+
+    def test_evict_least_recently_used(self):
+        instance_ids = [utils.generate_uuid() for _ in range(3)]
+        for instance_id in instance_ids:
+            self.cache.check_and_set(instance_id, 'heartbeat', 10.0)
+
+        with patch.object(LastSeen, 'load',
+                          wraps=LastSeen.load) as mock_load:
+            self.assertEqual(10.0, self.cache.get(instance_ids[2],
+                                                  'heartbeat'))
+            mock_load.assert_not_called()
+            self.assertEqual(10.0, self.cache.get(instance_ids[0],
+                                                  'heartbeat'))
+            self.assertEqual(1, mock_load.call_count)
+
+    def test_get_all(self):
+        other_id = utils.generate_uuid()
+        self.cache.check_and_set(self.instance_id, 'heartbeat', 10.0)
+        LastSeen.create(instance_id=other_id, method_name='heartbeat',
+                        sent=5.0)
+
+        with patch.object(LastSeen, 'load_all',
+                          wraps=LastSeen.load_all) as mock_load_all:
+            self.assertEqual(
+                {self.instance_id: 10.0, other_id: 5.0},
+                self.cache.get_all([self.instance_id, other_id,
+                                    utils.generate_uuid()], 'heartbeat'))
+            self.assertEqual(1, mock_load_all.call_count)
+            self.assertNotIn(self.instance_id,
+                             mock_load_all.call_args[0][0])
+
+    def test_save_all_keeps_newer(self):
+        other_id = utils.generate_uuid()
+        new_id = utils.generate_uuid()
+        LastSeen.create(instance_id=self.instance_id,
+                        method_name='heartbeat', sent=20.0)
+        LastSeen.create(instance_id=other_id, method_name='heartbeat',
+                        sent=5.0)
+
+        LastSeen.save_all('heartbeat', {self.instance_id: 15.0,
+                                        other_id: 10.0,
+                                        new_id: 1.0})
+
+        self.assertEqual(20.0, self._load())
+        self.assertEqual(10.0, self._load(other_id))
+        self.assertEqual(1.0, self._load(new_id))
@@ -15,12 +15,23 @@
 #
 import jsonschema
 from unittest.mock import MagicMock
+from unittest.mock import Mock
+from unittest.mock import patch
 
+from trove.cluster import models as cluster_models
 from trove.common import configurations
+from trove.common import exception
 from trove.common.exception import UnprocessableEntity
+from trove.common import utils
+from trove.common import wsgi
+from trove.configuration import models
+from trove.configuration import service as service_module
 from trove.configuration.service import ConfigurationsController
 from trove.extensions.mgmt.configuration import service
+from trove.instance import models as instances_models
+from trove.job import models as job_models
 from trove.tests.unittests import trove_testtools
+from trove.tests.unittests.util import util
 
 
 class TestConfigurationParser(trove_testtools.TestCase):
@@ -261,3 +272,73 @@ class TestConfigurationsParameterController(trove_testtools.TestCase):
                                                           action='create',
                                                           is_valid=False))
         self.assertIn("'yes' is not of type 'integer'", error_messages)
+
+
+class TestConfigurationRefresh(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(TestConfigurationRefresh, self).setUp()
+        util.init_db()
+        self.controller = ConfigurationsController()
+        self.context = Mock(project_id='tenant_1', is_admin=False)
+        self.context.notification.serialize.return_value = {
+            'request_id': 'req-1', 'server_type': 'api'}
+        self.configuration_id = utils.generate_uuid()
+
+    @patch.object(service_module.task_api, 'API')
+    @patch.object(cluster_models.DBCluster, 'find_all')
+    @patch.object(instances_models.DBInstance, 'find_all')
+    def test_refresh_on_all(self, mock_instances, mock_clusters, mock_api):
+        mock_instances.return_value.all.return_value = [Mock(id='inst-1'),
+                                                        Mock(id='inst-2')]
+        mock_clusters.return_value.all.return_value = [Mock(id='cluster-1')]
+
+        job = self.controller._refresh_on_all(self.context,
+                                              self.configuration_id)
+
+        self.assertEqual(['inst-1', 'inst-2', 'cluster-1'],
+                         [item.instance_id for item in job.load_items()])
+        self.assertEqual(['cluster-1'], job.parameters['cluster_ids'])
+        self.assertEqual([], job_models.Job.load_unfinished(
+            models.REFRESH_JOB_TYPE))
+        mock_api.return_value.refresh_configuration.assert_called_once_with(
+            self.configuration_id, job.id)
+
+    @patch.object(service_module.task_api, 'API')
+    @patch.object(cluster_models.DBCluster, 'find_all')
+    @patch.object(instances_models.DBInstance, 'find_all')
+    def test_refresh_on_all_not_attached(self, mock_instances, mock_clusters,
+                                         mock_api):
+        mock_instances.return_value.all.return_value = []
+        mock_clusters.return_value.all.return_value = []
+
+        self.assertIsNone(self.controller._refresh_on_all(
+            self.context, self.configuration_id))
+        mock_api.assert_not_called()
+
+    @patch.object(ConfigurationsController, 'authorize_config_action')
+    @patch.object(models.Configuration, 'load')
+    def test_job(self, mock_load, mock_authorize):
+        job = job_models.Job.create(
+            self.context, models.REFRESH_JOB_TYPE, self.configuration_id,
+            {'cluster_ids': ['cluster-1']}, ['inst-1', 'cluster-1'],
+            claimed=False)
+        job.set_item_status('inst-1', job_models.JobItemStatus.FAILED,
+                            'boom')
+        req = Mock(environ={wsgi.CONTEXT_KEY: self.context})
+
+        mock_load.return_value = Mock(id=self.configuration_id)
+        result = self.controller.job(req, 'tenant_1', self.configuration_id,
+                                     job.id)
+
+        self.assertEqual(200, result.status)
+        self.assertEqual(
+            [{'id': 'inst-1', 'type': 'instance', 'status': 'FAILED',
+              'message': 'boom'},
+             {'id': 'cluster-1', 'type': 'cluster', 'status': 'PENDING',
+              'message': None}],
+            result.data(None)['job']['instances'])
+
+        mock_load.return_value = Mock(id='other')
+        self.assertRaises(exception.NotFound, self.controller.job, req,
+                          'tenant_1', 'other', job.id)
@@ -0,0 +1,108 @@
+# Copyright 2020 Catalyst Cloud
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from unittest.mock import patch
+
+from trove.common import exception
+from trove.common import utils
+from trove.configuration import models
+from trove.tests.unittests import trove_testtools
+from trove.tests.unittests.util import util
+
+
+class TestConfigurationRuleIndex(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(TestConfigurationRuleIndex, self).setUp()
+        util.init_db()
+        models.invalidate_rule_index()
+        self.addCleanup(models.invalidate_rule_index)
+        self.version_id = utils.generate_uuid()
+        self.rule = models.DBDatastoreConfigurationParameters.create(
+            name='max_connections', datastore_version_id=self.version_id,
+            restart_required=False, data_type='integer', min_size=1,
+            max_size=100)
+
+    def test_rule(self):
+        rule = models.load_rule(self.version_id, 'max_connections')
+
+        self.assertEqual('max_connections', rule.name)
+        self.assertFalse(rule.restart_required)
+        self.assertEqual(10, rule.convert('10'))
+        rule.validate('max_connections', 10)
+        self.assertRaises(exception.UnprocessableEntity,
+                          rule.validate, 'max_connections', 0)
+        self.assertRaises(exception.UnprocessableEntity,
+                          rule.validate, 'max_connections', 101)
+        self.assertRaises(exception.UnprocessableEntity,
+                          rule.validate, 'max_connections', '10')
+        self.assertRaises(exception.NotFound,
+                          models.load_rule, self.version_id, 'other')
+        self.assertRaises(exception.NotFound,
+                          models.load_rule, self.version_id,
+                          'MAX_CONNECTIONS')
+
+    def test_rule_names_differing_in_case(self):
+        models.DBDatastoreConfigurationParameters.create(
+            name='MAX_CONNECTIONS', datastore_version_id=self.version_id,
+            restart_required=True, data_type='integer', min_size=1,
+            max_size=10)
+
+        index = models.load_rule_index(self.version_id)
+
+        self.assertEqual(2, len(index))
+        self.assertEqual(['MAX_CONNECTIONS', 'max_connections'],
+                         sorted(db_rule.name for db_rule in index.db_rules))
+        self.assertFalse(index.get('max_connections').restart_required)
+        self.assertTrue(index.get('MAX_CONNECTIONS').restart_required)
+        self.assertIsNone(index.get('Max_Connections'))
+        self.assertIsNotNone(index.get_ignore_case('Max_Connections'))
+
+    def test_load_rule_index_cached(self):
+        with patch.object(models.DatastoreConfigurationParameters,
+                          'load_parameters',
+                          wraps=models.DatastoreConfigurationParameters.
+                          load_parameters) as mock_load:
+            index = models.load_rule_index(self.version_id)
+
+            self.assertIs(index, models.load_rule_index(self.version_id))
+            self.assertEqual(1, mock_load.call_count)
+
+    def test_load_rule_index_cache_disabled(self):
+        self.patch_conf_property('configuration_parameter_cache_ttl', 0)
+
+        self.assertIsNot(models.load_rule_index(self.version_id),
+                         models.load_rule_index(self.version_id))
+
+    def test_load_rule_index_invalidated(self):
+        self.assertEqual(1, len(models.load_rule_index(self.version_id)))
+
+        models.DBDatastoreConfigurationParameters.create(
+            name='innodb_buffer_pool_size',
+            datastore_version_id=self.version_id, restart_required=True,
+            data_type='integer', min_size=0, max_size=None)
+        self.assertEqual(2, len(models.load_rule_index(self.version_id)))
+
+        rule = models.DatastoreConfigurationParameters.load_parameter_by_name(
+            self.version_id, 'max_connections')
+        rule.restart_required = True
+        rule.save()
+        self.assertTrue(
+            models.load_rule(self.version_id, 'max_connections')
+            .restart_required)
+
+        index = models.load_rule_index(self.version_id)
+        models.DatastoreConfigurationParameters.delete(
+            self.version_id, 'max_connections')
+        self.assertIsNot(index, models.load_rule_index(self.version_id))
@@ -36,6 +36,7 @@ class TestDatastore(TestDatastoreBase):
     @patch.object(datastore_models, 'CONF')
     def test_create_failure_with_datastore_default(self, mock_conf):
         mock_conf.default_datastore = 'bad_ds'
+        mock_conf.datastore_catalog_check_interval = 10
         self.assertRaisesRegex(exception.DatastoreDefaultDatastoreNotFound,
                                "Default datastore 'bad_ds' cannot be found",
                                datastore_models.get_datastore_version)
@@ -81,3 +82,86 @@ class TestDatastore(TestDatastoreBase):
                             expected_exception,
                             datastore_models.get_datastore_or_version,
                             ds_id, ds_ver_id)
+
+
+class TestDatastoreCatalog(TestDatastoreBase):
+
+    def _stats(self):
+        return datastore_models.catalog_cache_stats()
+
+    def test_load_cached(self):
+        Datastore.load(self.ds_name)
+        stats = self._stats()
+
+        with patch.object(datastore_models.DBDatastore, 'find_by') as find_by:
+            datastore = Datastore.load(self.ds_name)
+            version = datastore_models.DatastoreVersion.load(
+                datastore, self.ds_version)
+            datastore_models.DatastoreVersion.load_by_uuid(version.id)
+
+        self.assertEqual(self.ds_name, datastore.name)
+        self.assertEqual(self.ds_version, version.name)
+        find_by.assert_not_called()
+        self.assertEqual(stats['hits'] + 3, self._stats()['hits'])
+        self.assertEqual(stats['misses'], self._stats()['misses'])
+
+    def test_load_changed(self):
+        generation = datastore_models._load_catalog_generation()
+
+        datastore_models.update_datastore_version(
+            self.ds_name, self.ds_version, "mysql", "new-image", "", True)
+
+        self.assertEqual(generation + 1,
+                         datastore_models._load_catalog_generation())
+        version = datastore_models.DatastoreVersion.load(self.datastore,
+                                                         self.ds_version)
+        self.assertEqual('new-image', version.image_id)
+        self.assertEqual(generation + 1, self._stats()['generation'])
+
+    def test_update_bumps_generation_once(self):
+        generation = datastore_models._load_catalog_generation()
+
+        self.datastore.db_info.update(default_version_id=None)
+
+        self.assertEqual(generation + 1,
+                         datastore_models._load_catalog_generation())
+
+    def test_failed_write_keeps_generation(self):
+        generation = datastore_models._load_catalog_generation()
+
+        with patch.object(datastore_models.db_api, 'save',
+                          side_effect=exception.DBConstraintError(
+                              model_name='DBDatastore', error='boom')):
+            self.assertRaises(exception.DBConstraintError,
+                              self.datastore.db_info.update,
+                              default_version_id=None)
+
+        self.assertEqual(generation,
+                         datastore_models._load_catalog_generation())
+
+    def test_load_changed_by_other_process(self):
+        self.patch_conf_property('datastore_catalog_check_interval', 0)
+        Datastore.load(self.ds_name)
+        generation = self._stats()['generation']
+
+        # Bump the generation without clearing the cache of this process.
+        datastore_models.DBCatalogGeneration.find_all(
+            id=datastore_models.CATALOG_GENERATION_ID).update(
+            generation=generation + 1)
+        misses = self._stats()['misses']
+        Datastore.load(self.ds_name)
+
+        self.assertEqual(generation + 1, self._stats()['generation'])
+        self.assertEqual(misses + 1, self._stats()['misses'])
+
+    def test_capabilities(self):
+        datastore_models.Capabilities.load(self.datastore_version.id).add(
+            self.cap3, True)
+
+        capabilities = datastore_models.Capabilities.load(
+            self.datastore_version.id)
+
+        self.assertIn(self.cap3.name, capabilities)
+        self.assertTrue([capability for capability in capabilities
+                         if capability.name == self.cap3.name][0].enabled)
+        self.assertNotIn('non-existent', capabilities)
@@ -0,0 +1,83 @@
+# Copyright 2020 Catalyst Cloud
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from trove.common.stream_codecs import IniCodec
+from trove.guestagent.common import configuration
+from trove.guestagent.common import operating_system
+from trove.tests.unittests import trove_testtools
+
+
+class ImportOverrideStrategyTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(ImportOverrideStrategyTest, self).setUp()
+        self.root_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root_dir)
+        revision_dir = os.path.join(self.root_dir, 'conf.d')
+        os.mkdir(revision_dir)
+        for attribute in ('chown', 'chmod'):
+            patcher = patch.object(operating_system, attribute)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.strategy = configuration.ImportOverrideStrategy(revision_dir,
+                                                             'cnf')
+        self.strategy.configure(os.path.join(self.root_dir, 'my.cnf'),
+                                'trove', 'trove', IniCodec(), False)
+
+    def _max_connections(self):
+        return self.strategy.parse_updates()['mysqld']['max_connections']
+
+    def test_parse_updates(self):
+        self.strategy.apply('user', 'change-1',
+                            {'mysqld': {'max_connections': 100}})
+        self.strategy.apply('user', 'change-2',
+                            {'mysqld': {'max_connections': 200,
+                                        'wait_timeout': 10}})
+
+        self.assertEqual({'mysqld': {'max_connections': 200,
+                                     'wait_timeout': 10}},
+                         self.strategy.parse_updates())
+
+        self.strategy.remove('user', 'change-2')
+
+        self.assertEqual({'mysqld': {'max_connections': 100}},
+                         self.strategy.parse_updates())
+
+    def test_parse_updates_same_signature(self):
+        # The revision is rewritten with the same size within a tick of the
+        # file timestamps, its signature doesn't change.
+        with patch.object(operating_system, 'stat_files',
+                          side_effect=lambda paths, as_root=False:
+                          [(1, 1)] * len(paths)):
+            self.strategy.apply('user', 'change-1',
+                                {'mysqld': {'max_connections': 100}})
+            self.assertEqual(100, self._max_connections())
+
+            self.strategy.apply('user', 'change-1',
+                                {'mysqld': {'max_connections': 200}})
+            self.assertEqual(200, self._max_connections())
+
+            self.strategy.apply('user', 'change-2',
+                                {'mysqld': {'max_connections': 300}})
+            self.assertEqual(300, self._max_connections())
+            self.strategy.remove('user', 'change-2')
+            self.strategy.apply('user', 'change-2',
+                                {'mysqld': {'max_connections': 400}})
+            self.assertEqual(400, self._max_connections())
@@ -0,0 +1,343 @@
+# Copyright 2020 Catalyst Cloud
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import base64
+import io
+import json
+import os
+import pwd
+import shutil
+import stat
+import sys
+import tempfile
+from unittest.mock import call
+from unittest.mock import patch
+
+from trove.common import exception
+from trove.guestagent.common import file_helper
+from trove.guestagent.common import operating_system
+from trove.tests.unittests import trove_testtools
+
+
+def encode(data):
+    return base64.b64encode(data).decode('ascii')
+
+
+class ServeTest(trove_testtools.TestCase):
+    """Run the helper loop against in memory streams."""
+
+    def setUp(self):
+        super(ServeTest, self).setUp()
+        self.root_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root_dir)
+
+    def path(self, *names):
+        return os.path.join(self.root_dir, *names)
+
+    def serve(self, *requests):
+        stdin = io.BytesIO()
+        for request in requests:
+            file_helper._write_message(stdin, request)
+        return self.serve_data(stdin.getvalue())
+
+    def serve_data(self, data):
+        stdout = io.BytesIO()
+        file_helper.serve(io.BytesIO(data), stdout)
+        stdout.seek(0)
+        responses = []
+        while True:
+            response = file_helper._read_message(stdout)
+            if response is None:
+                return responses
+            responses.append(response)
+
+    def run_operations(self, *operations):
+        return self.serve(list(operations))[0]
+
+    def test_read_write(self):
+        path = self.path('file')
+
+        self.assertEqual(
+            [{'result': None}, {'result': encode(b'data\x00')},
+             {'result': None}],
+            self.run_operations(
+                ['write', {'path': path, 'data': encode(b'data\x00')}],
+                ['read', {'path': path}],
+                ['read', {'path': self.path('missing')}]))
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(path).st_mode))
+
+    def test_write_truncates(self):
+        path = self.path('file')
+        with open(path, 'wb') as fp:
+            fp.write(b'longer data')
+
+        self.run_operations(['write', {'path': path, 'data': encode(b'x')}])
+
+        with open(path, 'rb') as fp:
+            self.assertEqual(b'x', fp.read())
+
+    def test_exists(self):
+        os.mkdir(self.path('dir'))
+        open(self.path('file'), 'w').close()
+
+        self.assertEqual(
+            [{'result': True}, {'result': False}, {'result': True},
+             {'result': False}],
+            self.run_operations(
+                ['exists', {'path': self.path('file')}],
+                ['exists', {'path': self.path('dir')}],
+                ['exists', {'path': self.path('dir'), 'is_directory': True}],
+                ['exists', {'path': self.path('missing')}]))
+
+    def test_stat(self):
+        path = self.path('file')
+        with open(path, 'wb') as fp:
+            fp.write(b'data')
+        st = os.stat(path)
+
+        self.assertEqual(
+            [{'result': {'size': 4, 'mtime': st.st_mtime_ns,
+                         'mode': st.st_mode, 'uid': st.st_uid,
+                         'gid': st.st_gid}},
+             {'result': None}],
+            self.run_operations(['stat', {'path': path}],
+                                ['stat', {'path': self.path('missing')}]))
+
+    @patch.object(os, 'chown')
+    @patch.object(os, 'lchown')
+    def test_chown(self, mock_lchown, mock_chown):
+        os.mkdir(self.path('dir'))
+        open(self.path('dir', 'file'), 'w').close()
+        user = pwd.getpwuid(os.getuid()).pw_name
+
+        self.run_operations(
+            ['chown', {'path': self.path('dir'), 'user': user,
+                       'group': str(os.getgid())}],
+            ['chown', {'path': self.path('dir'), 'user': '1001',
+                       'recursive': False}])
+
+        # Symbolic links are only followed if not recursive.
+        mock_lchown.assert_has_calls(
+            [call(self.path('dir'), os.getuid(), os.getgid()),
+             call(self.path('dir', 'file'), os.getuid(), os.getgid())])
+        self.assertEqual(2, mock_lchown.call_count)
+        mock_chown.assert_called_once_with(self.path('dir'), 1001, -1)
+
+    def test_chmod(self):
+        os.mkdir(self.path('dir'))
+        open(self.path('dir', 'file'), 'w').close()
+        os.symlink(self.path('dir', 'file'), self.path('dir', 'link'))
+        os.chmod(self.path('dir', 'file'), 0o640)
+
+        self.run_operations(
+            ['chmod', {'path': self.path('dir', 'file'), 'add': 0o004,
+                       'remove': 0o040}],
+            ['chmod', {'path': self.path('dir'), 'reset': 0o750,
+                       'add': 0o005, 'recursive': False}])
+
+        self.assertEqual(0o604, stat.S_IMODE(
+            os.stat(self.path('dir', 'file')).st_mode))
+        self.assertEqual(0o755, stat.S_IMODE(
+            os.stat(self.path('dir')).st_mode))
+
+        self.run_operations(
+            ['chmod', {'path': self.path('dir'), 'reset': 0o700}])
+
+        for name in ('dir', 'dir/file'):
+            self.assertEqual(0o700, stat.S_IMODE(
+                os.stat(self.path(name)).st_mode))
+
+    def test_list(self):
+        os.makedirs(self.path('dir', 'subdir'))
+        for name in ('a.cnf', 'b.txt', 'dir/c.cnf', 'dir/subdir/d.cnf'):
+            open(self.path(name), 'w').close()
+
+        self.assertEqual(
+            [{'result': [self.path('a.cnf'), self.path('b.txt')]},
+             {'result': [self.path('a.cnf'), self.path('dir'),
+                         self.path('dir', 'c.cnf'),
+                         self.path('dir', 'subdir'),
+                         self.path('dir', 'subdir', 'd.cnf')]},
+             {'result': [self.path('a.cnf'), self.path('dir', 'c.cnf'),
+                         self.path('dir', 'subdir', 'd.cnf')]}],
+            self.run_operations(
+                ['list', {'root_dir': self.root_dir}],
+                ['list', {'root_dir': self.root_dir, 'recursive': True,
+                          'pattern': r'^(?!b\.)', 'include_dirs': True}],
+                ['list', {'root_dir': self.root_dir, 'recursive': True,
+                          'pattern': r'.*\.cnf$'}]))
+
+    def test_errors(self):
+        path = self.path('file')
+
+        results = self.run_operations(
+            ['chmod', {'path': self.path('missing'), 'reset': 0o600}],
+            ['chmod', {'path': self.path('missing'), 'reset': 0o600,
+                       'force': True}],
+            ['remove', {'path': path}],
+            ['write', {'path': path}],
+            ['write'],
+            ['write', {'path': path, 'data': encode(b'data')}])
+
+        # An error doesn't stop the next operations.
+        self.assertIn('FileNotFoundError', results[0]['error'])
+        self.assertEqual({'result': None}, results[1])
+        self.assertIn('KeyError', results[2]['error'])
+        self.assertIn('TypeError', results[3]['error'])
+        self.assertIn('ValueError', results[4]['error'])
+        self.assertEqual({'result': None}, results[5])
+        self.assertTrue(os.path.isfile(path))
+
+    def test_many_requests(self):
+        path = self.path('file')
+
+        self.assertEqual(
+            [[{'result': None}], [{'result': encode(b'data')}], []],
+            self.serve([['write', {'path': path, 'data': encode(b'data')}]],
+                       [['read', {'path': path}]],
+                       []))
+
+    def test_invalid_json(self):
+        data = b'{"not": json'
+
+        self.assertEqual([], self.serve_data(
+            file_helper.HEADER.pack(len(data)) + data))
+
+    def test_not_a_list(self):
+        self.assertEqual([], self.serve({'read': {'path': '/'}},
+                                        [['exists', {'path': '/'}]]))
+
+    def test_truncated_message(self):
+        data = json.dumps([['exists', {'path': '/'}]]).encode('utf-8')
+
+        self.assertEqual([], self.serve_data(
+            file_helper.HEADER.pack(len(data)) + data[:-1]))
+        self.assertEqual([], self.serve_data(
+            file_helper.HEADER.pack(len(data))[:-1]))
+
+    def test_oversized_message(self):
+        stdin = io.BytesIO(file_helper.HEADER.pack(
+            file_helper.MAX_REQUEST_SIZE + 1) + b'[]')
+        stdout = io.BytesIO()
+
+        file_helper.serve(stdin, stdout)
+
+        # The helper exits without reading the message.
+        self.assertEqual(file_helper.HEADER.size, stdin.tell())
+        self.assertEqual(b'', stdout.getvalue())
+
+
+class FileHelperTest(trove_testtools.TestCase):
+    """Run the helper in a child process, without sudo."""
+
+    def setUp(self):
+        super(FileHelperTest, self).setUp()
+        self.root_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root_dir)
+        self.path = os.path.join(self.root_dir, 'file')
+        self.helper = file_helper.FileHelper(
+            command=[sys.executable, '-m', file_helper.__name__])
+        self.addCleanup(self.helper.stop)
+
+    def test_call(self):
+        self.assertIsNone(self.helper.call('read', path=self.path))
+        self.helper.defer('write', path=self.path, data=encode(b'data'))
+
+        self.assertEqual(encode(b'data'),
+                         self.helper.call('read', path=self.path))
+        self.assertEqual([True, False], self.helper.call_many(
+            'exists', [{'path': self.path},
+                       {'path': self.path, 'is_directory': True}]))
+
+    def test_error(self):
+        self.helper.begin_batch()
+        self.helper.defer('chmod', path=os.path.join(self.root_dir, 'none'),
+                          reset=0o600)
+        self.helper.defer('write', path=self.path, data=encode(b'data'))
+
+        error = self.assertRaises(exception.ProcessExecutionError,
+                                  self.helper.end_batch)
+        self.assertIn('FileNotFoundError', error.stderr)
+        # The operations after the failed one ran, and the helper still
+        # serves the next requests.
+        self.assertEqual(encode(b'data'),
+                         self.helper.call('read', path=self.path))
+
+    def test_restart(self):
+        self.helper.call('exists', path=self.path)
+        process = self.helper._process
+        process.kill()
+        process.wait()
+
+        self.assertFalse(self.helper.call('exists', path=self.path))
+        self.assertIsNot(process, self.helper._process)
+
+    def test_exit_during_request(self):
+        self.helper.command = [sys.executable, '-c',
+                               'import sys; sys.stdin.buffer.read(1)']
+
+        self.assertRaises(exception.ProcessExecutionError,
+                          self.helper.call, 'exists', path=self.path)
+        self.assertIsNone(self.helper._process)
+
+        # The next request starts a new helper.
+        self.helper.command = [sys.executable, '-m', file_helper.__name__]
+        self.assertFalse(self.helper.call('exists', path=self.path))
+
+    def test_stop(self):
+        self.helper.call('exists', path=self.path)
+        process = self.helper._process
+
+        self.helper.stop()
+
+        self.assertEqual(0, process.returncode)
+        self.assertIsNone(self.helper._process)
+
+    @patch.object(operating_system, '_file_helper')
+    def test_batch(self, mock_file_helper):
+        mock_file_helper.return_value = self.helper
+        requests = []
+        send = self.helper._send
+
+        def _send(operations):
+            requests.append([name for name, _ in operations])
+            return send(operations)
+
+        with patch.object(self.helper, '_send', side_effect=_send):
+            with operating_system.batch():
+                operating_system.write_file(self.path, 'data', as_root=True)
+                operating_system.chmod(
+                    self.path, operating_system.FileMode.SET_USR_RW,
+                    as_root=True)
+                with operating_system.batch():
+                    operating_system.write_file(self.path, 'new data',
+                                                as_root=True)
+                # The inner batch doesn't send the operations.
+                self.assertEqual([], requests)
+                self.assertFalse(os.path.exists(self.path))
+
+                # A read is sent after the queued operations, in order.
+                self.assertEqual('new data', operating_system.read_file(
+                    self.path, as_root=True))
+                self.assertEqual([['write', 'chmod', 'write', 'read']],
+                                 requests)
+
+                operating_system.chmod(
+                    self.path, operating_system.FileMode.SET_USR_RO,
+                    as_root=True)
+                self.assertEqual(1, len(requests))
+
+        self.assertEqual([['write', 'chmod', 'write', 'read'], ['chmod']],
+                         requests)
+        self.assertEqual(0o400, stat.S_IMODE(os.stat(self.path).st_mode))
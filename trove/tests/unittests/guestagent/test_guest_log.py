@@ -0,0 +1,247 @@
+# Copyright 2020 Catalyst Cloud
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from unittest.mock import Mock
+from unittest.mock import patch
+
+from swiftclient.client import ClientException
+
+from trove.common import clients
+from trove.guestagent.common import operating_system
+from trove.guestagent import guest_log
+from trove.tests.unittests import trove_testtools
+
+
+class FakeSwiftClient(object):
+    """In memory swift, the uploads are recorded in order."""
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = []
+        self.fail_upload = None
+
+    def get_container(self, container, prefix=None):
+        return {}, [{'name': name} for name in sorted(self.objects)
+                    if name.startswith(prefix or '')]
+
+    def put_container(self, container, headers=None):
+        pass
+
+    def put_object(self, container, obj, contents, content_length=None,
+                   content_type=None, headers=None):
+        if hasattr(contents, 'read'):
+            contents = contents.read(content_length)
+        elif isinstance(contents, str):
+            contents = contents.encode('utf-8')
+        else:
+            contents = bytes(contents)
+
+        if self.fail_upload and self.fail_upload(obj):
+            raise ClientException('upload failed', http_status=503)
+        self.objects[obj] = contents
+        self.uploads.append({'name': obj, 'contents': contents,
+                             'content_type': content_type,
+                             'headers': headers})
+
+    def get_object(self, container, obj):
+        if obj not in self.objects:
+            raise ClientException('not found', http_status=404)
+        return {}, self.objects[obj]
+
+    def delete_object(self, container, obj):
+        self.objects.pop(obj, None)
+
+
+class GuestLogPublishTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(GuestLogPublishTest, self).setUp()
+        self.log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.log_dir)
+        self.log_file = os.path.join(self.log_dir, 'general.log')
+
+        self.swift = FakeSwiftClient()
+        for patcher in (
+                patch.object(clients, 'swift_client',
+                             return_value=self.swift),
+                patch.object(operating_system, 'chmod')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.patch_conf_property('guest_log_limit', 16)
+        self.patch_conf_property('guest_log_expiry', 3600)
+        self.patch_conf_property('guest_log_compression', False)
+
+    def _write_log(self, data, mode='wb'):
+        with open(self.log_file, mode) as log:
+            log.write(data)
+
+    def _guest_log(self):
+        log = guest_log.GuestLog(Mock(is_admin=False), 'general',
+                                 guest_log.LogType.USER, 'trove',
+                                 self.log_file, True)
+        log.enabled = True
+        return log
+
+    def _publish(self, log):
+        # The manager shows the log before it publishes it.
+        log.show()
+        return log.publish_log()
+
+    def _components(self):
+        return [upload for upload in self.swift.uploads
+                if not upload['name'].endswith('_metafile')]
+
+    def _published_sizes(self):
+        return [json.loads(upload['contents'])['log_size']
+                for upload in self.swift.uploads
+                if upload['name'].endswith('_metafile')]
+
+    def test_publish(self):
+        self._write_log(b'aaaa\nbbbbbbbb\ncccccc\n')
+        log = self._guest_log()
+
+        details = self._publish(log)
+
+        components = self._components()
+        # The first chunk is cut after its last complete line.
+        self.assertEqual([b'aaaa\nbbbbbbbb\n', b'cccccc\n'],
+                         [component['contents'] for component in components])
+        self.assertEqual([{'X-Delete-After': '3600',
+                           'x-object-meta-lines': '2'},
+                          {'X-Delete-After': '3600',
+                           'x-object-meta-lines': '1'}],
+                         [component['headers'] for component in components])
+        for component in components:
+            self.assertTrue(component['name'].startswith(
+                log._object_prefix() + 'log-'))
+        # The published size is saved before the publish and after each
+        # component.
+        self.assertEqual([0, 14, 21], self._published_sizes())
+        self.assertEqual(21, details['published'])
+        self.assertEqual(0, details['pending'])
+        self.assertEqual('Published', details['status'])
+
+    def test_publish_long_lines(self):
+        self._write_log(b'x' * 40 + b'\nyy')
+        log = self._guest_log()
+
+        self._publish(log)
+
+        components = self._components()
+        # A line longer than a chunk is split, the partial line at the end
+        # of the file is published and counted.
+        self.assertEqual([b'x' * 16, b'x' * 16, b'x' * 8 + b'\nyy'],
+                         [component['contents'] for component in components])
+        self.assertEqual(
+            ['1', '1', '2'],
+            [component['headers']['x-object-meta-lines']
+             for component in components])
+        self.assertEqual([0, 16, 32, 43], self._published_sizes())
+
+    def test_publish_appended(self):
+        self._write_log(b'aaaa\nbb')
+        log = self._guest_log()
+        self._publish(log)
+        self._write_log(b'bb\ncc\n', mode='ab')
+
+        details = self._publish(log)
+
+        components = self._components()
+        # Only the data appended since the previous publish is uploaded.
+        self.assertEqual([b'aaaa\nbb', b'bb\ncc\n'],
+                         [component['contents'] for component in components])
+        self.assertEqual(
+            ['2', '2'],
+            [component['headers']['x-object-meta-lines']
+             for component in components])
+        self.assertEqual(13, details['published'])
+
+    def test_publish_nothing_new(self):
+        self._write_log(b'aaaa\n')
+        log = self._guest_log()
+        self._publish(log)
+
+        self._publish(log)
+
+        self.assertEqual(1, len(self._components()))
+
+    def test_publish_resumed(self):
+        self._write_log(b'aaaa\nbbbbbbbb\ncccccc\n')
+        uploaded = []
+
+        def _fail_upload(name):
+            if name.endswith('_metafile'):
+                return False
+            uploaded.append(name)
+            return len(uploaded) == 2
+        self.swift.fail_upload = _fail_upload
+
+        self.assertRaises(ClientException, self._publish,
+                          self._guest_log())
+        self.assertEqual([0, 14], self._published_sizes())
+
+        # A new publish, by a restarted guest agent for example, resumes
+        # after the last uploaded component.
+        self.swift.fail_upload = None
+        details = self._publish(self._guest_log())
+
+        self.assertEqual([b'aaaa\nbbbbbbbb\n', b'cccccc\n'],
+                         [component['contents']
+                          for component in self._components()])
+        self.assertEqual([0, 14, 14, 21], self._published_sizes())
+        self.assertEqual(21, details['published'])
+
+    def test_publish_compressed(self):
+        self.patch_conf_property('guest_log_compression', True)
+        self._write_log(b'aaaa\nbbbbbbbb\ncccccc\n')
+        log = self._guest_log()
+
+        self._publish(log)
+
+        components = self._components()
+        self.assertEqual(
+            [b'aaaa\nbbbbbbbb\n', b'cccccc\n'],
+            [gzip.decompress(component['contents'])
+             for component in components])
+        for component in components:
+            self.assertTrue(component['name'].endswith('.gz'))
+            self.assertEqual('application/gzip', component['content_type'])
+            self.assertEqual('gzip',
+                             component['headers']['x-object-meta-compression'])
+        self.assertEqual(
+            ['2', '1'],
+            [component['headers']['x-object-meta-lines']
+             for component in components])
+        self.assertEqual([0, 14, 21], self._published_sizes())
+
+    def test_publish_rotated(self):
+        self._write_log(b'aaaa\nbbbbbbbb\n')
+        log = self._guest_log()
+        self._publish(log)
+        self._write_log(b'dddd\n')
+
+        details = self._publish(log)
+
+        # The components of the old log are discarded.
+        names = [upload['name'] for upload in self._components()]
+        self.assertEqual([names[-1]],
+                         [name for name in self.swift.objects
+                          if not name.endswith('_metafile')])
+        self.assertEqual(b'dddd\n', self.swift.objects[names[-1]])
+        self.assertEqual(5, details['published'])
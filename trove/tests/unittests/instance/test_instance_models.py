@@ -11,10 +11,15 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+from datetime import datetime
+from datetime import timedelta
 from unittest.mock import Mock
 from unittest.mock import patch
 import uuid
 
+import eventlet
+from novaclient import exceptions as nova_exceptions
+
 from trove.backup import models as backup_models
 from trove.common import cfg
 from trove.common import clients
@@ -478,3 +483,226 @@ class TestInstanceKeyCaching(trove_testtools.TestCase):
         self.assertEqual(keyfn.call_count, 1)
         self.assertIsNone(keycache[30])
         self.assertEqual(keyfn.call_count, 2)
+
+
+class TestInstancesLoad(trove_testtools.TestCase):
+
+    def setUp(self):
+        util.init_db()
+        super(TestInstancesLoad, self).setUp()
+        self.context = trove_testtools.TroveTestContext(
+            self, project_id=str(uuid.uuid4()))
+        self.datastore = datastore_models.DBDatastore.create(
+            id=str(uuid.uuid4()),
+            name='mysql' + str(uuid.uuid4()),
+        )
+        self.addCleanup(self.datastore.delete)
+        self.datastore_version = (
+            datastore_models.DBDatastoreVersion.create(
+                id=str(uuid.uuid4()),
+                datastore_id=self.datastore.id,
+                name="5.7" + str(uuid.uuid4()),
+                manager="mysql",
+                image_id="image_id",
+                packages="",
+                active=True))
+        self.addCleanup(self.datastore_version.delete)
+
+        self.servers = []
+        self.ports = []
+        for i in range(6):
+            db_info = DBInstance.create(
+                name='instance-%s' % i, flavor_id=1,
+                tenant_id=self.context.project_id,
+                volume_size=1,
+                compute_instance_id='server-%s' % i,
+                datastore_version_id=self.datastore_version.id,
+                task_status=InstanceTasks.NONE)
+            self.addCleanup(db_info.delete)
+            status = InstanceServiceStatus.create(
+                instance_id=db_info.id, status=ServiceStatuses.HEALTHY)
+            self.addCleanup(status.delete)
+
+            self.servers.append(Mock(id='server-%s' % i, status='ACTIVE'))
+            self.ports.append({'id': 'port-%s' % i,
+                               'device_id': 'server-%s' % i,
+                               'description': '',
+                               'fixed_ips': [{'ip_address': '10.0.0.%s' % i}]})
+
+        self.nova_client = Mock()
+        self.nova_client.servers.get.side_effect = self._get_server
+        nova_patcher = patch.object(clients, 'create_nova_client',
+                                    return_value=self.nova_client)
+        self.addCleanup(nova_patcher.stop)
+        nova_patcher.start()
+
+        self.neutron_client = Mock()
+        self.neutron_client.list_ports.return_value = {'ports': self.ports}
+        self.neutron_client.list_floatingips.return_value = {
+            'floatingips': [{'port_id': 'port-1',
+                             'floating_ip_address': '172.24.5.1'}]}
+        neutron_patcher = patch.object(clients, 'create_neutron_client',
+                                       return_value=self.neutron_client)
+        self.addCleanup(neutron_patcher.stop)
+        neutron_patcher.start()
+
+    def _get_server(self, server_id):
+        for server in self.servers:
+            if server.id == server_id:
+                return server
+        raise nova_exceptions.NotFound(404)
+
+    def test_load(self):
+        instances, marker = models.Instances.load(self.context, False)
+
+        self.assertEqual(6, len(instances))
+        self.assertIsNone(marker)
+        self.nova_client.servers.list.assert_not_called()
+        self.assertEqual(6, self.nova_client.servers.get.call_count)
+        self.assertEqual(1, self.neutron_client.list_ports.call_count)
+        self.assertEqual(1, self.neutron_client.list_floatingips.call_count)
+
+        addresses = {instance.db_info.compute_instance_id: instance.addresses
+                     for instance in instances}
+        self.assertEqual([{'address': '10.0.0.1', 'type': 'private'},
+                          {'address': '172.24.5.1', 'type': 'public'}],
+                         addresses['server-1'])
+        self.assertEqual([{'address': '10.0.0.2', 'type': 'private'}],
+                         addresses['server-2'])
+
+    def test_load_many_servers(self):
+        self.servers = self.servers[1:]
+        running = []
+        max_running = []
+
+        def _get_server(server_id):
+            running.append(server_id)
+            max_running.append(len(running))
+            try:
+                # Let the other requests of the pool run.
+                eventlet.sleep(0)
+                return self._get_server(server_id)
+            finally:
+                running.remove(server_id)
+        self.nova_client.servers.get.side_effect = _get_server
+
+        with patch.object(models, 'SERVER_LOAD_POOL_SIZE', 4):
+            instances, _ = models.Instances.load(self.context, False)
+
+        self.assertEqual(6, len(instances))
+        # Only the servers of the page are fetched, never the servers of the
+        # whole project.
+        self.nova_client.servers.list.assert_not_called()
+        self.assertEqual(6, self.nova_client.servers.get.call_count)
+        self.assertEqual(4, max(max_running))
+        statuses = {instance.db_info.compute_instance_id:
+                    instance.db_info.server_status
+                    for instance in instances}
+        self.assertEqual('SHUTDOWN', statuses['server-0'])
+        self.assertEqual('ACTIVE', statuses['server-1'])
+
+    def test_load_server_not_found(self):
+        self.servers = self.servers[1:]
+
+        instances, _ = models.Instances.load(self.context, False)
+
+        statuses = {instance.db_info.compute_instance_id:
+                    instance.db_info.server_status
+                    for instance in instances}
+        self.assertEqual('SHUTDOWN', statuses['server-0'])
+        self.assertEqual('ACTIVE', statuses['server-1'])
+        device_ids = self.neutron_client.list_ports.call_args[1]['device_id']
+        self.assertNotIn('server-0', device_ids)
+
+    def test_load_remote_region(self):
+        DBInstance.find_by(compute_instance_id='server-0',
+                           tenant_id=self.context.project_id).update(
+            region_id='remote-region')
+
+        instances, _ = models.Instances.load(self.context, False)
+
+        self.assertEqual(6, len(instances))
+        self.assertEqual(6, self.nova_client.servers.get.call_count)
+        # One port list for the local region and one for the remote one.
+        self.assertEqual(2, self.neutron_client.list_ports.call_count)
+        regions = [kwargs['region_name'] for _, kwargs in
+                   clients.create_nova_client.call_args_list]
+        self.assertIn('remote-region', regions)
+
+    def test_load_pages(self):
+        self.context.limit = 4
+
+        instances, marker = models.Instances.load(self.context, False)
+
+        self.assertEqual(4, len(instances))
+        self.assertIsNotNone(marker)
+        # Only the servers of the page are fetched.
+        server_ids = {args[0] for args, _ in
+                      self.nova_client.servers.get.call_args_list}
+        self.assertEqual({i.db_info.compute_instance_id for i in instances},
+                         server_ids)
+
+        self.context.marker = marker
+        next_instances, marker = models.Instances.load(self.context, False)
+
+        self.assertEqual(2, len(next_instances))
+        self.assertIsNone(marker)
+        self.assertEqual(
+            sorted('instance-%s' % i for i in range(6)),
+            sorted(i.name for i in instances + next_instances))
+
+    def test_load_pages_created_order(self):
+        created = datetime.utcnow()
+        for db_info in DBInstance.find_all(tenant_id=self.context.project_id):
+            # The instances are created in reverse order of their names.
+            index = int(db_info.name.split('-')[1])
+            db_info.update(created=created - timedelta(seconds=index))
+        self.context.limit = 2
+
+        names = []
+        marker = None
+        for _ in range(3):
+            self.context.marker = marker
+            instances, marker = models.Instances.load(self.context, False)
+            names.extend(i.name for i in instances)
+
+        self.assertIsNone(marker)
+        self.assertEqual(['instance-%s' % i for i in range(5, -1, -1)],
+                         names)
+
+    def test_load_legacy_marker(self):
+        self.context.limit = 3
+        instances, _ = models.Instances.load(self.context, False)
+
+        # Markers were instance ids before the keyset pagination.
+        self.context.marker = instances[-1].id
+        next_instances, marker = models.Instances.load(self.context, False)
+
+        self.assertEqual(3, len(next_instances))
+        self.assertIsNone(marker)
+        self.assertFalse({i.id for i in instances} &
+                         {i.id for i in next_instances})
+
+    def test_load_invalid_marker(self):
+        self.context.marker = 'invalid'
+
+        self.assertRaises(exception.BadRequest,
+                          models.Instances.load, self.context, False)
+
+    def test_load_instance_statuses(self):
+        db_infos = DBInstance.find_all(tenant_id=self.context.project_id,
+                                       deleted=False).all()
+        db_infos[0].update(task_id=InstanceTasks.BUILDING.code)
+        instance_ids = [db_info.id for db_info in db_infos]
+
+        statuses = models.load_instance_statuses(instance_ids)
+
+        self.assertEqual(set(instance_ids), set(statuses))
+        self.assertEqual((InstanceTasks.BUILDING, ServiceStatuses.HEALTHY),
+                         statuses[instance_ids[0]])
+        self.assertEqual((InstanceTasks.NONE, ServiceStatuses.HEALTHY),
+                         statuses[instance_ids[1]])
+
+    def test_load_instance_statuses_not_found(self):
+        self.assertRaises(exception.ModelNotFoundError,
+                          models.load_instance_statuses, ['invalid'])
@@ -0,0 +1,143 @@
+# Copyright 2020 Catalyst Cloud
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+from unittest.mock import Mock
+
+from trove.common import cfg
+from trove.common import exception
+from trove.common import utils
+from trove.job import models
+from trove.tests.unittests import trove_testtools
+from trove.tests.unittests.util import util
+
+CONF = cfg.CONF
+
+
+class JobTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(JobTest, self).setUp()
+        util.init_db()
+        self.context = Mock(project_id='tenant_1', is_admin=False)
+        self.job_type = 'test_%s' % utils.generate_uuid()
+        self.instance_ids = [utils.generate_uuid() for _ in range(3)]
+        self.job = models.Job.create(self.context, self.job_type, 'module_1',
+                                     {'batch_size': 2}, self.instance_ids)
+
+    def test_create(self):
+        job = models.Job.load(self.context, self.job.id)
+
+        self.assertEqual(self.job_type, job.type)
+        self.assertEqual('module_1', job.resource_id)
+        self.assertEqual('tenant_1', job.tenant_id)
+        self.assertEqual(models.JobStatus.RUNNING, job.status)
+        self.assertEqual({'batch_size': 2}, job.parameters)
+        self.assertEqual(sorted(self.instance_ids),
+                         sorted(job.pending_instance_ids()))
+
+    def test_load_other_tenant(self):
+        context = Mock(project_id='tenant_2', is_admin=False)
+
+        self.assertRaises(exception.ModelNotFoundError,
+                          models.Job.load, context, self.job.id)
+
+    def test_set_item_status(self):
+        self.job.set_item_status(self.instance_ids[0],
+                                 models.JobItemStatus.SUCCEEDED)
+        self.job.set_item_status(self.instance_ids[1],
+                                 models.JobItemStatus.FAILED, 'x' * 300)
+
+        self.assertEqual([self.instance_ids[2]],
+                         self.job.pending_instance_ids())
+        self.assertEqual({models.JobItemStatus.PENDING: 1,
+                          models.JobItemStatus.SUCCEEDED: 1,
+                          models.JobItemStatus.FAILED: 1},
+                         self.job.count_items())
+        failed = self.job.load_items(models.JobItemStatus.FAILED)
+        self.assertEqual(255, len(failed[0].message))
+
+    def test_finish_fails_pending(self):
+        self.job.set_item_status(self.instance_ids[0],
+                                 models.JobItemStatus.SUCCEEDED)
+
+        self.job.finish()
+
+        self.assertEqual(models.JobStatus.COMPLETED, self.job.status)
+        self.assertEqual({models.JobItemStatus.SUCCEEDED: 1,
+                          models.JobItemStatus.FAILED: 2},
+                         self.job.count_items())
+
+    def test_load_unfinished(self):
+        jobs = models.Job.load_unfinished(self.job_type)
+        self.assertEqual([self.job.id], [job.id for job in jobs])
+        self.assertEqual(
+            [], models.Job.load_unfinished(self.job_type, host='other'))
+
+        self.job.finish()
+
+        self.assertEqual(models.JobStatus.COMPLETED, self.job.status)
+        self.assertEqual([], models.Job.load_unfinished(self.job_type))
+
+    def test_claim(self):
+        job = models.Job.create(self.context, self.job_type, 'module_2', {},
+                                self.instance_ids, claimed=False)
+        self.assertEqual([self.job.id], [
+            unfinished.id
+            for unfinished in models.Job.load_unfinished(self.job_type)])
+
+        self.assertTrue(job.claim())
+
+        self.assertEqual(CONF.host, job.db_info.host)
+        self.assertEqual(
+            sorted([self.job.id, job.id]),
+            sorted(unfinished.id
+                   for unfinished in models.Job.load_unfinished(
+                       self.job_type)))
+        self.assertFalse(self.job.claim())
+
+    def _age(self, job, **fields):
+        past = datetime.datetime(2020, 1, 1)
+        models.DBJob.find_all(id=job.id).update(
+            **{field: past for field in fields})
+
+    def test_load_unclaimed(self):
+        job = models.Job.create(self.context, self.job_type, 'module_2', {},
+                                self.instance_ids, claimed=False)
+        self.assertEqual([], models.Job.load_unclaimed(self.job_type, 60))
+
+        self._age(job, created=True)
+
+        self.assertEqual([job.id], [
+            unclaimed.id
+            for unclaimed in models.Job.load_unclaimed(self.job_type, 60)])
+        job.claim()
+        self.assertEqual([], models.Job.load_unclaimed(self.job_type, 60))
+
+    def test_purge(self):
+        running = models.Job.create(self.context, self.job_type, 'module_2',
+                                    {}, self.instance_ids)
+        recent = models.Job.create(self.context, self.job_type, 'module_3',
+                                   {}, self.instance_ids)
+        recent.finish()
+        self.job.finish()
+        self._age(self.job, updated=True)
+        self._age(running, updated=True)
+
+        self.assertEqual(1, models.Job.purge(60, batch_size=1))
+
+        self.assertIsNone(models.DBJob.get_by(id=self.job.id))
+        self.assertEqual([], self.job.load_items())
+        for job in (running, recent):
+            self.assertEqual(3, len(job.load_items()))
@@ -19,6 +19,7 @@ from testtools.matchers import Not
 import uuid
 
 from unittest.mock import ANY
+from unittest.mock import call
 from unittest.mock import MagicMock
 from unittest.mock import patch
 from novaclient.client import Client
@@ -95,6 +96,13 @@ class MockMgmtInstanceTest(trove_testtools.TestCase):
         instance.delete()
         status.delete()
 
+    def build_server(self):
+        server = MagicMock(spec=Server)
+        server.id = 'compute_id_1'
+        server.status = 'ACTIVE'
+        server.user_id = 'test_user_id'
+        return server
+
     def build_db_instance(self, status, task_status=InstanceTasks.NONE):
         instance = DBInstance(InstanceTasks.NONE,
                               name='test_name',
@@ -141,6 +149,23 @@ class TestNotificationTransformer(MockMgmtInstanceTest):
         self.assertIn(status.lower(), [db['state'] for db in payloads])
         self.addCleanup(self.do_cleanup, instance, service_status)
 
+    def test_iter_batches(self):
+        CONF.set_override('exists_notification_batch_size', 1)
+        status = srvstatus.ServiceStatuses.BUILDING.api_status
+        instance1, service_status1 = self.build_db_instance(status)
+        self.addCleanup(self.do_cleanup, instance1, service_status1)
+        instance2, service_status2 = self.build_db_instance(status)
+        self.addCleanup(self.do_cleanup, instance2, service_status2)
+
+        batches = list(mgmtmodels.NotificationTransformer(
+            context=self.context).iter_batches())
+
+        self.assertTrue(all(len(batch) == 1 for batch in batches))
+        instance_ids = [batch[0]['instance_id'] for batch in batches]
+        self.assertEqual(sorted(instance_ids), instance_ids)
+        self.assertIn(instance1.id, instance_ids)
+        self.assertIn(instance2.id, instance_ids)
+
     def test_get_service_id(self):
         id_map = {
             'mysql': '123',
@@ -189,6 +214,25 @@ class TestNovaNotificationTransformer(MockMgmtInstanceTest):
             self.assertThat(transformer._lookup_flavor('2'),
                             Equals('unknown'))
 
+    def test_load_servers(self):
+        CONF.set_override('exists_notification_batch_size', 2)
+        servers = [MagicMock(id=str(i), status='ACTIVE', user_id='user_1')
+                   for i in range(3)]
+        transformer = mgmtmodels.NovaNotificationTransformer(
+            context=self.context)
+        with patch.object(self.server_mgr, 'list',
+                          side_effect=[servers[:2], servers[2:], []]) as (
+                mock_list):
+            result = transformer._load_servers()
+
+        self.assertEqual(
+            {str(i): mgmtmodels.ServerSummary(str(i), 'ACTIVE', 'user_1')
+             for i in range(3)}, result)
+        mock_list.assert_has_calls([
+            call(search_opts={'all_tenants': 1}, marker=None, limit=2),
+            call(search_opts={'all_tenants': 1}, marker='1', limit=2),
+            call(search_opts={'all_tenants': 1}, marker='2', limit=2)])
+
     def test_transformer(self):
         status = srvstatus.ServiceStatuses.BUILDING.api_status
         instance, service_status = self.build_db_instance(
@@ -197,17 +241,12 @@ class TestNovaNotificationTransformer(MockMgmtInstanceTest):
         flavor = MagicMock(spec=Flavor)
         flavor.name = 'db.small'
 
-        server = MagicMock(spec=Server)
-        server.user_id = 'test_user_id'
+        server = self.build_server()
         transformer = mgmtmodels.NovaNotificationTransformer(
             context=self.context)
-        mgmt_instance = mgmtmodels.SimpleMgmtInstance(self.context,
-                                                      instance,
-                                                      server,
-                                                      service_status)
 
-        with patch.object(mgmtmodels, 'load_mgmt_instances',
-                          return_value=[mgmt_instance]):
+        with patch.object(self.server_mgr, 'list',
+                          side_effect=[[server], []]):
             with patch.object(self.flavor_mgr, 'get', return_value=flavor):
 
                 payloads = transformer()
@@ -235,20 +274,15 @@ class TestNovaNotificationTransformer(MockMgmtInstanceTest):
         version = datastore_models.DBDatastoreVersion.get_by(
             id=instance.datastore_version_id)
         version.update(manager='something invalid')
-        server = MagicMock(spec=Server)
-        server.user_id = 'test_user_id'
+        server = self.build_server()
 
         flavor = MagicMock(spec=Flavor)
         flavor.name = 'db.small'
 
-        mgmt_instance = mgmtmodels.SimpleMgmtInstance(self.context,
-                                                      instance,
-                                                      server,
-                                                      service_status)
         transformer = mgmtmodels.NovaNotificationTransformer(
             context=self.context)
-        with patch.object(mgmtmodels, 'load_mgmt_instances',
-                          return_value=[mgmt_instance]):
+        with patch.object(self.server_mgr, 'list',
+                          side_effect=[[server], []]):
             with patch.object(self.flavor_mgr,
                               'get', return_value=flavor):
                 payloads = transformer()
@@ -277,8 +311,8 @@ class TestNovaNotificationTransformer(MockMgmtInstanceTest):
         status = srvstatus.ServiceStatuses.SHUTDOWN.api_status
         instance, service_status = self.build_db_instance(status)
         service_status.set_status(srvstatus.ServiceStatuses.SHUTDOWN)
-        server = MagicMock(spec=Server)
-        server.user_id = 'test_user_id'
+        service_status.save()
+        server = self.build_server()
 
         mgmt_instance = mgmtmodels.SimpleMgmtInstance(self.context,
                                                       instance,
@@ -290,8 +324,8 @@ class TestNovaNotificationTransformer(MockMgmtInstanceTest):
             context=self.context)
         with patch.object(Backup, 'running', return_value=None):
             self.assertThat(mgmt_instance.status, Equals('SHUTDOWN'))
-            with patch.object(mgmtmodels, 'load_mgmt_instances',
-                              return_value=[mgmt_instance]):
+            with patch.object(self.server_mgr, 'list',
+                              side_effect=[[server], []]):
                 with patch.object(self.flavor_mgr, 'get', return_value=flavor):
                     payloads = transformer()
                     # assertion that SHUTDOWN instances are not reported
@@ -305,6 +339,7 @@ class TestNovaNotificationTransformer(MockMgmtInstanceTest):
         status = srvstatus.ServiceStatuses.SHUTDOWN.api_status
         instance, service_status = self.build_db_instance(status)
         service_status.set_status(srvstatus.ServiceStatuses.SHUTDOWN)
+        service_status.save()
         mgmt_instance = mgmtmodels.SimpleMgmtInstance(self.context,
                                                       instance,
                                                       None,
@@ -315,8 +350,8 @@ class TestNovaNotificationTransformer(MockMgmtInstanceTest):
             context=self.context)
         with patch.object(Backup, 'running', return_value=None):
             self.assertThat(mgmt_instance.status, Equals('SHUTDOWN'))
-            with patch.object(mgmtmodels, 'load_mgmt_instances',
-                              return_value=[mgmt_instance]):
+            with patch.object(self.server_mgr, 'list',
+                              side_effect=[[]]):
                 with patch.object(self.flavor_mgr, 'get', return_value=flavor):
                     payloads = transformer()
                     # assertion that SHUTDOWN instances are not reported
@@ -331,18 +366,13 @@ class TestNovaNotificationTransformer(MockMgmtInstanceTest):
         instance, service_status = self.build_db_instance(
             status, InstanceTasks.BUILDING)
 
-        server = MagicMock(spec=Server)
-        server.user_id = 'test_user_id'
-        mgmt_instance = mgmtmodels.SimpleMgmtInstance(self.context,
-                                                      instance,
-                                                      server,
-                                                      service_status)
+        server = self.build_server()
         flavor = MagicMock(spec=Flavor)
         flavor.name = 'db.small'
         transformer = mgmtmodels.NovaNotificationTransformer(
             context=self.context)
-        with patch.object(mgmtmodels, 'load_mgmt_instances',
-                          return_value=[mgmt_instance]):
+        with patch.object(self.server_mgr, 'list',
+                          side_effect=[[server], [], [server], []]):
             with patch.object(self.flavor_mgr, 'get', return_value=flavor):
 
                 transformer()
@@ -375,20 +405,15 @@ class TestMgmtInstanceTasks(MockMgmtInstanceTest):
         status = srvstatus.ServiceStatuses.BUILDING.api_status
         instance, service_status = self.build_db_instance(
             status, task_status=InstanceTasks.BUILDING)
-        server = MagicMock(spec=Server)
-        server.user_id = 'test_user_id'
-        mgmt_instance = mgmtmodels.SimpleMgmtInstance(self.context,
-                                                      instance,
-                                                      server,
-                                                      service_status)
+        server = self.build_server()
 
         flavor = MagicMock(spec=Flavor)
         flavor.name = 'db.small'
 
         notifier = MagicMock()
         with patch.object(rpc, 'get_notifier', return_value=notifier):
-            with patch.object(mgmtmodels, 'load_mgmt_instances',
-                              return_value=[mgmt_instance]):
+            with patch.object(self.server_mgr, 'list',
+                              side_effect=[[server], []]):
                 with patch.object(self.flavor_mgr, 'get', return_value=flavor):
                     self.assertThat(self.context.auth_token,
                                     Is('some_secret_password'))
@@ -27,6 +27,7 @@ from trove.quota.quota import DbQuotaDriver
 from trove.quota.quota import QUOTAS
 from trove.quota.quota import run_with_quotas
 from trove.tests.unittests import trove_testtools
+from trove.tests.unittests.util import util
 """
 Unit tests for the classes and functions in DbQuotaDriver.py.
 """
@@ -276,6 +277,56 @@ class DbQuotaDriverTest(trove_testtools.TestCase):
         self.assertEqual(CONF.max_volumes_per_tenant,
                          quotas[Resource.VOLUMES].hard_limit)
 
+    def test_get_quota_snapshot(self):
+
+        util.init_db()
+        FAKE_QUOTAS = [Quota(tenant_id=FAKE_TENANT1,
+                             resource=Resource.INSTANCES,
+                             hard_limit=22)]
+        FAKE_USAGES = [QuotaUsage(tenant_id=FAKE_TENANT1,
+                                  resource=Resource.VOLUMES,
+                                  in_use=3,
+                                  reserved=1),
+                       QuotaUsage(tenant_id=FAKE_TENANT2,
+                                  resource=Resource.INSTANCES,
+                                  in_use=2,
+                                  reserved=0)]
+
+        with patch.object(Quota, 'find_by_filter',
+                          return_value=FAKE_QUOTAS), \
+                patch.object(QuotaUsage, 'find_by_filter',
+                             return_value=FAKE_USAGES), \
+                patch.object(QuotaUsage, 'create') as mock_create:
+            snapshot = self.driver.get_quota_snapshot(resources.keys())
+
+        mock_create.assert_not_called()
+        self.assertEqual([FAKE_TENANT1, FAKE_TENANT2], sorted(snapshot))
+        quota, usage = snapshot[FAKE_TENANT1][Resource.INSTANCES]
+        self.assertEqual(22, quota.hard_limit)
+        self.assertEqual((0, 0), (usage.in_use, usage.reserved))
+        quota, usage = snapshot[FAKE_TENANT1][Resource.VOLUMES]
+        self.assertEqual(CONF.max_volumes_per_tenant, quota.hard_limit)
+        self.assertEqual((3, 1), (usage.in_use, usage.reserved))
+        quota, usage = snapshot[FAKE_TENANT2][Resource.INSTANCES]
+        self.assertEqual(FAKE_TENANT2, quota.tenant_id)
+        self.assertEqual(CONF.max_instances_per_tenant, quota.hard_limit)
+        self.assertEqual((2, 0), (usage.in_use, usage.reserved))
+        quota, usage = snapshot[FAKE_TENANT2][Resource.VOLUMES]
+        self.assertEqual(Resource.VOLUMES, usage.resource)
+        self.assertEqual((0, 0), (usage.in_use, usage.reserved))
+
+    def test_get_quota_snapshot_without_footprint(self):
+
+        util.init_db()
+        with patch.object(Quota, 'find_by_filter', return_value=[]), \
+                patch.object(QuotaUsage, 'find_by_filter',
+                             return_value=[]) as mock_find:
+            snapshot = self.driver.get_quota_snapshot(
+                resources.keys(), tenant_ids=[FAKE_TENANT1])
+
+        self.assertEqual({}, snapshot)
+        self.assertEqual(2, len(mock_find.call_args[1]['filters']))
+
     def test_get_quota_usage_by_tenant(self):
 
         FAKE_QUOTAS = [QuotaUsage(tenant_id=FAKE_TENANT1,
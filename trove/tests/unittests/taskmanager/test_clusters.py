@@ -15,12 +15,15 @@
 
 import datetime
 
+from unittest.mock import ANY
+from unittest.mock import call
 from unittest.mock import MagicMock
 from unittest.mock import Mock
 from unittest.mock import patch
 
 from trove.cluster.models import ClusterTasks as ClusterTaskStatus
 from trove.cluster.models import DBCluster
+from trove.common import exception
 from trove.common import utils
 from trove.common.strategies.cluster.experimental.mongodb.taskmanager import (
     MongoDbClusterTasks as ClusterTasks)
@@ -96,44 +99,37 @@ class MongoDbClusterTasksTest(trove_testtools.TestCase):
                                          datastore_version=mock_dv1)
 
     @patch.object(ClusterTasks, 'update_statuses_on_failure')
-    @patch.object(DBInstance, 'find_by')
-    @patch.object(InstanceServiceStatus, 'find_by')
+    @patch('trove.instance.models.load_instance_statuses')
     @patch('trove.taskmanager.models.LOG')
-    def test_all_instances_ready_with_server_error(self,
-                                                   mock_logging, mock_find,
-                                                   mock_db_find, mock_update):
-        (mock_find.return_value.
-         get_status.return_value) = ServiceStatuses.NEW
-        (mock_db_find.return_value.
-         get_task_status.return_value) = InstanceTasks.BUILDING_ERROR_SERVER
+    def test_all_instances_ready_with_server_error(self, mock_logging,
+                                                   mock_load, mock_update):
+        mock_load.return_value = {
+            instance_id: (InstanceTasks.BUILDING_ERROR_SERVER,
+                          ServiceStatuses.NEW)
+            for instance_id in ["1", "2", "3", "4"]}
         ret_val = self.clustertasks._all_instances_ready(["1", "2", "3", "4"],
                                                          self.cluster_id)
         mock_update.assert_called_with(self.cluster_id, None)
         self.assertFalse(ret_val)
 
     @patch.object(ClusterTasks, 'update_statuses_on_failure')
-    @patch.object(DBInstance, 'find_by')
-    @patch.object(InstanceServiceStatus, 'find_by')
+    @patch('trove.instance.models.load_instance_statuses')
     @patch('trove.taskmanager.models.LOG')
     def test_all_instances_ready_bad_status(self, mock_logging,
-                                            mock_find, mock_db_find,
-                                            mock_update):
-        (mock_find.return_value.
-         get_status.return_value) = ServiceStatuses.FAILED
-        (mock_db_find.return_value.
-         get_task_status.return_value) = InstanceTasks.NONE
+                                            mock_load, mock_update):
+        mock_load.return_value = {
+            instance_id: (InstanceTasks.NONE, ServiceStatuses.FAILED)
+            for instance_id in ["1", "2", "3", "4"]}
         ret_val = self.clustertasks._all_instances_ready(["1", "2", "3", "4"],
                                                          self.cluster_id)
         mock_update.assert_called_with(self.cluster_id, None)
         self.assertFalse(ret_val)
 
-    @patch.object(DBInstance, 'find_by')
-    @patch.object(InstanceServiceStatus, 'find_by')
-    def test_all_instances_ready(self, mock_find, mock_db_find):
-        (mock_find.return_value.
-         get_status.return_value) = ServiceStatuses.INSTANCE_READY
-        (mock_db_find.return_value.
-         get_task_status.return_value) = InstanceTasks.NONE
+    @patch('trove.instance.models.load_instance_statuses')
+    def test_all_instances_ready(self, mock_load):
+        mock_load.return_value = {
+            instance_id: (InstanceTasks.NONE, ServiceStatuses.INSTANCE_READY)
+            for instance_id in ["1", "2", "3", "4"]}
         ret_val = self.clustertasks._all_instances_ready(["1", "2", "3", "4"],
                                                          self.cluster_id)
         self.assertTrue(ret_val)
@@ -310,6 +306,7 @@ class MongoDbClusterTasksTest(trove_testtools.TestCase):
 
         self._assert_rolling_upgrade_cluster(ordering_function, ordering)
 
+    @patch.object(ClusterTasks, '_wait_for_healthy_nodes')
     @patch('trove.taskmanager.models.DBaaSInstanceUpgrade')
     @patch('trove.taskmanager.models.BuiltInstanceTasks')
     @patch('trove.taskmanager.models.EndNotification')
@@ -326,7 +323,8 @@ class MongoDbClusterTasksTest(trove_testtools.TestCase):
                                         mock_start,
                                         mock_end,
                                         mock_instance_task,
-                                        mock_upgrade):
+                                        mock_upgrade,
+                                        mock_wait):
         class MockInstance(Mock):
             upgrade_counter = 0
 
@@ -364,6 +362,108 @@ class MongoDbClusterTasksTest(trove_testtools.TestCase):
 
         self.assertEqual(ClusterTaskStatus.NONE, self.db_cluster.task_status)
         self.assertDictEqual(ordering, order_result)
+        self.assertEqual(5, mock_wait.call_count)
+
+    @patch.object(ClusterTasks, '_wait_for_healthy_nodes')
+    @patch('trove.taskmanager.models.DBaaSInstanceRestart')
+    @patch('trove.taskmanager.models.BuiltInstanceTasks')
+    @patch('trove.taskmanager.models.EndNotification')
+    @patch('trove.taskmanager.models.StartNotification')
+    @patch.object(ClusterTasks, 'reset_task')
+    @patch.object(DBInstance, 'find_all')
+    def test_rolling_restart_cluster(self, mock_find_all, mock_reset_task,
+                                     mock_start, mock_end, mock_instance_task,
+                                     mock_restart, mock_wait):
+        self.patch_conf_property('cluster_rolling_batch_size', 3)
+        self.dbinst3.shard_id = 'shard-2'
+        self.dbinst4.shard_id = None
+        mock_find_all.return_value.all.return_value = [
+            self.dbinst1, self.dbinst2, self.dbinst3, self.dbinst4]
+        instances = {}
+
+        def load_side_effect(_, instance_id):
+            instances[instance_id] = Mock(id=instance_id)
+            return instances[instance_id]
+        mock_instance_task.load.side_effect = load_side_effect
+
+        self.clustertasks.rolling_restart_cluster(MagicMock(),
+                                                  self.cluster_id)
+
+        # The two nodes of shard-1 are restarted in different batches.
+        self.assertEqual([call(['1', '3', '4']), call(['2'])],
+                         mock_wait.call_args_list)
+        for instance in instances.values():
+            instance.restart.assert_called_once_with()
+        mock_reset_task.assert_called_once_with()
+
+    @patch.object(ClusterTasks, '_wait_for_healthy_nodes')
+    @patch('trove.taskmanager.models.DBaaSInstanceRestart')
+    @patch('trove.taskmanager.models.BuiltInstanceTasks')
+    @patch('trove.taskmanager.models.EndNotification')
+    @patch('trove.taskmanager.models.StartNotification')
+    @patch.object(ClusterTasks, 'reset_task')
+    @patch.object(DBInstance, 'find_all')
+    def test_rolling_restart_cluster_not_sharded(
+            self, mock_find_all, mock_reset_task, mock_start, mock_end,
+            mock_instance_task, mock_restart, mock_wait):
+        self.patch_conf_property('cluster_rolling_batch_size', 3)
+        for dbinst in (self.dbinst1, self.dbinst2, self.dbinst3):
+            dbinst.shard_id = None
+        mock_find_all.return_value.all.return_value = [
+            self.dbinst1, self.dbinst2, self.dbinst3]
+        mock_instance_task.load.side_effect = (
+            lambda _, instance_id: Mock(id=instance_id))
+
+        self.clustertasks.rolling_restart_cluster(MagicMock(),
+                                                  self.cluster_id)
+
+        # The nodes of a cluster without shards keep the quorum, they are
+        # restarted one at a time.
+        self.assertEqual([call(['1']), call(['2']), call(['3'])],
+                         mock_wait.call_args_list)
+        mock_reset_task.assert_called_once_with()
+
+    @patch.object(ClusterTasks, '_wait_for_healthy_nodes')
+    @patch('trove.taskmanager.models.DBaaSInstanceRestart')
+    @patch('trove.taskmanager.models.BuiltInstanceTasks')
+    @patch('trove.taskmanager.models.EndNotification')
+    @patch('trove.taskmanager.models.StartNotification')
+    @patch.object(ClusterTasks, 'reset_task')
+    @patch.object(DBInstance, 'find_all')
+    def test_rolling_restart_cluster_unhealthy(self, mock_find_all,
+                                               mock_reset_task, mock_start,
+                                               mock_end, mock_instance_task,
+                                               mock_restart, mock_wait):
+        mock_find_all.return_value.all.return_value = [self.dbinst1,
+                                                       self.dbinst2]
+        mock_wait.side_effect = exception.TroveError('unhealthy')
+
+        self.assertRaises(exception.TroveError,
+                          self.clustertasks.rolling_restart_cluster,
+                          MagicMock(), self.cluster_id)
+
+        # The next batch doesn't start after an unhealthy one.
+        mock_instance_task.load.assert_called_once_with(ANY, '1')
+        mock_reset_task.assert_called_once_with()
+
+    @patch('trove.instance.models.load_instance_statuses')
+    def test_wait_for_healthy_nodes(self, mock_load):
+        mock_load.return_value = {
+            '1': (InstanceTasks.NONE, ServiceStatuses.HEALTHY),
+            '2': (InstanceTasks.NONE, ServiceStatuses.RUNNING)}
+
+        self.clustertasks._wait_for_healthy_nodes(['1', '2'])
+
+    @patch('trove.instance.models.load_instance_statuses')
+    def test_wait_for_healthy_nodes_failed(self, mock_load):
+        mock_load.return_value = {
+            '1': (InstanceTasks.BUILDING_ERROR_SERVER,
+                  ServiceStatuses.SHUTDOWN),
+            '2': (InstanceTasks.NONE, ServiceStatuses.HEALTHY)}
+
+        self.assertRaises(exception.TroveError,
+                          self.clustertasks._wait_for_healthy_nodes,
+                          ['1', '2'])
 
     @patch.object(ClusterTasks, 'reset_task')
     @patch.object(ClusterTasks, '_create_shard')
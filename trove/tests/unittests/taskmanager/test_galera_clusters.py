@@ -91,44 +91,37 @@ class GaleraClusterTasksTest(trove_testtools.TestCase):
         }
 
     @patch.object(GaleraCommonClusterTasks, 'update_statuses_on_failure')
-    @patch.object(DBInstance, 'find_by')
-    @patch.object(InstanceServiceStatus, 'find_by')
+    @patch('trove.instance.models.load_instance_statuses')
     @patch('trove.taskmanager.models.LOG')
-    def test_all_instances_ready_with_server_error(self,
-                                                   mock_logging, mock_find,
-                                                   mock_db_find, mock_update):
-        (mock_find.return_value.
-         get_status.return_value) = ServiceStatuses.NEW
-        (mock_db_find.return_value.
-         get_task_status.return_value) = InstanceTasks.BUILDING_ERROR_SERVER
+    def test_all_instances_ready_with_server_error(self, mock_logging,
+                                                   mock_load, mock_update):
+        mock_load.return_value = {
+            instance_id: (InstanceTasks.BUILDING_ERROR_SERVER,
+                          ServiceStatuses.NEW)
+            for instance_id in ["1", "2", "3", "4"]}
         ret_val = self.clustertasks._all_instances_ready(["1", "2", "3", "4"],
                                                          self.cluster_id)
         mock_update.assert_called_with(self.cluster_id, None)
         self.assertFalse(ret_val)
 
     @patch.object(GaleraCommonClusterTasks, 'update_statuses_on_failure')
-    @patch.object(DBInstance, 'find_by')
-    @patch.object(InstanceServiceStatus, 'find_by')
+    @patch('trove.instance.models.load_instance_statuses')
     @patch('trove.taskmanager.models.LOG')
     def test_all_instances_ready_bad_status(self, mock_logging,
-                                            mock_find, mock_db_find,
-                                            mock_update):
-        (mock_find.return_value.
-         get_status.return_value) = ServiceStatuses.FAILED
-        (mock_db_find.return_value.
-         get_task_status.return_value) = InstanceTasks.NONE
+                                            mock_load, mock_update):
+        mock_load.return_value = {
+            instance_id: (InstanceTasks.NONE, ServiceStatuses.FAILED)
+            for instance_id in ["1", "2", "3", "4"]}
         ret_val = self.clustertasks._all_instances_ready(["1", "2", "3", "4"],
                                                          self.cluster_id)
         mock_update.assert_called_with(self.cluster_id, None)
         self.assertFalse(ret_val)
 
-    @patch.object(DBInstance, 'find_by')
-    @patch.object(InstanceServiceStatus, 'find_by')
-    def test_all_instances_ready(self, mock_find, mock_db_find):
-        (mock_find.return_value.
-         get_status.return_value) = ServiceStatuses.INSTANCE_READY
-        (mock_db_find.return_value.
-         get_task_status.return_value) = InstanceTasks.NONE
+    @patch('trove.instance.models.load_instance_statuses')
+    def test_all_instances_ready(self, mock_load):
+        mock_load.return_value = {
+            instance_id: (InstanceTasks.NONE, ServiceStatuses.INSTANCE_READY)
+            for instance_id in ["1", "2", "3", "4"]}
         ret_val = self.clustertasks._all_instances_ready(["1", "2", "3", "4"],
                                                          self.cluster_id)
         self.assertTrue(ret_val)
@@ -107,6 +107,11 @@ class TestManager(trove_testtools.TestCase):
                                                  [self.mock_slave1,
                                                   self.mock_slave2]),
                                                 InstanceTasks.NONE)
+        timings = self.context.notification.payload['failover_timings']
+        self.assertEqual(['read_only', 'txn_catch_up', 'detach', 'enable',
+                          'repoint', 'demote'], list(timings))
+        for elapsed in timings.values():
+            self.assertGreaterEqual(elapsed, 0)
 
     @patch.object(Manager, '_set_task_status')
     @patch.object(Manager, '_most_current_replica')
@@ -150,6 +155,32 @@ class TestManager(trove_testtools.TestCase):
                               self.manager.eject_replica_source,
                               self.context, 'some-inst-id')
 
+    @patch.object(Manager, '_set_task_status')
+    @patch.object(Manager, '_most_current_replica')
+    @patch('trove.taskmanager.manager.LOG')
+    def test_exception_TroveError_eject_replica_source_isolated(
+            self, mock_logging, mock_most_current_replica,
+            mock_set_task_status):
+        mock_slave3 = Mock(id='inst3')
+        master = Mock(slaves=[self.mock_slave1, self.mock_slave2,
+                              mock_slave3])
+        self.mock_slave2.attach_replica = Mock(side_effect=TroveError)
+        mock_most_current_replica.return_value = self.mock_slave1
+        with patch.object(models.BuiltInstanceTasks, 'load',
+                          side_effect=[master, self.mock_slave1,
+                                       self.mock_slave2, mock_slave3]):
+            self.assertRaisesRegex(ReplicationSlaveAttachError,
+                                   r"switched: \['inst1'\]",
+                                   self.manager.eject_replica_source,
+                                   self.context, 'some-inst-id')
+
+        mock_slave3.detach_replica.assert_called_once_with(
+            master, for_failover=True)
+        mock_slave3.attach_replica.assert_called_once_with(self.mock_slave1)
+        self.mock_slave1.attach_replica.assert_not_called()
+        mock_set_task_status.assert_called_with(
+            [self.mock_slave2], InstanceTasks.EJECTION_ERROR)
+
     @patch.object(Manager, '_set_task_status')
     def test_error_promote_to_replica_source(self, *args):
         self.mock_slave2.detach_replica = Mock(
@@ -188,6 +219,10 @@ class TestManager(trove_testtools.TestCase):
             self.assertRaisesRegex(RuntimeError, 'Error',
                                    self.manager.eject_replica_source,
                                    self.context, 'some-inst-id')
+        # The timings of the phases done are in the error notification.
+        self.assertEqual(
+            ['select', 'detach', 'enable', 'repoint'],
+            list(self.context.notification.payload['failover_timings']))
 
     @patch.object(Backup, 'delete')
     @patch.object(models.BuiltInstanceTasks, 'load')
@@ -224,6 +259,33 @@ class TestManager(trove_testtools.TestCase):
                           'temp-backup-id', None, 'some_password', None,
                           Mock(), 'some-master-id', None, None, None, None)
 
+    @patch.object(Backup, 'delete')
+    @patch.object(models.BuiltInstanceTasks, 'load')
+    def test_create_replication_slaves_failure_isolated(self, mock_load,
+                                                        mock_backup_delete):
+        mock_snapshot = {'dataset': {'snapshot_id': 'test-id'}}
+        replicas = {}
+        for replica_id in ('id1', 'id2', 'id3'):
+            replicas[replica_id] = Mock(id=replica_id)
+            replicas[replica_id].get_replication_master_snapshot = Mock(
+                return_value=mock_snapshot)
+        replicas['id2'].create_instance = Mock(side_effect=TroveError)
+
+        with patch.object(models.FreshInstanceTasks, 'load',
+                          side_effect=lambda context, replica_id:
+                          replicas[replica_id]):
+            self.assertRaises(TroveError, self.manager.create_instance,
+                              self.context, ['id1', 'id2', 'id3'], Mock(),
+                              Mock(), Mock(), None, None, 'mysql',
+                              'mysql-server', 2, 'temp-backup-id', None,
+                              ['pw1', 'pw2', 'pw3'], None, Mock(),
+                              'some-master-id', None, None, None, None)
+
+        replicas['id1'].wait_for_instance.assert_called_once()
+        replicas['id2'].wait_for_instance.assert_not_called()
+        replicas['id3'].wait_for_instance.assert_called_once()
+        mock_backup_delete.assert_called_once_with(self.context, 'test-id')
+
     def test_AttributeError_create_instance(self):
         self.assertRaisesRegex(
             AttributeError, 'Cannot create multiple non-replica instances.',
@@ -11,6 +11,7 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import datetime
 import os
 from tempfile import NamedTemporaryFile
 from unittest import mock
@@ -18,6 +19,7 @@ from unittest import mock
 from cinderclient import exceptions as cinder_exceptions
 from cinderclient.v2 import volumes as cinderclient_volumes
 import cinderclient.v2.client as cinderclient
+import eventlet
 from unittest.mock import call
 from unittest.mock import MagicMock
 from unittest.mock import Mock
@@ -40,6 +42,7 @@ from trove.common import timeutils
 from trove.common import utils
 import trove.common.context
 from trove.common.exception import GuestError
+from trove.common.exception import ModelNotFoundError
 from trove.common.exception import PollTimeOut
 from trove.common.exception import TroveError
 from trove.common.notification import TroveInstanceModifyVolume
@@ -55,6 +58,10 @@ from trove.instance.models import InstanceServiceStatus
 from trove.instance.models import InstanceStatus
 from trove.instance.service_status import ServiceStatuses
 from trove.instance.tasks import InstanceTasks
+from trove.job import models as job_models
+from trove.module import models as module_models
+from trove.module import views as module_views
+from trove.taskmanager.manager import Manager
 from trove.taskmanager import models as taskmanager_models
 from trove.tests.unittests import trove_testtools
 from trove.tests.unittests.util import util
@@ -1143,3 +1150,281 @@ class ClusterRootTest(trove_testtools.TestCase):
             call(context, cluster_instances[1])
         ]
         root_history_create.assert_has_calls(calls)
+
+
+def check_tenant(context):
+    # The instances and clusters of the jobs belong to tenant_1, they are
+    # looked up like DBInstance.find_by does.
+    if not context.is_admin and context.project_id != 'tenant_1':
+        raise ModelNotFoundError()
+
+
+class ModuleTasksTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(ModuleTasksTest, self).setUp()
+        util.init_db()
+        cfg.CONF.set_override('module_reapply_min_batch_delay', 0)
+        self.context = Mock(project_id='tenant_1', is_admin=False)
+        self.module = Mock(id=utils.generate_uuid(), md5='new')
+        self.instance_ids = [utils.generate_uuid() for _ in range(5)]
+        self.instances = {
+            instance_id: Mock(cluster_id=None)
+            for instance_id in self.instance_ids}
+        self.instances[self.instance_ids[3]] = Mock(cluster_id='cluster_1')
+        self.instances[self.instance_ids[4]] = RuntimeError('boom')
+
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.guest = Mock()
+        self.guest.module_apply.side_effect = self._module_apply
+
+        for target, attribute, kwargs in [
+                (module_models.Modules, 'load_by_ids',
+                 {'return_value': [self.module]}),
+                (module_models.Modules, 'validate', {}),
+                (module_views, 'convert_modules_to_list',
+                 {'return_value': ['module']}),
+                (taskmanager_models.BuiltInstanceTasks, 'load',
+                 {'side_effect': self._load_instance}),
+                (taskmanager_models, 'create_guest_client',
+                 {'return_value': self.guest}),
+                (taskmanager_models.Instance, 'add_instance_modules', {})]:
+            patcher = patch.object(target, attribute, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _load_instance(self, context, instance_id, needs_server=False):
+        check_tenant(context)
+        instance = self.instances[instance_id]
+        if isinstance(instance, Exception):
+            raise instance
+        return instance
+
+    def _module_apply(self, module_list):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        eventlet.sleep(0.01)
+        self.in_flight -= 1
+
+    def test_reapply_module(self):
+        instance_modules = [Mock(instance_id=instance_id, md5='old')
+                            for instance_id in self.instance_ids]
+        instance_modules[2].md5 = 'new'
+        with patch.object(module_models.InstanceModules, 'load_all',
+                          return_value=instance_modules):
+            taskmanager_models.ModuleTasks.reapply_module(
+                self.context, self.module.id, None, False, 2, 0, False)
+
+        job = job_models.Job(
+            job_models.DBJob.find_by(resource_id=self.module.id))
+        self.assertEqual(job_models.JobStatus.COMPLETED, job.status)
+        statuses = {item.instance_id: item.status
+                    for item in job.load_items()}
+        self.assertEqual({
+            self.instance_ids[0]: job_models.JobItemStatus.SUCCEEDED,
+            self.instance_ids[1]: job_models.JobItemStatus.SUCCEEDED,
+            self.instance_ids[3]: job_models.JobItemStatus.SKIPPED,
+            self.instance_ids[4]: job_models.JobItemStatus.FAILED},
+            statuses)
+        self.assertEqual(2, self.guest.module_apply.call_count)
+        self.assertEqual(2, self.max_in_flight)
+        self.assertNotIn(job.id,
+                         taskmanager_models.ModuleTasks._running_jobs)
+
+    def test_resume_reapply_jobs(self):
+        job = job_models.Job.create(
+            self.context, taskmanager_models.ModuleTasks.JOB_TYPE,
+            self.module.id,
+            {'include_clustered': False, 'batch_size': 1,
+             'batch_delay': 0},
+            self.instance_ids[:2])
+        job.set_item_status(self.instance_ids[0],
+                            job_models.JobItemStatus.SUCCEEDED)
+
+        with patch.object(taskmanager_models.greenthread, 'spawn_n',
+                          side_effect=lambda func, *args: func(*args)):
+            taskmanager_models.ModuleTasks.resume_reapply_jobs(self.context)
+
+        job = job_models.Job.load(self.context, job.id)
+        self.assertEqual(job_models.JobStatus.COMPLETED, job.status)
+        self.assertEqual({job_models.JobItemStatus.SUCCEEDED: 2},
+                         job.count_items())
+        self.guest.module_apply.assert_called_once_with(['module'])
+
+    def test_resume_reapply_jobs_manager_context(self):
+        job = self._create_job()
+
+        with patch.object(taskmanager_models.greenthread, 'spawn_n',
+                          side_effect=lambda func, *args: func(*args)):
+            taskmanager_models.ModuleTasks.resume_reapply_jobs(
+                Manager().admin_context)
+
+        job = job_models.Job.load(self.context, job.id)
+        self.assertEqual({job_models.JobItemStatus.SUCCEEDED: 2},
+                         job.count_items())
+
+    def _create_job(self):
+        return job_models.Job.create(
+            self.context, taskmanager_models.ModuleTasks.JOB_TYPE,
+            self.module.id,
+            {'include_clustered': False, 'batch_size': 2,
+             'batch_delay': 0},
+            self.instance_ids[:2])
+
+    def test_run_reapply_job_module_deleted(self):
+        job = self._create_job()
+
+        taskmanager_models.ModuleTasks._run_reapply_job(
+            self.context, job, [])
+
+        job = job_models.Job.load(self.context, job.id)
+        self.assertEqual(job_models.JobStatus.COMPLETED, job.status)
+        self.assertEqual({job_models.JobItemStatus.SKIPPED: 2},
+                         job.count_items())
+        self.guest.module_apply.assert_not_called()
+
+    def test_run_reapply_job_result_not_recorded(self):
+        job = self._create_job()
+        set_item_status = job.set_item_status
+
+        def _set_item_status(instance_id, status, message=None):
+            if (instance_id == self.instance_ids[0] and
+                    status == job_models.JobItemStatus.SUCCEEDED):
+                raise RuntimeError('database gone')
+            set_item_status(instance_id, status, message)
+
+        with patch.object(job, 'set_item_status',
+                          side_effect=_set_item_status):
+            taskmanager_models.ModuleTasks._run_reapply_job(
+                self.context, job, [self.module])
+
+        job = job_models.Job.load(self.context, job.id)
+        self.assertEqual(job_models.JobStatus.COMPLETED, job.status)
+        statuses = {item.instance_id: item.status
+                    for item in job.load_items()}
+        self.assertEqual({
+            self.instance_ids[0]: job_models.JobItemStatus.FAILED,
+            self.instance_ids[1]: job_models.JobItemStatus.SUCCEEDED},
+            statuses)
+
+
+class ConfigurationTasksTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(ConfigurationTasksTest, self).setUp()
+        util.init_db()
+        self.context = Mock(project_id='tenant_1', is_admin=False)
+        self.configuration_id = utils.generate_uuid()
+        self.instance_ids = [utils.generate_uuid() for _ in range(3)]
+        self.cluster_id = utils.generate_uuid()
+        self.instances = {
+            instance_id: Mock(db_info=Mock(
+                configuration_id=self.configuration_id))
+            for instance_id in self.instance_ids}
+        self.instances[self.instance_ids[1]].db_info.configuration_id = None
+        failing_instance = self.instances[self.instance_ids[2]]
+        failing_instance.update_configuration.side_effect = GuestError(
+            original_message='boom')
+        self.cluster = Mock()
+
+        for target, attribute, kwargs in [
+                (taskmanager_models.Instance, 'load',
+                 {'side_effect': lambda context, instance_id:
+                  check_tenant(context) or self.instances[instance_id]}),
+                (taskmanager_models.Cluster, 'load',
+                 {'side_effect': lambda context, cluster_id:
+                  check_tenant(context) or self.cluster}),
+                (taskmanager_models.config_models, 'Configuration',
+                 {'return_value': Mock(
+                     configuration_id=self.configuration_id)})]:
+            patcher = patch.object(target, attribute, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.job = job_models.Job.create(
+            self.context, 'configuration_refresh', self.configuration_id,
+            {'cluster_ids': [self.cluster_id]},
+            self.instance_ids + [self.cluster_id], claimed=False)
+
+    def test_refresh_configuration(self):
+        taskmanager_models.ConfigurationTasks.refresh_configuration(
+            self.context, self.configuration_id, self.job.id)
+
+        job = job_models.Job.load(self.context, self.job.id)
+        self.assertEqual(job_models.JobStatus.COMPLETED, job.status)
+        self.assertEqual(cfg.CONF.host, job.db_info.host)
+        statuses = {item.instance_id: item.status
+                    for item in job.load_items()}
+        self.assertEqual({
+            self.instance_ids[0]: job_models.JobItemStatus.SUCCEEDED,
+            self.instance_ids[1]: job_models.JobItemStatus.SKIPPED,
+            self.instance_ids[2]: job_models.JobItemStatus.FAILED,
+            self.cluster_id: job_models.JobItemStatus.SUCCEEDED},
+            statuses)
+        detached_instance = self.instances[self.instance_ids[1]]
+        detached_instance.update_configuration.assert_not_called()
+        self.cluster.configuration_attach.assert_called_once_with(
+            self.configuration_id)
+
+    def test_run_refresh_job_result_not_recorded(self):
+        set_item_status = self.job.set_item_status
+
+        def _set_item_status(instance_id, status, message=None):
+            if instance_id == self.cluster_id:
+                raise RuntimeError('database gone')
+            set_item_status(instance_id, status, message)
+
+        with patch.object(self.job, 'set_item_status',
+                          side_effect=_set_item_status):
+            taskmanager_models.ConfigurationTasks._run_refresh_job(
+                self.context, self.job)
+
+        job = job_models.Job.load(self.context, self.job.id)
+        self.assertEqual(job_models.JobStatus.COMPLETED, job.status)
+        self.assertEqual([], job.pending_instance_ids())
+        self.assertIn(self.cluster_id, [
+            item.instance_id for item in job.load_items(
+                job_models.JobItemStatus.FAILED)])
+
+    def test_resume_refresh_jobs(self):
+        self.job.claim()
+        for instance_id in self.instance_ids:
+            self.job.set_item_status(instance_id,
+                                     job_models.JobItemStatus.SUCCEEDED)
+
+        with patch.object(taskmanager_models.greenthread, 'spawn_n',
+                          side_effect=lambda func, *args: func(*args)):
+            taskmanager_models.ConfigurationTasks.resume_refresh_jobs(
+                Manager().admin_context)
+
+        job = job_models.Job.load(self.context, self.job.id)
+        self.assertEqual(job_models.JobStatus.COMPLETED, job.status)
+        for instance in self.instances.values():
+            instance.update_configuration.assert_not_called()
+        self.cluster.configuration_attach.assert_called_once_with(
+            self.configuration_id)
+
+    def test_resume_unclaimed_refresh_jobs(self):
+        cfg.CONF.set_override('job_claim_timeout', 3600)
+        job_models.DBJob.find_all(id=self.job.id).update(
+            created=datetime.datetime(2020, 1, 1))
+
+        with patch.object(taskmanager_models.greenthread, 'spawn_n',
+                          side_effect=lambda func, *args: func(*args)):
+            taskmanager_models.ConfigurationTasks.resume_refresh_jobs(
+                Manager().admin_context)
+
+        job = job_models.Job.load(self.context, self.job.id)
+        self.assertEqual(job_models.JobStatus.COMPLETED, job.status)
+        self.assertEqual(cfg.CONF.host, job.db_info.host)
+        self.assertEqual(
+            {job_models.JobItemStatus.SUCCEEDED: 2,
+             job_models.JobItemStatus.SKIPPED: 1,
+             job_models.JobItemStatus.FAILED: 1}, job.count_items())
+
+        # The message of the API arriving late doesn't run it again.
+        taskmanager_models.ConfigurationTasks.refresh_configuration(
+            self.context, self.configuration_id, self.job.id)
+        self.cluster.configuration_attach.assert_called_once_with(
+            self.configuration_id)
@@ -0,0 +1,85 @@
+# Copyright 2020 Catalyst Cloud
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+import time
+from unittest.mock import patch
+
+from trove.common import exception
+from trove.instance.service_status import ServiceStatuses
+from trove.instance.tasks import InstanceTasks
+from trove.taskmanager import status_waiter
+from trove.tests.unittests import trove_testtools
+
+
+def _statuses(status):
+    return {instance_id: (InstanceTasks.NONE, status)
+            for instance_id in ['1', '2']}
+
+
+def _all_ready(statuses):
+    return all(status == ServiceStatuses.INSTANCE_READY
+               for _task_status, status in statuses.values())
+
+
+class TestStatusWaiter(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(TestStatusWaiter, self).setUp()
+        patcher = patch('trove.instance.models.load_instance_statuses')
+        self.addCleanup(patcher.stop)
+        self.mock_load = patcher.start()
+
+    def test_wait_for_statuses(self):
+        self.mock_load.return_value = _statuses(
+            ServiceStatuses.INSTANCE_READY)
+
+        statuses = status_waiter.wait_for_statuses(['1', '2'], _all_ready,
+                                                   sleep_time=60)
+
+        self.assertEqual(_statuses(ServiceStatuses.INSTANCE_READY), statuses)
+        self.mock_load.assert_called_once_with(['1', '2'])
+        self.assertEqual({}, status_waiter._waiters)
+
+    def test_wait_for_statuses_timeout(self):
+        self.mock_load.return_value = _statuses(ServiceStatuses.NEW)
+
+        self.assertRaises(exception.PollTimeOut,
+                          status_waiter.wait_for_statuses, ['1', '2'],
+                          _all_ready, sleep_time=0.01, time_out=0.05)
+        self.assertGreater(self.mock_load.call_count, 1)
+        self.assertEqual({}, status_waiter._waiters)
+
+    def test_notify_wakes_up_wait(self):
+        self.mock_load.return_value = _statuses(ServiceStatuses.NEW)
+        result = {}
+
+        def _wait():
+            result['statuses'] = status_waiter.wait_for_statuses(
+                ['1', '2'], _all_ready, sleep_time=60, time_out=120)
+
+        waiter = threading.Thread(target=_wait)
+        waiter.start()
+        while '2' not in status_waiter._waiters:
+            time.sleep(0.01)
+
+        self.mock_load.return_value = _statuses(
+            ServiceStatuses.INSTANCE_READY)
+        status_waiter.notify(['2', '3'])
+        waiter.join(10)
+
+        self.assertFalse(waiter.is_alive())
+        self.assertEqual(_statuses(ServiceStatuses.INSTANCE_READY),
+                         result['statuses'])
+        self.assertEqual({}, status_waiter._waiters)